@@ -0,0 +1,89 @@
+"""schema additions since the baseline
+
+Revision ID: 0001
+Revises: 0000
+Create Date: 2026-10-19 18:52:15.353454
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = '0000'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+grant_change_enum = postgresql.ENUM('added', 'removed', name='grantchangeenum', create_type=False)
+
+
+def upgrade() -> None:
+    sa.Enum('added', 'removed', name='grantchangeenum').create(op.get_bind(), checkfirst=True)
+
+    # Per-account token version: bumping it revokes outstanding access and refresh tokens.
+    op.add_column('admins', sa.Column('token_version', sa.Integer(), server_default='0', nullable=False))
+    op.add_column('users', sa.Column('token_version', sa.Integer(), server_default='0', nullable=False))
+    # Per-user grant change counter behind the incremental sync API.
+    op.add_column('users', sa.Column('grants_version', sa.Integer(), server_default='0', nullable=False))
+    # Metadata read from the image header at ingest.
+    op.add_column('images', sa.Column('width', sa.Integer(), nullable=True))
+    op.add_column('images', sa.Column('height', sa.Integer(), nullable=True))
+    op.add_column('images', sa.Column('orientation', sa.Integer(), nullable=True))
+    op.add_column('images', sa.Column('image_format', sa.String(length=16), nullable=True))
+    op.add_column('images', sa.Column('dominant_color', sa.String(length=7), nullable=True))
+
+    op.create_index('ix_users_created_at', 'users', ['created_at'], unique=False)
+    op.create_index('ix_images_created_at', 'images', ['created_at'], unique=False)
+    op.create_index('ix_user_extensions_user_id', 'user_extensions', ['user_id'], unique=False)
+    op.create_index('ix_user_images_image_id', 'user_images', ['image_id'], unique=False)
+
+    op.create_table('refresh_tokens',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('token_hash', sa.String(length=64), nullable=False),
+    sa.Column('family_id', sa.String(length=36), nullable=False),
+    sa.Column('role', sa.String(length=16), nullable=False),
+    sa.Column('subject_id', sa.Integer(), nullable=False),
+    sa.Column('token_version', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('revoked_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('token_hash')
+    )
+    op.create_index('ix_refresh_tokens_family_id', 'refresh_tokens', ['family_id'], unique=False)
+
+    op.create_table('user_image_changes',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('image_id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('op', grant_change_enum, nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_user_image_changes_user_version', 'user_image_changes', ['user_id', 'version'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_user_image_changes_user_version', table_name='user_image_changes')
+    op.drop_table('user_image_changes')
+    op.drop_index('ix_refresh_tokens_family_id', table_name='refresh_tokens')
+    op.drop_table('refresh_tokens')
+
+    op.drop_index('ix_user_images_image_id', table_name='user_images')
+    op.drop_index('ix_user_extensions_user_id', table_name='user_extensions')
+    op.drop_index('ix_images_created_at', table_name='images')
+    op.drop_index('ix_users_created_at', table_name='users')
+
+    for column in ('dominant_color', 'image_format', 'orientation', 'height', 'width'):
+        op.drop_column('images', column)
+    op.drop_column('users', 'grants_version')
+    op.drop_column('users', 'token_version')
+    op.drop_column('admins', 'token_version')
+
+    sa.Enum(name='grantchangeenum').drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,38 @@
+"""hot path indexes
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 18:55:11.447175
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Plain CREATE INDEX: bootstrap runs migrations inside one locked transaction, where
+    # CONCURRENTLY is not allowed. On a large live table, build these by hand first.
+    op.drop_index('ix_images_created_at', table_name='images')
+    op.create_index('ix_images_live_created_at', 'images', ['created_at'], unique=False, postgresql_where=sa.text('deleted_at IS NULL'))
+    op.create_index('ix_images_checksum_sha256', 'images', ['checksum_sha256'], unique=False, postgresql_where=sa.text('checksum_sha256 IS NOT NULL'))
+    op.create_index('ix_usage_logs_user_created_at', 'usage_logs', ['user_id', 'created_at'], unique=False)
+    op.create_index('ix_users_expires_at', 'users', ['expires_at'], unique=False, postgresql_where=sa.text('expires_at IS NOT NULL'))
+    op.create_index('ix_users_status', 'users', ['status'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_users_status', table_name='users')
+    op.drop_index('ix_users_expires_at', table_name='users')
+    op.drop_index('ix_usage_logs_user_created_at', table_name='usage_logs')
+    op.drop_index('ix_images_checksum_sha256', table_name='images')
+    op.drop_index('ix_images_live_created_at', table_name='images')
+    op.create_index('ix_images_created_at', 'images', ['created_at'], unique=False)
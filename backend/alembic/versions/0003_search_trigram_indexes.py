@@ -0,0 +1,49 @@
+"""search trigram indexes
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19 19:20:04.118530
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TRIGRAM_INDEXES = (
+    ('ix_images_filename_trgm', 'images', 'filename', sa.text('deleted_at IS NULL')),
+    ('ix_images_key_trgm', 'images', 'key', sa.text('deleted_at IS NULL')),
+    ('ix_users_username_trgm', 'users', 'username', None),
+    ('ix_users_notes_trgm', 'users', 'notes', None),
+)
+
+
+def upgrade() -> None:
+    # Search falls back to plain LIKE elsewhere; only PostgreSQL gets pg_trgm and GIN.
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, table, column, where in TRIGRAM_INDEXES:
+        op.create_index(
+            name,
+            table,
+            [column],
+            unique=False,
+            postgresql_using='gin',
+            postgresql_ops={column: 'gin_trgm_ops'},
+            postgresql_where=where,
+        )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    for name, table, _, _ in reversed(TRIGRAM_INDEXES):
+        op.drop_index(name, table_name=table)
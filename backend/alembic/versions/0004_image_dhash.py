@@ -0,0 +1,37 @@
+"""image dhash
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19 19:41:37.502913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('images', sa.Column('dhash', sa.BigInteger(), nullable=True))
+    # Same expression as models.dhash_band, which queries use to hit these indexes.
+    for band in range(4):
+        op.create_index(
+            f'ix_images_dhash_band{band}',
+            'images',
+            [sa.text(f'((dhash >> {band * 16}) & 65535)')],
+            unique=False,
+            postgresql_where=sa.text('dhash IS NOT NULL AND deleted_at IS NULL'),
+        )
+
+
+def downgrade() -> None:
+    for band in reversed(range(4)):
+        op.drop_index(f'ix_images_dhash_band{band}', table_name='images')
+    op.drop_column('images', 'dhash')
@@ -0,0 +1,43 @@
+"""assignment covering indexes
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 21:12:40.318604
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # (image_id, user_id) replaces the single-column index: image-side listings come out in
+    # user order and counts read only the index. expires_at rides along in both directions so
+    # "does user X hold image Y" is an index-only probe on PostgreSQL.
+    op.create_index(
+        'ix_user_images_image_user', 'user_images', ['image_id', 'user_id'], unique=False, postgresql_include=['expires_at']
+    )
+    op.drop_index('ix_user_images_image_id', table_name='user_images')
+    # INCLUDE only exists on PostgreSQL; elsewhere the unique constraint stays as it was.
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.drop_constraint('uq_user_image', 'user_images', type_='unique')
+    op.create_index(
+        'uq_user_image', 'user_images', ['user_id', 'image_id'], unique=True, postgresql_include=['expires_at']
+    )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        op.drop_index('uq_user_image', table_name='user_images')
+        op.create_unique_constraint('uq_user_image', 'user_images', ['user_id', 'image_id'])
+    op.create_index('ix_user_images_image_id', 'user_images', ['image_id'], unique=False)
+    op.drop_index('ix_user_images_image_user', table_name='user_images')
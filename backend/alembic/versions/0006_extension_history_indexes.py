@@ -0,0 +1,42 @@
+"""extension history indexes
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19 23:05:12.471930
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The history API pages newest-first on (created_at, id), optionally narrowed to one user
+    # or one operating admin. Each filter gets an index that ends in the page order, so a page
+    # is a bounded backward index scan; (user_id, ...) also covers what the old index did.
+    op.create_index(
+        'ix_user_extensions_user_created', 'user_extensions', ['user_id', 'created_at', 'id'], unique=False
+    )
+    op.create_index(
+        'ix_user_extensions_admin_created',
+        'user_extensions',
+        ['operated_by_admin_id', 'created_at', 'id'],
+        unique=False,
+    )
+    op.create_index('ix_user_extensions_created', 'user_extensions', ['created_at', 'id'], unique=False)
+    op.drop_index('ix_user_extensions_user_id', table_name='user_extensions')
+
+
+def downgrade() -> None:
+    op.create_index('ix_user_extensions_user_id', 'user_extensions', ['user_id'], unique=False)
+    op.drop_index('ix_user_extensions_created', table_name='user_extensions')
+    op.drop_index('ix_user_extensions_admin_created', table_name='user_extensions')
+    op.drop_index('ix_user_extensions_user_created', table_name='user_extensions')
@@ -0,0 +1,172 @@
+"""One-time deployment initialisation: migrations, seed admin and bucket check.
+
+Run it once per deploy as an init step::
+
+    python -m app.bootstrap
+
+or leave ``run_init_on_startup`` enabled and every worker runs it at boot, serialised by a
+Postgres advisory lock so concurrent workers do not race each other's DDL.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+from alembic import command
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+from botocore.exceptions import ClientError
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import inspect, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import metrics
+from .config import get_settings
+from .deps import engine
+from .models import Admin, StatusEnum
+from .security import get_password_hash
+from .storage import get_s3_client
+
+logger = logging.getLogger(__name__)
+
+ALEMBIC_INI = Path(__file__).resolve().parent.parent / "alembic.ini"
+# Schema of the create_all era, before migrations (alembic/versions/0000_baseline_schema.py).
+BASELINE_REVISION = "0000"
+# Arbitrary constant shared by every worker and the init command.
+INIT_LOCK_ID = 0x56495341
+
+# Taken at import, which is the first thing a worker does; close enough to process start.
+_boot_started = time.monotonic()
+_time_to_ready: Optional[float] = None
+
+metrics.gauge(
+    "worker_time_to_ready_seconds",
+    "Seconds from worker import until it first reported ready",
+    lambda: _time_to_ready or 0.0,
+)
+
+
+def alembic_config(connection=None) -> Config:
+    config = Config(str(ALEMBIC_INI))
+    config.set_main_option("script_location", str(ALEMBIC_INI.parent / "alembic"))
+    config.attributes["configure_logger"] = False
+    if connection is not None:
+        config.attributes["connection"] = connection
+    return config
+
+
+@lru_cache(maxsize=1)
+def head_revision() -> Optional[str]:
+    return ScriptDirectory.from_config(alembic_config()).get_current_head()
+
+
+def upgrade_schema(sync_conn) -> None:
+    config = alembic_config(sync_conn)
+    tables = inspect(sync_conn).get_table_names()
+    if "admins" in tables and "alembic_version" not in tables:
+        # Database created by the old create_all boot path, which is exactly the baseline
+        # revision; adopt it there and let the later migrations add what it lacks.
+        logger.warning("Unversioned schema found; stamping %s and migrating from there", BASELINE_REVISION)
+        command.stamp(config, BASELINE_REVISION)
+    command.upgrade(config, "head")
+
+
+async def seed_admin(session: AsyncSession) -> None:
+    settings = get_settings()
+    if not settings.seed_admin_username or not settings.seed_admin_password:
+        return
+    exists = await session.execute(select(Admin).where(Admin.username == settings.seed_admin_username))
+    if exists.scalar_one_or_none():
+        return
+    admin = Admin(
+        username=settings.seed_admin_username,
+        password_hash=get_password_hash(settings.seed_admin_password),
+        is_superadmin=settings.seed_admin_is_superadmin,
+        status=StatusEnum.active,
+    )
+    session.add(admin)
+    await session.flush()
+
+
+def ensure_bucket() -> None:
+    settings = get_settings()
+    client = get_s3_client()
+    try:
+        client.head_bucket(Bucket=settings.s3_bucket)
+        return
+    except ClientError as e:
+        # If bucket not found, try to create; other errors bubble up
+        error_code = e.response.get("Error", {}).get("Code")
+        if error_code not in ("404", "NoSuchBucket", "404 Not Found", "NotFound"):
+            logger.error("Failed to check bucket: %s", e)
+            raise
+    try:
+        params = {"Bucket": settings.s3_bucket}
+        if settings.s3_region and settings.s3_region != "us-east-1":
+            params["CreateBucketConfiguration"] = {"LocationConstraint": settings.s3_region}
+        client.create_bucket(**params)
+        logger.info("Created bucket %s", settings.s3_bucket)
+    except ClientError as e:
+        # Ignore if already exists after race
+        error_code = e.response.get("Error", {}).get("Code")
+        if error_code not in ("BucketAlreadyOwnedByYou", "BucketAlreadyExists"):
+            logger.error("Failed to create bucket: %s", e)
+            raise
+
+
+async def initialize() -> None:
+    """Migrate to head, seed the admin and make sure the bucket exists, all in one transaction.
+
+    On Postgres the transaction holds an advisory lock, so only one process initialises at a
+    time and the others find the work already done. DDL is transactional there as well, so a
+    failed migration leaves the schema untouched.
+    """
+    started = time.perf_counter()
+    async with engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            await conn.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": INIT_LOCK_ID})
+        await conn.run_sync(upgrade_schema)
+        async with AsyncSession(bind=conn, expire_on_commit=False) as session:
+            await seed_admin(session)
+        await run_in_threadpool(ensure_bucket)
+    logger.info("Initialisation finished in %.2fs", time.perf_counter() - started)
+
+
+async def is_ready() -> bool:
+    """True once the database is reachable and migrated to the revision this code expects."""
+    try:
+        async with engine.connect() as conn:
+            if _time_to_ready is not None:
+                await conn.execute(text("SELECT 1"))
+                return True
+            current = (await conn.execute(text("SELECT version_num FROM alembic_version"))).scalar_one_or_none()
+    except Exception as exc:
+        logger.warning("Readiness check failed: %s", exc)
+        return False
+    if current != head_revision():
+        return False
+    mark_ready()
+    return True
+
+
+def mark_ready() -> None:
+    global _time_to_ready
+    if _time_to_ready is None:
+        _time_to_ready = time.monotonic() - _boot_started
+        logger.info("Worker ready %.2fs after boot", _time_to_ready)
+
+
+async def _main() -> None:
+    try:
+        await initialize()
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main())
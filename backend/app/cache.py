@@ -0,0 +1,135 @@
+"""Small key/value cache shared by every worker process.
+
+``cache_url`` picks the backend: ``memory://`` (the default) keeps entries in the worker's
+own LRU, which is right for a single process and for tests; ``redis://host:6379/0`` shares
+them across all workers and hosts. Values are bytes with a TTL; callers own the encoding.
+"""
+from __future__ import annotations
+
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Protocol, Tuple
+
+from . import metrics
+from .config import get_settings
+
+cache_hits = metrics.counter("shared_cache_hits_total", "Shared cache lookups that found a live entry")
+cache_misses = metrics.counter("shared_cache_misses_total", "Shared cache lookups that missed")
+
+
+class CacheBackend(Protocol):
+    """Get/set/delete of bytes with a TTL; a miss or backend error returns None, never raises."""
+
+    async def get(self, key: str) -> Optional[bytes]:
+        ...
+
+    async def set(self, key: str, value: bytes, ttl_seconds: float) -> None:
+        ...
+
+    async def delete(self, key: str) -> None:
+        ...
+
+    async def close(self) -> None:
+        ...
+
+
+class LocalCacheBackend:
+    """In-process stand-in for a shared cache: a bounded LRU whose entries expire on read."""
+
+    def __init__(self, max_keys: int = 10_000) -> None:
+        self.max_keys = max_keys
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires, value = entry
+        if expires <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes, ttl_seconds: float) -> None:
+        self._entries[key] = (time.monotonic() + ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_keys:
+            self._entries.popitem(last=False)
+
+    async def delete(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    async def close(self) -> None:
+        self._entries.clear()
+
+
+class RedisCacheBackend:
+    """Redis-backed cache. Errors degrade to misses so an unreachable Redis only costs DB work."""
+
+    def __init__(self, url: str, prefix: str) -> None:
+        from redis import asyncio as aioredis
+
+        self.prefix = prefix
+        self._redis = aioredis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+        self._errors = aioredis.RedisError
+
+    async def get(self, key: str) -> Optional[bytes]:
+        try:
+            return await self._redis.get(self.prefix + key)
+        except self._errors:
+            return None
+
+    async def set(self, key: str, value: bytes, ttl_seconds: float) -> None:
+        try:
+            await self._redis.set(self.prefix + key, value, px=max(1, int(ttl_seconds * 1000)))
+        except self._errors:
+            pass
+
+    async def delete(self, key: str) -> None:
+        try:
+            await self._redis.delete(self.prefix + key)
+        except self._errors:
+            pass
+
+    async def close(self) -> None:
+        await self._redis.aclose()
+
+
+_cache: Optional[CacheBackend] = None
+
+
+def get_cache() -> CacheBackend:
+    global _cache
+    if _cache is None:
+        settings = get_settings()
+        if settings.cache_url.startswith(("redis://", "rediss://", "unix://")):
+            _cache = RedisCacheBackend(settings.cache_url, settings.cache_key_prefix)
+        elif settings.cache_url.startswith("memory://"):
+            _cache = LocalCacheBackend(settings.cache_max_local_keys)
+        else:
+            raise ValueError(f"Unsupported cache_url: {settings.cache_url}")
+    return _cache
+
+
+async def close_cache() -> None:
+    global _cache
+    if _cache is not None:
+        cache, _cache = _cache, None
+        await cache.close()
+
+
+async def get_json(key: str, kind: str) -> Any:
+    """Decoded JSON value under ``key``, or None on a miss. ``kind`` labels the hit/miss metrics."""
+    raw = await get_cache().get(key)
+    if raw is None:
+        cache_misses.inc(kind=kind)
+        return None
+    cache_hits.inc(kind=kind)
+    return json.loads(raw)
+
+
+async def set_json(key: str, value: Any, ttl_seconds: float) -> None:
+    if ttl_seconds > 0:
+        await get_cache().set(key, json.dumps(value, separators=(",", ":")).encode(), ttl_seconds)
@@ -16,10 +16,32 @@ class Settings(BaseSettings):
     # Database
     database_url: str = Field(default="postgresql+asyncpg://postgres:postgres@db:5432/visomaster")
 
+    # Encode list responses through a precompiled TypeAdapter instead of per-row response_model validation
+    fast_list_serialization: bool = Field(default=True)
+
+    # Rows fetched per server-side cursor batch when streaming exports
+    export_batch_size: int = Field(default=1000)
+    # Rows per multi-row INSERT during bulk user import
+    bulk_import_batch_size: int = Field(default=1000)
+    # Grants per multi-row INSERT and per grants_version bump when assigning images
+    assignment_batch_size: int = Field(default=1000)
+
     # JWT / Auth
     jwt_secret: str = Field(default="change-me")
     jwt_algorithm: str = Field(default="HS256")
-    jwt_expires_minutes: int = Field(default=60 * 12)
+    jwt_expires_minutes: int = Field(default=15)
+    refresh_token_days: int = Field(default=30)
+    # Login throttling: token buckets per client IP and per username, exponential lockout on failures
+    login_rate_limit_enabled: bool = Field(default=True)
+    login_ip_per_minute: float = Field(default=30)
+    login_ip_burst: float = Field(default=10)
+    login_user_per_minute: float = Field(default=10)
+    login_user_burst: float = Field(default=5)
+    login_lockout_threshold: int = Field(default=5)
+    login_lockout_base_seconds: float = Field(default=30)
+    login_lockout_max_seconds: float = Field(default=3600)
+    # Process pool size for bulk password hashing; 0 means one worker per CPU
+    password_hash_workers: int = Field(default=0)
 
     # S3 / MinIO
     s3_endpoint_url: Optional[str] = None
@@ -29,6 +51,74 @@ class Settings(BaseSettings):
     s3_bucket: str = Field(default="visomaster")
     s3_use_ssl: bool = Field(default=False)
     s3_presign_expire: int = Field(default=3600)
+    # HTTP connections each worker's shared S3 client keeps open (boto3's default of 10 queues bundle and thumb fetches)
+    s3_max_pool_connections: int = Field(default=32)
+
+    # Local disk edge cache for thumbnails and other small objects
+    edge_cache_enabled: bool = Field(default=True)
+    edge_cache_dir: str = Field(default="/tmp/visomaster-edge-cache")
+    edge_cache_max_bytes: int = Field(default=512 * 1024 * 1024)
+    edge_cache_max_object_bytes: int = Field(default=2 * 1024 * 1024)
+    edge_cache_revalidate_seconds: int = Field(default=300)
+
+    # Image ingest: header bytes probed for metadata, and what /images/upload-file accepts. The
+    # limits are enforced while the body streams in: 413 past the size or pixel limit, 415 unless
+    # the file's magic bytes name one of the allowed types (comma-separated)
+    image_probe_bytes: int = Field(default=256 * 1024)
+    upload_max_bytes: int = Field(default=50 * 1024 * 1024)
+    upload_max_pixels: int = Field(default=64_000_000)
+    upload_allowed_types: str = Field(default="image/jpeg,image/png,image/gif,image/webp,image/bmp,image/tiff")
+
+    # Thumbnails
+    thumb_max_size: int = Field(default=400)
+    thumb_quality: int = Field(default=82)
+    thumb_max_pixels: int = Field(default=64_000_000)
+    thumb_lock_timeout_seconds: float = Field(default=30.0)
+
+    # Signed image URLs: lifetime, whether unsigned /download and /thumb URLs are refused, whether
+    # user links re-check the grant (one index probe) so unassigning revokes them at once, and the
+    # in-process image metadata LRU that serves unsigned URLs (size 0 disables it)
+    download_url_ttl_seconds: int = Field(default=3600)
+    download_require_token: bool = Field(default=False)
+    download_check_grants: bool = Field(default=False)
+    image_meta_cache_size: int = Field(default=10000)
+    image_meta_cache_ttl_seconds: float = Field(default=60.0)
+
+    # Zip/tar bundle downloads: objects fetched ahead of the writer, which bounds memory per stream
+    bundle_prefetch: int = Field(default=4)
+
+    # /images/search and /users/search return at most this many of the best matches per query;
+    # pages past it are refused (400)
+    search_max_candidates: int = Field(default=200)
+
+    # Serving (python -m app.serve): worker processes, bind address, and how long SIGTERM waits for
+    # in-flight requests and streams before workers close their pools. The DB pool is per worker.
+    web_concurrency: int = Field(default=1)
+    bind_host: str = Field(default="0.0.0.0")
+    bind_port: int = Field(default=8000)
+    shutdown_grace_seconds: int = Field(default=20)
+    db_pool_size: int = Field(default=5)
+    db_max_overflow: int = Field(default=10)
+
+    # Cache shared by all workers: memory:// keeps it per process, redis://host:6379/0 shares it.
+    # TTLs bound how stale the stats summary, legacy-token principals and the token versions that
+    # revoke access tokens may be (0 disables each).
+    cache_url: str = Field(default="memory://")
+    cache_key_prefix: str = Field(default="visomaster:")
+    cache_max_local_keys: int = Field(default=10000)
+    stats_cache_seconds: float = Field(default=15.0)
+    principal_cache_seconds: float = Field(default=30.0)
+    token_version_cache_seconds: float = Field(default=30.0)
+
+    # Renewal audit trail (python -m app.jobs.extension_history): months of partitions kept ahead
+    # of the clock once the table is partitioned, and how many months stay in the table before
+    # `archive` moves them to gzipped NDJSON under the archive prefix in the bucket (0 keeps all)
+    extension_partition_months_ahead: int = Field(default=3)
+    extension_retention_months: int = Field(default=0)
+    extension_archive_prefix: str = Field(default="archive/user_extensions/")
+
+    # Startup: set to false when migrations/seed run as a separate init step (python -m app.bootstrap)
+    run_init_on_startup: bool = Field(default=True)
 
     # Seed admin
     seed_admin_username: Optional[str] = Field(default="admin")
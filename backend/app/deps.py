@@ -1,3 +1,4 @@
+from dataclasses import asdict
 from typing import AsyncGenerator
 
 from fastapi import Depends, HTTPException, status
@@ -5,14 +6,25 @@ from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 
+from . import cache
 from .config import get_settings
 from .models import Admin, StatusEnum, User
-from .security import decode_token
+from .security import Principal, decode_token
+from .services.auth import current_token_version
 
 settings = get_settings()
 
-engine = create_async_engine(settings.database_url, echo=settings.debug, future=True)
+# Each worker process owns its pools, so the database sees up to
+# web_concurrency * (db_pool_size + db_max_overflow + 1) connections, the 1 being lock_engine.
+_pool_args = {}
+if not settings.database_url.startswith("sqlite"):
+    _pool_args = {"pool_size": settings.db_pool_size, "max_overflow": settings.db_max_overflow}
+engine = create_async_engine(settings.database_url, echo=settings.debug, future=True, **_pool_args)
 SessionLocal = async_sessionmaker(engine, expire_on_commit=False)
+# Session-level advisory locks (services.thumbnails) live on one dedicated connection that is
+# checked out only for each lock or unlock statement, so a held lock pins no request-pool slot.
+_lock_pool_args = {"pool_size": 1, "max_overflow": 0} if _pool_args else {}
+lock_engine = create_async_engine(settings.database_url, future=True, **_lock_pool_args)
 http_bearer = HTTPBearer(auto_error=False)
 
 
@@ -24,10 +36,7 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
             await session.close()
 
 
-async def get_current_admin(
-    credentials: HTTPAuthorizationCredentials | None = Depends(http_bearer),
-    session: AsyncSession = Depends(get_db),
-) -> Admin:
+def _bearer_payload(credentials: HTTPAuthorizationCredentials | None, role: str) -> dict:
     if credentials is None or credentials.scheme.lower() != "bearer":
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
     try:
@@ -35,20 +44,59 @@ async def get_current_admin(
     except Exception:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
 
-    if payload.get("role") != "admin":
+    if payload.get("role") != role:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid role")
-    username = payload.get("sub")
-    if not username:
+    if not payload.get("sub"):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
+    return payload
+
+
+async def check_token_version(session: AsyncSession, role: str, payload: dict) -> None:
+    """Refuse an access token minted before the account's last password, status or role change."""
+    if payload.get("tv") != await current_token_version(session, role, payload["uid"]):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token revoked")
+
 
-    result = await session.execute(select(Admin).where(Admin.username == username))
+async def _cached_principal(role: str, username: str) -> Principal | None:
+    data = await cache.get_json(f"principal:{role}:{username}", "principal")
+    return Principal(**data) if data is not None else None
+
+
+async def _remember_principal(principal: Principal) -> Principal:
+    key = f"principal:{principal.role}:{principal.username}"
+    await cache.set_json(key, asdict(principal), get_settings().principal_cache_seconds)
+    return principal
+
+
+async def get_current_admin(
+    credentials: HTTPAuthorizationCredentials | None = Depends(http_bearer),
+    session: AsyncSession = Depends(get_db),
+) -> Principal:
+    """Trust the claims of a short-lived access token once its ``tv`` matches the account's.
+
+    The version check is a shared-cache read, falling back to one indexed DB read on a miss;
+    disabling an admin, changing their password or role bumps the version and revokes the
+    token. Tokens without ``uid`` resolve through the shared cache, so a disable reaches them
+    within ``principal_cache_seconds``.
+    """
+    payload = _bearer_payload(credentials, "admin")
+    if "uid" in payload:
+        await check_token_version(session, "admin", payload)
+        return Principal(id=payload["uid"], username=payload["sub"], role="admin", is_superadmin=bool(payload.get("su")))
+    cached = await _cached_principal("admin", payload["sub"])
+    if cached is not None:
+        return cached
+
+    result = await session.execute(select(Admin).where(Admin.username == payload["sub"]))
     admin = result.scalar_one_or_none()
     if not admin or admin.status != StatusEnum.active:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Inactive account")
-    return admin
+    return await _remember_principal(
+        Principal(id=admin.id, username=admin.username, role="admin", is_superadmin=admin.is_superadmin)
+    )
 
 
-async def require_superadmin(admin: Admin = Depends(get_current_admin)) -> Admin:
+async def require_superadmin(admin: Principal = Depends(get_current_admin)) -> Principal:
     if not admin.is_superadmin:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Superadmin required")
     return admin
@@ -57,22 +105,17 @@ async def require_superadmin(admin: Admin = Depends(get_current_admin)) -> Admin
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials | None = Depends(http_bearer),
     session: AsyncSession = Depends(get_db),
-) -> User:
-    if credentials is None or credentials.scheme.lower() != "bearer":
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
-    try:
-        payload = decode_token(credentials.credentials)
-    except Exception:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
-
-    if payload.get("role") != "user":
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid role")
-    username = payload.get("sub")
-    if not username:
-        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
-
-    result = await session.execute(select(User).where(User.username == username))
+) -> Principal:
+    payload = _bearer_payload(credentials, "user")
+    if "uid" in payload:
+        await check_token_version(session, "user", payload)
+        return Principal(id=payload["uid"], username=payload["sub"], role="user")
+    cached = await _cached_principal("user", payload["sub"])
+    if cached is not None:
+        return cached
+
+    result = await session.execute(select(User).where(User.username == payload["sub"]))
     user = result.scalar_one_or_none()
     if not user or user.status != StatusEnum.active:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Inactive user")
-    return user
+    return await _remember_principal(Principal(id=user.id, username=user.username, role="user"))
@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import shutil
+import time
+import uuid
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Deque, List, Optional, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+from . import metrics
+from .config import get_settings
+from .storage import get_s3_client
+from .utils.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+# Evicted files stay on disk this long so responses already streaming them can finish.
+EVICTION_GRACE_SECONDS = 30.0
+
+cache_hits = metrics.counter("edge_cache_hits_total", "Edge cache lookups served from local disk")
+cache_misses = metrics.counter("edge_cache_misses_total", "Edge cache lookups fetched from object storage")
+cache_evictions = metrics.counter("edge_cache_evictions_total", "Entries evicted from the edge cache")
+cache_bypass = metrics.counter("edge_cache_bypass_total", "Objects too large to be cached")
+
+
+@dataclass
+class CachedObject:
+    path: Path
+    size: int
+    etag: str
+    content_type: str
+    validated_at: float
+
+
+class EdgeCache:
+    """Size-capped LRU disk cache in front of S3 for thumbnails and other small objects.
+
+    Entries are keyed by ``(bucket, key)`` and remember the object's ETag; after
+    ``revalidate_seconds`` a lookup issues a cheap ``head_object`` and refetches only when
+    the ETag changed. Concurrent misses for the same key share one fetch.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_bytes: int,
+        max_object_bytes: int,
+        revalidate_seconds: int,
+    ) -> None:
+        root = Path(directory)
+        _sweep_dead_workers(root)
+        # One subdirectory per worker process: the index lives in memory, so workers never share files.
+        self.directory = root / str(os.getpid())
+        shutil.rmtree(self.directory, ignore_errors=True)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_object_bytes = max_object_bytes
+        self.revalidate_seconds = revalidate_seconds
+        self._entries: "OrderedDict[Tuple[str, str], CachedObject]" = OrderedDict()
+        self._graveyard: Deque[Tuple[float, Path]] = deque()
+        self._total_bytes = 0
+        self._flight: SingleFlight[Optional[CachedObject]] = SingleFlight()
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def get(self, bucket: str, key: str) -> Optional[CachedObject]:
+        """Return a cached copy of the object, fetching it on a miss.
+
+        Returns ``None`` when the object is larger than ``max_object_bytes``; callers should
+        then stream it from storage directly. Storage errors (e.g. ``NoSuchKey``) propagate.
+        """
+        entry = self._entries.get((bucket, key))
+        if entry is not None and time.monotonic() - entry.validated_at < self.revalidate_seconds:
+            self._entries.move_to_end((bucket, key))
+            cache_hits.inc()
+            return entry
+        return await self._flight.do((bucket, key), lambda: self._fill(bucket, key, entry))
+
+    async def put(self, bucket: str, key: str, data: bytes, content_type: str, etag: str) -> Optional[CachedObject]:
+        """Seed the cache with an object that was just written to storage."""
+        if len(data) > self.max_object_bytes:
+            return None
+        current = self._entries.get((bucket, key))
+        if current is not None and current.etag == etag:
+            return current
+        path = await run_in_threadpool(self._write_file, bucket, key, data, etag)
+        entry = self._index(bucket, key, path, len(data), content_type, etag)
+        await self._reap()
+        return entry
+
+    def discard(self, bucket: str, key: str) -> None:
+        entry = self._entries.pop((bucket, key), None)
+        if entry is not None:
+            self._retire(entry)
+
+    async def _fill(self, bucket: str, key: str, stale: Optional[CachedObject]) -> Optional[CachedObject]:
+        client = get_s3_client()
+        if stale is not None:
+            head = await run_in_threadpool(client.head_object, Bucket=bucket, Key=key)
+            if head.get("ETag") == stale.etag and stale.path.exists():
+                stale.validated_at = time.monotonic()
+                self._entries.move_to_end((bucket, key))
+                cache_hits.inc()
+                return stale
+
+        cache_misses.inc()
+        obj = await run_in_threadpool(client.get_object, Bucket=bucket, Key=key)
+        body = obj["Body"]
+        if obj.get("ContentLength", 0) > self.max_object_bytes:
+            body.close()
+            cache_bypass.inc()
+            return None
+        data = await run_in_threadpool(body.read)
+        etag = obj.get("ETag", "")
+        path = await run_in_threadpool(self._write_file, bucket, key, data, etag)
+        entry = self._index(bucket, key, path, len(data), obj.get("ContentType") or "application/octet-stream", etag)
+        await self._reap()
+        return entry
+
+    def _write_file(self, bucket: str, key: str, data: bytes, etag: str) -> Path:
+        digest = hashlib.sha256(f"{bucket}/{key}@{etag}".encode()).hexdigest()
+        # A fresh name per write, so a retired file awaiting deletion is never reused.
+        path = self.directory / digest[:2] / f"{digest}-{uuid.uuid4().hex[:8]}"
+        path.parent.mkdir(exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+        return path
+
+    def _index(self, bucket: str, key: str, path: Path, size: int, content_type: str, etag: str) -> CachedObject:
+        # Index bookkeeping always runs on the event loop thread, so no locking is needed.
+        previous = self._entries.pop((bucket, key), None)
+        if previous is not None:
+            self._retire(previous)
+
+        entry = CachedObject(
+            path=path,
+            size=size,
+            etag=etag,
+            content_type=content_type,
+            validated_at=time.monotonic(),
+        )
+        self._entries[(bucket, key)] = entry
+        self._total_bytes += entry.size
+        self._evict()
+        return entry
+
+    def _evict(self) -> None:
+        while self._total_bytes > self.max_bytes and self._entries:
+            _, victim = self._entries.popitem(last=False)
+            self._retire(victim)
+            cache_evictions.inc()
+
+    async def _reap(self) -> None:
+        """Delete evicted files whose grace period is over, off the event loop."""
+        now = time.monotonic()
+        expired = []
+        while self._graveyard and self._graveyard[0][0] <= now:
+            expired.append(self._graveyard.popleft()[1])
+        if expired:
+            await run_in_threadpool(_unlink_all, expired)
+
+    def _retire(self, entry: CachedObject) -> None:
+        self._total_bytes -= entry.size
+        self._graveyard.append((time.monotonic() + EVICTION_GRACE_SECONDS, entry.path))
+
+
+def _unlink_all(paths: List[Path]) -> None:
+    for path in paths:
+        path.unlink(missing_ok=True)
+
+
+def _sweep_dead_workers(root: Path) -> None:
+    """Remove cache directories left behind by worker processes that no longer exist."""
+    if not root.is_dir():
+        return
+    for child in root.iterdir():
+        if not child.is_dir() or not child.name.isdigit():
+            continue
+        pid = int(child.name)
+        if pid == os.getpid():
+            continue
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            shutil.rmtree(child, ignore_errors=True)
+        except PermissionError:
+            continue
+
+
+@lru_cache(maxsize=1)
+def get_edge_cache() -> Optional[EdgeCache]:
+    settings = get_settings()
+    if not settings.edge_cache_enabled:
+        return None
+    cache = EdgeCache(
+        directory=settings.edge_cache_dir,
+        max_bytes=settings.edge_cache_max_bytes,
+        max_object_bytes=settings.edge_cache_max_object_bytes,
+        revalidate_seconds=settings.edge_cache_revalidate_seconds,
+    )
+    logger.info("Edge cache at %s (max %d bytes)", cache.directory, cache.max_bytes)
+    return cache
+
+
+def _peek_cache() -> Optional[EdgeCache]:
+    # Scrapes must not instantiate the cache as a side effect.
+    return get_edge_cache() if get_edge_cache.cache_info().currsize else None
+
+
+def _hit_ratio() -> float:
+    hits = cache_hits.value()
+    total = hits + cache_misses.value()
+    return hits / total if total else 0.0
+
+
+metrics.gauge("edge_cache_hit_ratio", "Edge cache hits / lookups", _hit_ratio)
+metrics.gauge("edge_cache_bytes", "Bytes currently held in the edge cache", lambda: getattr(_peek_cache(), "total_bytes", 0))
+metrics.gauge("edge_cache_entries", "Entries currently held in the edge cache", lambda: len(_peek_cache() or ()))
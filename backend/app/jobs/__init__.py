@@ -0,0 +1 @@
+"""Maintenance jobs, each runnable as ``python -m app.jobs.<name>``."""
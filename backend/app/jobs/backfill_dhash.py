@@ -0,0 +1,92 @@
+"""Compute ``Image.dhash`` for images stored before perceptual hashing existed.
+
+    python -m app.jobs.backfill_dhash [--batch-size 200] [--concurrency 4]
+
+Walks live images without a hash in id order, one keyset page at a time, so memory stays
+bounded by the batch no matter how large the table is. Each image is hashed from its
+thumbnail, or from the original when no thumbnail was built yet, in a thread pool of
+``--concurrency``; every batch commits on its own. Images that cannot be decoded keep a NULL
+hash. Safe to stop and rerun: hashed rows are skipped.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import logging
+from typing import Optional, Tuple
+
+from botocore.exceptions import ClientError
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select, update
+
+from ..config import get_settings
+from ..deps import SessionLocal, engine
+from ..models import Image
+from ..services import image_meta
+from ..services.thumbnails import thumb_key_for
+from ..storage import get_s3_client
+
+logger = logging.getLogger(__name__)
+
+
+def hash_stored_image(bucket: str, key: str, thumb_key: str) -> Optional[int]:
+    client = get_s3_client()
+    for source_bucket, source_key in ((get_settings().s3_bucket, thumb_key), (bucket, key)):
+        try:
+            data = client.get_object(Bucket=source_bucket, Key=source_key)["Body"].read()
+        except ClientError:
+            continue
+        return image_meta.dhash(data)
+    return None
+
+
+async def backfill(batch_size: int = 200, concurrency: int = 4) -> Tuple[int, int]:
+    """Hash every live image lacking a dhash; return ``(hashed, failed)``."""
+    limiter = asyncio.Semaphore(concurrency)
+
+    async def hash_row(row) -> Optional[int]:
+        async with limiter:
+            return await run_in_threadpool(hash_stored_image, row.bucket, row.key, thumb_key_for(row))
+
+    hashed = failed = 0
+    last_id = 0
+    while True:
+        async with SessionLocal() as session:
+            result = await session.execute(
+                select(Image.id, Image.bucket, Image.key)
+                .where(Image.dhash.is_(None), Image.deleted_at.is_(None), Image.id > last_id)
+                .order_by(Image.id)
+                .limit(batch_size)
+            )
+            rows = result.all()
+            if not rows:
+                return hashed, failed
+            hashes = await asyncio.gather(*(hash_row(row) for row in rows))
+            values = [{"id": row.id, "dhash": value} for row, value in zip(rows, hashes) if value is not None]
+            if values:
+                await session.execute(update(Image), values)
+                await session.commit()
+        hashed += len(values)
+        failed += len(rows) - len(values)
+        last_id = rows[-1].id
+        logger.info("Hashed up to image %s: %s done, %s failed", last_id, hashed, failed)
+
+
+async def _main(args: argparse.Namespace) -> None:
+    try:
+        hashed, failed = await backfill(args.batch_size, args.concurrency)
+    finally:
+        await engine.dispose()
+    logger.info("Backfill finished: %s hashed, %s could not be read or decoded", hashed, failed)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=4)
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,315 @@
+"""Monthly partitioning and archival of the ``user_extensions`` renewal audit trail.
+
+    python -m app.jobs.extension_history partition [--months-ahead 3]
+    python -m app.jobs.extension_history ensure [--months-ahead 3]
+    python -m app.jobs.extension_history archive [--keep-months 24] [--dry-run]
+
+``partition`` is opt-in, PostgreSQL only, and run once: it rebuilds the table as
+``PARTITION BY RANGE (created_at)`` with one partition per month from the oldest row to
+``--months-ahead`` past now, plus a DEFAULT partition for anything outside them. Rows are
+copied in a single transaction under an ACCESS EXCLUSIVE lock, so run it in a quiet window.
+``ensure`` keeps partitions ahead of the clock; schedule it monthly. Rows that already
+landed in DEFAULT for a month get moved into that month's new partition.
+
+``archive`` moves each whole month older than ``--keep-months`` to
+``<extension_archive_prefix>YYYY-MM.ndjson.gz`` in the bucket, then removes it from the
+table: a partitioned month is detached and dropped, otherwise its rows are deleted. Rows
+are read in keyset pages into a spooled temp file, so memory stays flat, and the
+upload's stored size is checked before anything is removed. Each month is one transaction;
+a failed run leaves the month in place and a rerun re-uploads it whole.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gzip
+import logging
+import re
+import sys
+import tempfile
+from datetime import datetime, timezone
+from typing import BinaryIO, List, Optional, Set, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+from pydantic_core import to_json
+from sqlalchemy import and_, delete, func, select, text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from ..config import get_settings
+from ..deps import engine
+from ..models import UserExtension
+from ..services.extensions import HISTORY_COLUMNS
+from ..storage import get_s3_client
+from ..utils.time import utc_now
+
+logger = logging.getLogger(__name__)
+
+TABLE = UserExtension.__tablename__
+DEFAULT_PARTITION = f"{TABLE}_default"
+_PARTITION_NAME = re.compile(rf"^{TABLE}_p(\d{{4}})_(\d{{2}})$")
+# Serialises these jobs against each other across hosts; DDL here must not interleave.
+LOCK_ID = 0x56455848
+
+
+def month_start(value: datetime) -> datetime:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def add_months(month: datetime, count: int) -> datetime:
+    years, index = divmod(month.month - 1 + count, 12)
+    return month.replace(year=month.year + years, month=index + 1)
+
+
+def partition_name(month: datetime) -> str:
+    return f"{TABLE}_p{month:%Y_%m}"
+
+
+async def _lock(conn: AsyncConnection) -> None:
+    await conn.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": LOCK_ID})
+
+
+async def is_partitioned(conn: AsyncConnection) -> bool:
+    if conn.dialect.name != "postgresql":
+        return False
+    result = await conn.scalar(
+        text("SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass(:table)"), {"table": TABLE}
+    )
+    return bool(result)
+
+
+async def partition_months(conn: AsyncConnection) -> Set[datetime]:
+    """Months that have their own partition (the DEFAULT partition is not one of them)."""
+    result = await conn.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid"
+            " WHERE i.inhparent = to_regclass(:table)"
+        ),
+        {"table": TABLE},
+    )
+    months = set()
+    for (name,) in result:
+        match = _PARTITION_NAME.match(name)
+        if match:
+            months.add(datetime(int(match[1]), int(match[2]), 1, tzinfo=timezone.utc))
+    return months
+
+
+async def create_partition(conn: AsyncConnection, month: datetime) -> None:
+    """Add ``month``'s partition, first moving any of its rows out of the DEFAULT partition.
+
+    PostgreSQL refuses a new partition whose range DEFAULT already holds rows for, so those
+    rows are carried over with DEFAULT briefly detached.
+    """
+    name, lower, upper = partition_name(month), month.isoformat(), add_months(month, 1).isoformat()
+    ddl = f"CREATE TABLE {name} PARTITION OF {TABLE} FOR VALUES FROM ('{lower}') TO ('{upper}')"
+    in_month = f"created_at >= '{lower}' AND created_at < '{upper}'"
+    has_default = await conn.scalar(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": DEFAULT_PARTITION})
+    stray = has_default and await conn.scalar(text(f"SELECT count(*) FROM {DEFAULT_PARTITION} WHERE {in_month}"))
+    if not stray:
+        await conn.exec_driver_sql(ddl)
+        return
+    await conn.exec_driver_sql(f"ALTER TABLE {TABLE} DETACH PARTITION {DEFAULT_PARTITION}")
+    await conn.exec_driver_sql(ddl)
+    await conn.exec_driver_sql(f"INSERT INTO {TABLE} SELECT * FROM {DEFAULT_PARTITION} WHERE {in_month}")
+    await conn.exec_driver_sql(f"DELETE FROM {DEFAULT_PARTITION} WHERE {in_month}")
+    await conn.exec_driver_sql(f"ALTER TABLE {TABLE} ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT")
+    logger.info("Moved %s rows from %s into %s", stray, DEFAULT_PARTITION, name)
+
+
+async def partition_table(months_ahead: int) -> bool:
+    """Convert the plain table to monthly range partitions; False if it already was one."""
+    async with engine.begin() as conn:
+        await _lock(conn)
+        if await is_partitioned(conn):
+            return False
+        await conn.exec_driver_sql(f"LOCK TABLE {TABLE} IN ACCESS EXCLUSIVE MODE")
+        indexes = (
+            await conn.execute(
+                text(
+                    "SELECT indexname, indexdef FROM pg_indexes WHERE schemaname = current_schema()"
+                    " AND tablename = :table AND indexname <> :pkey"
+                ),
+                {"table": TABLE, "pkey": f"{TABLE}_pkey"},
+            )
+        ).all()
+        foreign_keys = (
+            await conn.execute(
+                text(
+                    "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint"
+                    " WHERE conrelid = to_regclass(:table) AND contype = 'f'"
+                ),
+                {"table": TABLE},
+            )
+        ).all()
+        sequence = await conn.scalar(text("SELECT pg_get_serial_sequence(:table, 'id')"), {"table": TABLE})
+        oldest = await conn.scalar(select(func.min(UserExtension.created_at)))
+
+        old = f"{TABLE}_unpartitioned"
+        await conn.exec_driver_sql(f"ALTER TABLE {TABLE} RENAME TO {old}")
+        await conn.exec_driver_sql(f"ALTER TABLE {old} RENAME CONSTRAINT {TABLE}_pkey TO {old}_pkey")
+        await conn.exec_driver_sql(
+            f"CREATE TABLE {TABLE} (LIKE {old} INCLUDING DEFAULTS) PARTITION BY RANGE (created_at)"
+        )
+        # A partitioned table's primary key must contain the partition key; id stays unique
+        # on its own through the sequence.
+        await conn.exec_driver_sql(f"ALTER TABLE {TABLE} ADD CONSTRAINT {TABLE}_pkey PRIMARY KEY (id, created_at)")
+        for name, definition in foreign_keys:
+            await conn.exec_driver_sql(f"ALTER TABLE {TABLE} ADD CONSTRAINT {name} {definition}")
+        month, last = month_start(oldest or utc_now()), add_months(month_start(utc_now()), months_ahead)
+        while month <= last:
+            await create_partition(conn, month)
+            month = add_months(month, 1)
+        await conn.exec_driver_sql(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {TABLE} DEFAULT")
+        copied = (await conn.exec_driver_sql(f"INSERT INTO {TABLE} SELECT * FROM {old}")).rowcount
+        if sequence:
+            await conn.exec_driver_sql(f"ALTER SEQUENCE {sequence} OWNED BY {TABLE}.id")
+        await conn.exec_driver_sql(f"DROP TABLE {old}")
+        # Definitions still name the table, which now is the partitioned parent; each index
+        # cascades to every partition, present and future.
+        for _name, definition in indexes:
+            await conn.exec_driver_sql(definition)
+        await conn.exec_driver_sql(f"ANALYZE {TABLE}")
+    logger.info("Partitioned %s by month: %s rows copied", TABLE, copied)
+    return True
+
+
+async def ensure_partitions(months_ahead: int) -> List[str]:
+    """Create any missing partition from this month to ``months_ahead`` months out."""
+    created = []
+    async with engine.begin() as conn:
+        await _lock(conn)
+        if not await is_partitioned(conn):
+            logger.warning("%s is not partitioned; run the partition command first", TABLE)
+            return created
+        existing = await partition_months(conn)
+        month = month_start(utc_now())
+        for _ in range(months_ahead + 1):
+            if month not in existing:
+                await create_partition(conn, month)
+                created.append(partition_name(month))
+            month = add_months(month, 1)
+    return created
+
+
+def _upload(spool: BinaryIO, key: str, size: int, rows: int) -> None:
+    client = get_s3_client()
+    bucket = get_settings().s3_bucket
+    client.upload_fileobj(
+        spool, bucket, key, ExtraArgs={"ContentType": "application/gzip", "Metadata": {"rows": str(rows)}}
+    )
+    stored = client.head_object(Bucket=bucket, Key=key)["ContentLength"]
+    if stored != size:
+        raise RuntimeError(f"Archive {key} stored {stored} bytes, wrote {size}; keeping the rows")
+
+
+async def _dump(conn: AsyncConnection, in_month, spool: BinaryIO) -> Tuple[int, Optional[int]]:
+    """Write the month's rows as gzipped NDJSON in id order; return ``(rows, last id)``.
+
+    Keyset pages rather than a server-side cursor: an open cursor would pin the partition
+    that is dropped later in the same transaction.
+    """
+    rows, last_id = 0, 0
+    batch_size = get_settings().export_batch_size
+    with gzip.GzipFile(fileobj=spool, mode="wb", mtime=0) as archive:
+        while True:
+            query = select(*HISTORY_COLUMNS).where(in_month, UserExtension.id > last_id)
+            batch = (await conn.execute(query.order_by(UserExtension.id).limit(batch_size))).mappings().all()
+            if not batch:
+                break
+            archive.write(b"".join(to_json(dict(row)) + b"\n" for row in batch))
+            rows += len(batch)
+            last_id = batch[-1]["id"]
+    return rows, last_id if rows else None
+
+
+async def archive_month(month: datetime, dry_run: bool = False) -> int:
+    """Upload ``month`` to the archive and remove it from the table; return its row count."""
+    lower, upper = month, add_months(month, 1)
+    in_month = and_(UserExtension.created_at >= lower, UserExtension.created_at < upper)
+    key = f"{get_settings().extension_archive_prefix}{month:%Y-%m}.ndjson.gz"
+    async with engine.begin() as conn:
+        partition = None
+        if conn.dialect.name == "postgresql":
+            await _lock(conn)
+            if month in await partition_months(conn):
+                partition = partition_name(month)
+        if dry_run:
+            rows = await conn.scalar(select(func.count()).select_from(UserExtension).where(in_month))
+            logger.info("%s: %s rows would go to %s", f"{month:%Y-%m}", rows, key)
+            return rows
+        if partition:
+            # Holds off writes to the month while it is dumped, without blocking readers.
+            await conn.exec_driver_sql(f"LOCK TABLE {partition} IN SHARE MODE")
+        with tempfile.SpooledTemporaryFile(max_size=16 * 1024 * 1024) as spool:
+            rows, last_id = await _dump(conn, in_month, spool)
+            if rows:
+                size = spool.tell()
+                spool.seek(0)
+                await run_in_threadpool(_upload, spool, key, size, rows)
+        if partition:
+            await conn.exec_driver_sql(f"ALTER TABLE {TABLE} DETACH PARTITION {partition}")
+            await conn.exec_driver_sql(f"DROP TABLE {partition}")
+        elif rows:
+            await conn.execute(delete(UserExtension).where(in_month, UserExtension.id <= last_id))
+    logger.info("%s: archived %s rows to %s", f"{month:%Y-%m}", rows, key)
+    return rows
+
+
+async def archive(keep_months: int, dry_run: bool = False) -> int:
+    """Archive every month that ended more than ``keep_months`` months ago, oldest first."""
+    cutoff = add_months(month_start(utc_now()), -keep_months)
+    months: Set[datetime] = set()
+    async with engine.connect() as conn:
+        oldest = await conn.scalar(select(func.min(UserExtension.created_at)).where(UserExtension.created_at < cutoff))
+        if await is_partitioned(conn):
+            # Empty partitions past retention are dropped too.
+            months.update(month for month in await partition_months(conn) if month < cutoff)
+    if oldest is not None:
+        month = month_start(oldest)
+        while month < cutoff:
+            months.add(month)
+            month = add_months(month, 1)
+    total = 0
+    for month in sorted(months):
+        total += await archive_month(month, dry_run)
+    return total
+
+
+async def _main(args: argparse.Namespace) -> None:
+    try:
+        if args.command == "archive":
+            total = await archive(args.keep_months, args.dry_run)
+            logger.info("Archive %s: %s rows", "planned" if args.dry_run else "finished", total)
+            return
+        if engine.dialect.name != "postgresql":
+            sys.exit("partitioning is a PostgreSQL feature; point DATABASE_URL at one")
+        if args.command == "partition":
+            if not await partition_table(args.months_ahead):
+                logger.info("%s is already partitioned", TABLE)
+        created = await ensure_partitions(args.months_ahead)
+        logger.info("Partitions created: %s", ", ".join(created) or "none")
+    finally:
+        await engine.dispose()
+
+
+def main() -> None:
+    settings = get_settings()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name in ("partition", "ensure"):
+        command = commands.add_parser(name)
+        command.add_argument("--months-ahead", type=int, default=settings.extension_partition_months_ahead)
+    command = commands.add_parser("archive")
+    command.add_argument("--keep-months", type=int, default=settings.extension_retention_months)
+    command.add_argument("--dry-run", action="store_true", help="report what would be archived, change nothing")
+    args = parser.parse_args()
+    if args.command == "archive" and args.keep_months < 1:
+        parser.error("--keep-months (or EXTENSION_RETENTION_MONTHS) must be at least 1")
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main(args))
+
+
+if __name__ == "__main__":
+    main()
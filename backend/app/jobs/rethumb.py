@@ -0,0 +1,224 @@
+"""Regenerate the ``.thumb`` object of every live image, e.g. after changing thumbnail settings.
+
+    python -m app.jobs.rethumb [--workers N] [--prefetch N] [--uploads 8] [--batch-size 256]
+                               [--missing-only] [--checkpoint .rethumb-checkpoint.json] [--restart]
+
+Thumbnails are otherwise built lazily, by whichever request first asks for one; this job
+renders them ahead of the viewers. Live images are read in id order one keyset page at a
+time. Within a page each image moves through three stages as soon as the previous one
+finishes: its original is downloaded (at most ``--prefetch`` held at once, which bounds
+memory), decoded and resized in a process pool of ``--workers`` (default: the cores this
+process may run on), and uploaded ``--uploads`` at a time. Once a page is done its
+thumbnails' dominant colour and dhash are stored and its last id is written to the
+``--checkpoint`` file, so a stopped run resumes after the last finished page. The
+checkpoint remembers the thumbnail settings it was made with; a run under different
+settings starts over, and a finished run removes it. ``--missing-only`` renders only
+thumbnails that do not exist yet, which backfills without redoing the rest.
+
+Throughput is logged per page and at the end: images/s, images/s per worker core, and the
+CPU time one render takes.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from botocore.exceptions import ClientError
+from fastapi.concurrency import run_in_threadpool
+from PIL import Image as PILImage, UnidentifiedImageError
+from sqlalchemy import select, update
+
+from ..config import get_settings
+from ..deps import SessionLocal, engine
+from ..models import Image
+from ..services import image_meta
+from ..services.thumbnails import make_thumb, thumb_key_for
+from ..storage import get_s3_client
+
+logger = logging.getLogger(__name__)
+
+RENDER_ERRORS = (UnidentifiedImageError, PILImage.DecompressionBombError, OSError, SyntaxError, ValueError)
+
+
+def available_cores() -> int:
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def render(original: bytes, max_size: int, quality: int) -> Tuple[bytes, str, Optional[str], Optional[int], float]:
+    """Runs in a pool process: thumbnail, its colour and dhash, and the CPU seconds spent."""
+    started = time.process_time()
+    data, mime = make_thumb(original, max_size, quality)
+    color, dhash = image_meta.dominant_color(data), image_meta.dhash(data)
+    return data, mime, color, dhash, time.process_time() - started
+
+
+def _fetch(bucket: str, key: str) -> Optional[bytes]:
+    try:
+        return get_s3_client().get_object(Bucket=bucket, Key=key)["Body"].read()
+    except ClientError as exc:
+        logger.warning("Skipping %s/%s: %s", bucket, key, exc)
+        return None
+
+
+def _exists(key: str) -> bool:
+    try:
+        get_s3_client().head_object(Bucket=get_settings().s3_bucket, Key=key)
+    except ClientError:
+        return False
+    return True
+
+
+def _upload(key: str, data: bytes, mime: str) -> None:
+    get_s3_client().put_object(Bucket=get_settings().s3_bucket, Key=key, Body=data, ContentType=mime)
+
+
+@dataclass
+class Progress:
+    rendered: int = 0
+    skipped: int = 0
+    failed: int = 0
+    cpu_seconds: float = 0.0
+    started: float = 0.0
+
+    def report(self, workers: int) -> str:
+        elapsed = max(time.perf_counter() - self.started, 1e-9)
+        rate = self.rendered / elapsed
+        cpu_ms = self.cpu_seconds / self.rendered * 1000 if self.rendered else 0.0
+        return (
+            f"{self.rendered} rendered, {self.skipped} skipped, {self.failed} failed in {elapsed:.1f}s:"
+            f" {rate:.1f} images/s, {rate / workers:.2f} images/s/core, {cpu_ms:.0f} ms CPU per render"
+        )
+
+
+def _load_checkpoint(path: Path, fingerprint: Dict[str, Any]) -> int:
+    """Last finished id from ``path``, or 0 when there is none or it was made under other settings."""
+    try:
+        state = json.loads(path.read_text())
+    except FileNotFoundError:
+        return 0
+    if state.get("settings") != fingerprint:
+        logger.info("Checkpoint %s was made with other thumbnail settings; starting over", path)
+        return 0
+    logger.info("Resuming after image %s", state["last_id"])
+    return int(state["last_id"])
+
+
+def _save_checkpoint(path: Path, last_id: int, fingerprint: Dict[str, Any]) -> None:
+    partial = path.with_name(path.name + ".tmp")
+    partial.write_text(json.dumps({"last_id": last_id, "settings": fingerprint}))
+    partial.replace(path)
+
+
+async def rethumb(
+    workers: int,
+    prefetch: int,
+    uploads: int,
+    batch_size: int = 256,
+    missing_only: bool = False,
+    checkpoint: Optional[Path] = None,
+    restart: bool = False,
+) -> Progress:
+    """Re-render the thumbnails of every live image; return the counts."""
+    settings = get_settings()
+    fingerprint = {"thumb_max_size": settings.thumb_max_size, "thumb_quality": settings.thumb_quality}
+    last_id = 0 if checkpoint is None or restart else _load_checkpoint(checkpoint, fingerprint)
+    originals = asyncio.Semaphore(prefetch)
+    upload_slots = asyncio.Semaphore(uploads)
+    progress = Progress(started=time.perf_counter())
+    loop = asyncio.get_running_loop()
+
+    # spawn, not fork: this process already runs boto3 and event loop threads.
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+
+        async def process(row) -> Optional[Dict[str, Any]]:
+            key = thumb_key_for(row)
+            if missing_only and await run_in_threadpool(_exists, key):
+                progress.skipped += 1
+                return None
+            async with originals:
+                original = await run_in_threadpool(_fetch, row.bucket, row.key)
+                if original is None:
+                    progress.failed += 1
+                    return None
+                try:
+                    data, mime, color, dhash, cpu = await loop.run_in_executor(
+                        pool, render, original, settings.thumb_max_size, settings.thumb_quality
+                    )
+                except RENDER_ERRORS as exc:
+                    logger.warning("Could not render image %s: %s", row.id, exc)
+                    progress.failed += 1
+                    return None
+            async with upload_slots:
+                await run_in_threadpool(_upload, key, data, mime)
+            progress.rendered += 1
+            progress.cpu_seconds += cpu
+            return {"id": row.id, "dominant_color": color, "dhash": dhash}
+
+        while True:
+            async with SessionLocal() as session:
+                result = await session.execute(
+                    select(Image.id, Image.bucket, Image.key)
+                    .where(Image.deleted_at.is_(None), Image.id > last_id)
+                    .order_by(Image.id)
+                    .limit(batch_size)
+                )
+                rows = result.all()
+            if not rows:
+                break
+            values = [value for value in await asyncio.gather(*(process(row) for row in rows)) if value]
+            if values:
+                async with SessionLocal() as session:
+                    await session.execute(update(Image), values)
+                    await session.commit()
+            last_id = rows[-1].id
+            if checkpoint is not None:
+                _save_checkpoint(checkpoint, last_id, fingerprint)
+            logger.info("Up to image %s: %s", last_id, progress.report(workers))
+
+    if checkpoint is not None:
+        checkpoint.unlink(missing_ok=True)
+    return progress
+
+
+async def _main(args: argparse.Namespace) -> None:
+    try:
+        progress = await rethumb(
+            args.workers,
+            args.prefetch or 2 * args.workers,
+            args.uploads,
+            args.batch_size,
+            args.missing_only,
+            Path(args.checkpoint),
+            args.restart,
+        )
+    finally:
+        await engine.dispose()
+    logger.info("Re-thumbnailing finished on %s cores: %s", args.workers, progress.report(args.workers))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=available_cores(), help="render processes")
+    parser.add_argument("--prefetch", type=int, default=0, help="originals held at once (default: 2 per worker)")
+    parser.add_argument("--uploads", type=int, default=8, help="concurrent thumbnail uploads")
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--missing-only", action="store_true", help="only build thumbnails that do not exist yet")
+    parser.add_argument("--checkpoint", default=".rethumb-checkpoint.json")
+    parser.add_argument("--restart", action="store_true", help="ignore an existing checkpoint")
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
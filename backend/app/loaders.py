@@ -0,0 +1,110 @@
+"""Request-scoped batching for related-row lookups, so list endpoints never load one row per row.
+
+The relationships these replace (``Image.uploader_admin``, ``UserImage.granted_by_admin``,
+``UserExtension.admin``, ``UsageLog.user``) are ``lazy="raise_on_sql"``: touching one that
+was not loaded up front fails loudly instead of issuing a query per row (or raising
+``MissingGreenlet`` under asyncio). List endpoints read plain rows and resolve names
+through ``RequestLoaders``; an ORM query that does need the entities must load them up
+front with ``selectinload``.
+"""
+from __future__ import annotations
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Generic, Hashable, Iterable, List, Mapping, Optional, TypeVar
+
+from fastapi import Depends
+from sqlalchemy import RowMapping, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .deps import get_db
+from .models import Admin, User
+from .utils.db import any_of
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class BatchLoader(Generic[K, V]):
+    """Coalesce ``load(key)`` calls made before the event loop next turns into one batch call.
+
+    ``batch_fn`` gets distinct keys, at most ``max_batch_size`` at a time, and returns
+    ``{key: value}``; keys it leaves out load as None. Results are memoised for the
+    loader's lifetime, which is one request.
+    """
+
+    def __init__(self, batch_fn: Callable[[List[K]], Awaitable[Mapping[K, V]]], max_batch_size: int = 1000) -> None:
+        self._batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self._results: Dict[K, asyncio.Future] = {}
+        self._queue: List[K] = []
+        self._dispatch_task: Optional[asyncio.Task] = None
+        self.batches = 0
+
+    def load(self, key: K) -> "asyncio.Future[Optional[V]]":
+        future = self._results.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._results[key] = loop.create_future()
+            if not self._queue:
+                loop.call_soon(self._schedule_dispatch)
+            self._queue.append(key)
+        return future
+
+    async def load_many(self, keys: Iterable[K]) -> List[Optional[V]]:
+        return list(await asyncio.gather(*(self.load(key) for key in keys)))
+
+    def _schedule_dispatch(self) -> None:
+        self._dispatch_task = asyncio.ensure_future(self._dispatch())
+
+    async def _dispatch(self) -> None:
+        keys, self._queue = self._queue, []
+        for start in range(0, len(keys), self.max_batch_size):
+            batch = keys[start : start + self.max_batch_size]
+            self.batches += 1
+            try:
+                found = await self._batch_fn(batch)
+            except Exception as exc:
+                for key in batch:
+                    # Forget failures so a later load retries instead of replaying the error.
+                    self._results.pop(key).set_exception(exc)
+                continue
+            for key in batch:
+                self._results[key].set_result(found.get(key))
+
+
+class RequestLoaders:
+    """Batch loaders bound to one request's session; inject with ``Depends(get_loaders)``.
+
+    Batches run one at a time on the session. Await every load before using the session
+    for anything else, since an ``AsyncSession`` must not run two statements at once.
+    """
+
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+        self._lock = asyncio.Lock()
+        self.admins: BatchLoader[int, RowMapping] = BatchLoader(self._by_id(Admin.id, Admin.username))
+        self.users: BatchLoader[int, RowMapping] = BatchLoader(self._by_id(User.id, User.username))
+
+    def _by_id(self, id_column, *columns) -> Callable[[List[int]], Awaitable[Dict[int, RowMapping]]]:
+        async def fetch(ids: List[int]) -> Dict[int, RowMapping]:
+            async with self._lock:
+                result = await self.session.execute(
+                    select(id_column, *columns).where(any_of(self.session, id_column, ids))
+                )
+            return {row["id"]: row for row in result.mappings()}
+
+        return fetch
+
+
+async def get_loaders(session: AsyncSession = Depends(get_db)) -> RequestLoaders:
+    return RequestLoaders(session)
+
+
+async def with_names(
+    rows: Iterable[Mapping[str, Any]], loader: BatchLoader[int, RowMapping], id_field: str, name_field: str
+) -> List[Dict[str, Any]]:
+    """Copy ``rows`` with ``name_field`` set to the username ``loader`` finds for ``row[id_field]``."""
+    rows = list(rows)
+    refs = await loader.load_many({row[id_field] for row in rows if row[id_field] is not None})
+    names = {ref["id"]: ref["username"] for ref in refs if ref is not None}
+    return [{**row, name_field: names.get(row[id_field])} for row in rows]
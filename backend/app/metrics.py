@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import threading
+from typing import Callable, Dict, List, Optional, Tuple
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class Counter:
+    """Monotonic in-process counter, optionally split by labels."""
+
+    def __init__(self, name: str, help_text: str) -> None:
+        self.name = name
+        self.help_text = help_text
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(tuple(sorted(labels.items())), 0.0)
+
+    def samples(self) -> List[Tuple[LabelKey, float]]:
+        with self._lock:
+            return list(self._values.items())
+
+
+class Gauge:
+    """Gauge whose value is computed on scrape by a callback."""
+
+    def __init__(self, name: str, help_text: str, func: Callable[[], float]) -> None:
+        self.name = name
+        self.help_text = help_text
+        self._func = func
+
+    def samples(self) -> List[Tuple[LabelKey, float]]:
+        return [((), float(self._func()))]
+
+
+_registry: Dict[str, Counter | Gauge] = {}
+_registry_lock = threading.Lock()
+
+
+def counter(name: str, help_text: str) -> Counter:
+    with _registry_lock:
+        existing = _registry.get(name)
+        if isinstance(existing, Counter):
+            return existing
+        metric = Counter(name, help_text)
+        _registry[name] = metric
+        return metric
+
+
+def gauge(name: str, help_text: str, func: Callable[[], float]) -> Gauge:
+    with _registry_lock:
+        metric = Gauge(name, help_text, func)
+        _registry[name] = metric
+        return metric
+
+
+def get_metric(name: str) -> Optional[Counter | Gauge]:
+    return _registry.get(name)
+
+
+def _format_labels(labels: LabelKey) -> str:
+    if not labels:
+        return ""
+    inner = ",".join(f'{k}="{v}"' for k, v in labels)
+    return "{" + inner + "}"
+
+
+def render_prometheus() -> str:
+    """Render all registered metrics in the Prometheus text exposition format."""
+    lines: List[str] = []
+    with _registry_lock:
+        metrics = list(_registry.values())
+    for metric in metrics:
+        kind = "counter" if isinstance(metric, Counter) else "gauge"
+        lines.append(f"# HELP {metric.name} {metric.help_text}")
+        lines.append(f"# TYPE {metric.name} {kind}")
+        for labels, value in metric.samples() or [((), 0.0)]:
+            lines.append(f"{metric.name}{_format_labels(labels)} {value:g}")
+    return "\n".join(lines) + "\n"
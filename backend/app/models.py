@@ -3,17 +3,22 @@ from enum import Enum
 from typing import List, Optional
 
 from sqlalchemy import (
+    DDL,
+    BigInteger,
     Boolean,
     CheckConstraint,
     ColumnElement,
     DateTime,
     Enum as PgEnum,
     ForeignKey,
+    Index,
     Integer,
     String,
     Text,
     UniqueConstraint,
+    event,
     func,
+    literal_column,
 )
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
@@ -22,11 +27,47 @@ class Base(DeclarativeBase):
     pass
 
 
+# Trigram indexes below need pg_trgm; make create_all (legacy boot path) install it first.
+event.listen(
+    Base.metadata,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql"),
+)
+
+
+def trigram_index(name: str, column: str, **kwargs) -> Index:
+    """GIN trigram index serving ILIKE '%q%' and word-similarity search; PostgreSQL only."""
+    return Index(
+        name, column, postgresql_using="gin", postgresql_ops={column: "gin_trgm_ops"}, **kwargs
+    ).ddl_if(dialect="postgresql")
+
+
+# Perceptual hashes are split into bands for near-duplicate lookup: two hashes within
+# Hamming distance d agree on some band to within d // DHASH_BANDS bits (pigeonhole).
+DHASH_BANDS = 4
+DHASH_BAND_BITS = 16
+
+
+def dhash_band(column, band: int) -> ColumnElement[int]:
+    """SQL for one band of a 64-bit hash column, matching the expression indexes on it.
+
+    Shift and mask are rendered as literals, not bound parameters, so the planner can match
+    the query against the index expression.
+    """
+    shifted = column.op(">>")(literal_column(str(band * DHASH_BAND_BITS)))
+    return shifted.op("&")(literal_column(str((1 << DHASH_BAND_BITS) - 1)))
+
+
 class StatusEnum(str, Enum):
     active = "active"
     disabled = "disabled"
 
 
+class GrantChangeEnum(str, Enum):
+    added = "added"
+    removed = "removed"
+
+
 class Admin(Base):
     __tablename__ = "admins"
 
@@ -37,6 +78,8 @@ class Admin(Base):
     status: Mapped[StatusEnum] = mapped_column(PgEnum(StatusEnum), default=StatusEnum.active, nullable=False)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
     last_login_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
+    # Bumping this invalidates every refresh token issued to the account.
+    token_version: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
 
     images: Mapped[List["Image"]] = relationship(back_populates="uploader_admin")
 
@@ -52,6 +95,10 @@ class User(Base):
     expires_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
     extended_until: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
     notes: Mapped[Optional[str]] = mapped_column(Text)
+    # Bumped whenever the user's image grants change; drives incremental client sync.
+    grants_version: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
+    # Bumping this invalidates every refresh token issued to the account.
+    token_version: Mapped[int] = mapped_column(Integer, default=0, server_default="0", nullable=False)
 
     assignments: Mapped[List["UserImage"]] = relationship(
         back_populates="user",
@@ -59,6 +106,14 @@ class User(Base):
         passive_deletes=True,
     )
 
+    __table_args__ = (
+        Index("ix_users_created_at", "created_at"),
+        Index("ix_users_status", "status"),
+        Index("ix_users_expires_at", "expires_at", postgresql_where=expires_at.is_not(None)),
+        trigram_index("ix_users_username_trgm", "username"),
+        trigram_index("ix_users_notes_trgm", "notes"),
+    )
+
 
 class Image(Base):
     __tablename__ = "images"
@@ -70,18 +125,38 @@ class Image(Base):
     mime_type: Mapped[Optional[str]] = mapped_column(String(128))
     size_bytes: Mapped[Optional[int]] = mapped_column(Integer)
     checksum_sha256: Mapped[Optional[str]] = mapped_column(String(128))
+    width: Mapped[Optional[int]] = mapped_column(Integer)
+    height: Mapped[Optional[int]] = mapped_column(Integer)
+    orientation: Mapped[Optional[int]] = mapped_column(Integer)
+    image_format: Mapped[Optional[str]] = mapped_column(String(16))
+    dominant_color: Mapped[Optional[str]] = mapped_column(String(7))
     uploader_admin_id: Mapped[Optional[int]] = mapped_column(ForeignKey("admins.id", ondelete="SET NULL"))
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
     deleted_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
+    # 64-bit difference hash of the thumbnail, stored signed; NULL until computed.
+    dhash: Mapped[Optional[int]] = mapped_column(BigInteger)
 
-    uploader_admin: Mapped[Optional[Admin]] = relationship(back_populates="images")
+    # raise_on_sql: list endpoints batch these through app.loaders; ORM queries selectinload them.
+    uploader_admin: Mapped[Optional[Admin]] = relationship(back_populates="images", lazy="raise_on_sql")
     assignments: Mapped[List["UserImage"]] = relationship(
         back_populates="image",
         cascade="all, delete-orphan",
         passive_deletes=True,
     )
 
-    __table_args__ = (UniqueConstraint("bucket", "key", name="uq_image_bucket_key"),)
+    __table_args__ = (
+        UniqueConstraint("bucket", "key", name="uq_image_bucket_key"),
+        # Listings only ever show live images; soft-deleted rows stay out of the index.
+        Index("ix_images_live_created_at", "created_at", postgresql_where=deleted_at.is_(None)),
+        Index("ix_images_checksum_sha256", "checksum_sha256", postgresql_where=checksum_sha256.is_not(None)),
+        trigram_index("ix_images_filename_trgm", "filename", postgresql_where=deleted_at.is_(None)),
+        trigram_index("ix_images_key_trgm", "key", postgresql_where=deleted_at.is_(None)),
+        # One per band (DHASH_BANDS); similar-image lookups OR these together.
+        Index("ix_images_dhash_band0", dhash_band(dhash, 0), postgresql_where=dhash.is_not(None) & deleted_at.is_(None)),
+        Index("ix_images_dhash_band1", dhash_band(dhash, 1), postgresql_where=dhash.is_not(None) & deleted_at.is_(None)),
+        Index("ix_images_dhash_band2", dhash_band(dhash, 2), postgresql_where=dhash.is_not(None) & deleted_at.is_(None)),
+        Index("ix_images_dhash_band3", dhash_band(dhash, 3), postgresql_where=dhash.is_not(None) & deleted_at.is_(None)),
+    )
 
 
 class UserImage(Base):
@@ -96,9 +171,30 @@ class UserImage(Base):
 
     user: Mapped[User] = relationship(back_populates="assignments")
     image: Mapped[Image] = relationship(back_populates="assignments")
-    granted_by_admin: Mapped[Optional[Admin]] = relationship()
+    granted_by_admin: Mapped[Optional[Admin]] = relationship(lazy="raise_on_sql")
+
+    # One covering index per direction. expires_at is included so membership and expiry
+    # checks never touch the heap; ON CONFLICT (user_id, image_id) relies on the unique one.
+    __table_args__ = (
+        Index("uq_user_image", "user_id", "image_id", unique=True, postgresql_include=["expires_at"]),
+        Index("ix_user_images_image_user", "image_id", "user_id", postgresql_include=["expires_at"]),
+    )
+
 
-    __table_args__ = (UniqueConstraint("user_id", "image_id", name="uq_user_image"),)
+class UserImageChange(Base):
+    """Append-only log of grant changes, one row per image per ``User.grants_version`` bump."""
+
+    __tablename__ = "user_image_changes"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    user_id: Mapped[int] = mapped_column(ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    # No FK: removals must outlive the image they refer to.
+    image_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    version: Mapped[int] = mapped_column(Integer, nullable=False)
+    op: Mapped[GrantChangeEnum] = mapped_column(PgEnum(GrantChangeEnum), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (Index("ix_user_image_changes_user_version", "user_id", "version"),)
 
 
 class UserExtension(Base):
@@ -113,7 +209,13 @@ class UserExtension(Base):
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
 
     user: Mapped[User] = relationship()
-    admin: Mapped[Optional[Admin]] = relationship()
+    admin: Mapped[Optional[Admin]] = relationship(lazy="raise_on_sql")
+
+    __table_args__ = (
+        Index("ix_user_extensions_user_created", "user_id", "created_at", "id"),
+        Index("ix_user_extensions_admin_created", "operated_by_admin_id", "created_at", "id"),
+        Index("ix_user_extensions_created", "created_at", "id"),
+    )
 
 
 class UsageLog(Base):
@@ -128,5 +230,25 @@ class UsageLog(Base):
     success: Mapped[bool] = mapped_column(Boolean, default=True)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
 
-    user: Mapped[Optional[User]] = relationship()
+    user: Mapped[Optional[User]] = relationship(lazy="raise_on_sql")
     admin: Mapped[Optional[Admin]] = relationship()
+
+    __table_args__ = (Index("ix_usage_logs_user_created_at", "user_id", "created_at"),)
+
+
+class RefreshToken(Base):
+    """Hashed refresh token; each rotation revokes the old row and adds a new one to the same family."""
+
+    __tablename__ = "refresh_tokens"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    token_hash: Mapped[str] = mapped_column(String(64), unique=True, nullable=False)
+    family_id: Mapped[str] = mapped_column(String(36), nullable=False)
+    role: Mapped[str] = mapped_column(String(16), nullable=False)
+    subject_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    token_version: Mapped[int] = mapped_column(Integer, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    revoked_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True))
+
+    __table_args__ = (Index("ix_refresh_tokens_family_id", "family_id"),)
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+import math
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Optional, Protocol, Tuple
+
+from fastapi import HTTPException, Request, status
+
+from . import metrics
+from .config import get_settings
+
+throttled_attempts = metrics.counter("login_throttled_total", "Login attempts rejected before any DB or hash work")
+failed_logins = metrics.counter("login_failures_total", "Login attempts with bad credentials")
+lockouts = metrics.counter("login_lockouts_total", "Usernames placed under an exponential lockout")
+
+
+class RateLimitBackend(Protocol):
+    """Storage for limiter state, shaped after what a shared store (e.g. Redis) offers.
+
+    Every method must be atomic per key so several workers can share one backend.
+    """
+
+    async def take(self, key: str, capacity: float, refill_per_second: float) -> float:
+        """Take one token from ``key``'s bucket; return 0 if granted, else seconds until one is available."""
+
+    async def incr(self, key: str, ttl_seconds: float) -> int:
+        """Increment a counter that expires ``ttl_seconds`` after its last increment; return the new value."""
+
+    async def delete(self, key: str) -> None:
+        ...
+
+    async def set_until(self, key: str, until: float) -> None:
+        """Store a wall-clock deadline for ``key`` that expires on its own once passed."""
+
+    async def get_until(self, key: str) -> Optional[float]:
+        ...
+
+
+class LocalRateLimitBackend:
+    """In-process backend for single-worker deployments and tests.
+
+    All state lives in bounded LRU maps so a flood of distinct IPs cannot grow memory
+    without limit. Methods never await, which makes them atomic on the event loop.
+    """
+
+    def __init__(self, max_keys: int = 100_000) -> None:
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._counters: "OrderedDict[str, Tuple[int, float]]" = OrderedDict()
+        self._deadlines: "OrderedDict[str, float]" = OrderedDict()
+
+    def _remember(self, store: OrderedDict, key: str, value) -> None:
+        store[key] = value
+        store.move_to_end(key)
+        while len(store) > self.max_keys:
+            store.popitem(last=False)
+
+    async def take(self, key: str, capacity: float, refill_per_second: float) -> float:
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * refill_per_second)
+        if tokens >= 1:
+            self._remember(self._buckets, key, (tokens - 1, now))
+            return 0.0
+        self._remember(self._buckets, key, (tokens, now))
+        return (1 - tokens) / refill_per_second
+
+    async def incr(self, key: str, ttl_seconds: float) -> int:
+        now = time.monotonic()
+        count, expires = self._counters.get(key, (0, now))
+        count = count + 1 if expires > now else 1
+        self._remember(self._counters, key, (count, now + ttl_seconds))
+        return count
+
+    async def delete(self, key: str) -> None:
+        self._counters.pop(key, None)
+        self._deadlines.pop(key, None)
+
+    async def set_until(self, key: str, until: float) -> None:
+        self._remember(self._deadlines, key, until)
+
+    async def get_until(self, key: str) -> Optional[float]:
+        until = self._deadlines.get(key)
+        if until is not None and until <= time.time():
+            self._deadlines.pop(key, None)
+            return None
+        return until
+
+
+class LoginThrottle:
+    """Token buckets per client IP and per username, plus exponential lockout on repeated failures."""
+
+    def __init__(self, backend: RateLimitBackend) -> None:
+        self.backend = backend
+
+    @staticmethod
+    def client_ip(request: Request) -> str:
+        return request.client.host if request.client else "unknown"
+
+    async def check(self, request: Request, scope: str, username: str) -> None:
+        """Raise 429 if this attempt must be refused. Call before touching the DB or bcrypt."""
+        settings = get_settings()
+        if not settings.login_rate_limit_enabled:
+            return
+        ip = self.client_ip(request)
+        locked_until = await self.backend.get_until(f"login:lock:{scope}:{username}")
+        if locked_until is not None:
+            self._reject("lockout", locked_until - time.time())
+        wait = await self.backend.take(f"login:ip:{ip}", settings.login_ip_burst, settings.login_ip_per_minute / 60.0)
+        if wait:
+            self._reject("ip", wait)
+        wait = await self.backend.take(
+            f"login:user:{scope}:{username}", settings.login_user_burst, settings.login_user_per_minute / 60.0
+        )
+        if wait:
+            self._reject("username", wait)
+
+    async def record_failure(self, scope: str, username: str) -> None:
+        settings = get_settings()
+        failed_logins.inc(scope=scope)
+        if not settings.login_rate_limit_enabled:
+            return
+        failures = await self.backend.incr(f"login:fail:{scope}:{username}", settings.login_lockout_max_seconds)
+        over = failures - settings.login_lockout_threshold
+        if over >= 0:
+            duration = min(settings.login_lockout_base_seconds * (2 ** min(over, 32)), settings.login_lockout_max_seconds)
+            await self.backend.set_until(f"login:lock:{scope}:{username}", time.time() + duration)
+            lockouts.inc(scope=scope)
+
+    async def record_success(self, scope: str, username: str) -> None:
+        if not get_settings().login_rate_limit_enabled:
+            return
+        await self.backend.delete(f"login:fail:{scope}:{username}")
+
+    @staticmethod
+    def _reject(reason: str, retry_after: float) -> None:
+        throttled_attempts.inc(reason=reason)
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+
+
+@lru_cache(maxsize=1)
+def get_login_throttle() -> LoginThrottle:
+    return LoginThrottle(LocalRateLimitBackend())
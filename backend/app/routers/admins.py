@@ -5,13 +5,17 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from .. import schemas
 from ..deps import get_current_admin, get_db, require_superadmin
 from ..models import Admin, StatusEnum
-from ..security import get_password_hash
+from ..security import Principal, get_password_hash
+from ..services.auth import forget_token_versions
 
 router = APIRouter(prefix="/admins", tags=["admins"])
 
 
 @router.get("/me", response_model=schemas.AdminRead)
-async def read_me(admin: Admin = Depends(get_current_admin)):
+async def read_me(principal: Principal = Depends(get_current_admin), session: AsyncSession = Depends(get_db)):
+    admin = await session.get(Admin, principal.id)
+    if not admin:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Admin not found")
     return admin
 
 
@@ -19,7 +23,7 @@ async def read_me(admin: Admin = Depends(get_current_admin)):
 async def create_admin(
     payload: schemas.AdminCreate,
     session: AsyncSession = Depends(get_db),
-    _superadmin: Admin = Depends(require_superadmin),
+    _superadmin: Principal = Depends(require_superadmin),
 ):
     exists = await session.execute(select(Admin).where(Admin.username == payload.username))
     if exists.scalar_one_or_none():
@@ -41,7 +45,7 @@ async def update_admin(
     admin_id: int,
     payload: schemas.AdminUpdate,
     session: AsyncSession = Depends(get_db),
-    _superadmin: Admin = Depends(require_superadmin),
+    _superadmin: Principal = Depends(require_superadmin),
 ):
     result = await session.execute(select(Admin).where(Admin.id == admin_id))
     admin = result.scalar_one_or_none()
@@ -54,6 +58,11 @@ async def update_admin(
         admin.is_superadmin = payload.is_superadmin
     if payload.status:
         admin.status = payload.status
+    if payload.password or payload.is_superadmin is not None or payload.status:
+        # Outstanding tokens carry the old privileges; force a fresh login.
+        admin.token_version += 1
     await session.commit()
+    if payload.password or payload.is_superadmin is not None or payload.status:
+        await forget_token_versions("admin", [admin.id])
     await session.refresh(admin)
     return admin
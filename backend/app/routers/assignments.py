@@ -1,14 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 from fastapi.security import HTTPAuthorizationCredentials
-from sqlalchemy import select
+from sqlalchemy import Row, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from .. import schemas
-from ..deps import get_current_admin, get_db, http_bearer
-from ..models import Image, User, UserImage
+from ..deps import check_token_version, get_current_admin, get_db, http_bearer
+from ..models import Image, User
+from ..services import bundles as bundle_service
+from ..services import downloads as download_service
 from ..services import images as image_service
 from ..storage import generate_presigned_get_url
 from ..security import decode_token
+from ..serialization import json_list_response
 
 router = APIRouter(prefix="/assignments", tags=["assignments"])
 
@@ -53,13 +57,15 @@ async def assign_images(
     return {"status": "ok"}
 
 
-@router.get("/users/{user_id}/images", response_model=list[schemas.ImageRead])
-async def list_images_for_user(
-    user_id: int,
-    include_urls: bool = Query(False, description="Return presigned download URLs"),
-    credentials: HTTPAuthorizationCredentials | None = Depends(http_bearer),
-    session: AsyncSession = Depends(get_db),
-):
+async def _authorize_user_access(
+    credentials: HTTPAuthorizationCredentials | None, session: AsyncSession, user_id: int
+) -> Row:
+    """Check the bearer may read ``user_id``'s grants; returns ``(username, grants_version)``.
+
+    Costs a single narrow query: the token is verified in memory and the target user is
+    loaded as a few columns rather than a full entity. A user's token version is checked
+    against that same row; an admin's goes through ``check_token_version``.
+    """
     # Auth: admin可访问任何用户，user只能访问自己的图片
     if credentials is None or credentials.scheme.lower() != "bearer":
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
@@ -70,43 +76,160 @@ async def list_images_for_user(
 
     role = payload.get("role")
     username = payload.get("sub")
-
-    target_user = await _get_user(session, user_id)
-    if role == "admin":
-        pass
-    elif role == "user":
-        if not username or target_user.username != username:
-            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
-    else:
+    if role not in ("admin", "user"):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
 
+    if role == "admin" and "uid" in payload:
+        await check_token_version(session, "admin", payload)
     result = await session.execute(
-        select(UserImage, Image)
-        .join(Image, Image.id == UserImage.image_id)
-        .where(UserImage.user_id == user_id)
+        select(User.username, User.grants_version, User.token_version).where(User.id == user_id)
     )
-    images = [row[1] for row in result.fetchall()]
+    target = result.one_or_none()
+    if target is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    if role == "user" and (not username or target.username != username):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Forbidden")
+    if role == "user" and "uid" in payload and payload.get("tv") != target.token_version:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token revoked")
+    return target
+
+
+def _with_download_urls(rows: list, user_id: int) -> list[dict]:
+    return download_service.with_signed_urls(rows, f"user:{user_id}", thumbs=False, grant_expiry="grant_expires_at")
+
+
+@router.get("/users/{user_id}/images", response_model=list[schemas.ImageRead])
+async def list_images_for_user(
+    user_id: int,
+    include_urls: bool = Query(False, description="Return presigned download URLs"),
+    credentials: HTTPAuthorizationCredentials | None = Depends(http_bearer),
+    session: AsyncSession = Depends(get_db),
+):
+    await _authorize_user_access(credentials, session, user_id)
+    rows = await image_service.list_image_rows_for_user(session, user_id)
     if include_urls:
-        for img in images:
-            img.presigned_url = None
-            img.download_url = f"/api/images/{img.id}/download"
-    return images
+        rows = _with_download_urls(rows, user_id)
+    return json_list_response(schemas.ImageRead, rows)
+
+
+@router.get("/users/{user_id}/images/sync", response_model=schemas.ImageSyncResponse)
+async def sync_images_for_user(
+    user_id: int,
+    request: Request,
+    response: Response,
+    since: int | None = Query(None, ge=0, description="grants version the client last synced to"),
+    include_urls: bool = Query(False, description="Return presigned download URLs"),
+    credentials: HTTPAuthorizationCredentials | None = Depends(http_bearer),
+    session: AsyncSession = Depends(get_db),
+):
+    """Incremental grant sync: 304 when unchanged, otherwise a delta since ``since``.
+
+    Without ``since`` (or when it is ahead of the server) the full grant set is returned
+    with ``full=true``.
+
+    Signed URLs expire on their own, so with ``include_urls`` the ETag also names the expiry
+    bucket the URLs are signed for (``downloads.url_expiry_bucket``). Once that moves, the
+    client's URLs are no longer refreshed by a 304 or a delta: it gets the full set, freshly
+    signed. A delta is only served when ``If-None-Match`` shows the client's URLs are from
+    the current bucket.
+    """
+    target = await _authorize_user_access(credentials, session, user_id)
+    version = target.grants_version
+    client_etag = request.headers.get("if-none-match")
+    if include_urls:
+        bucket = download_service.url_expiry_bucket()
+        etag = f'"grants-{user_id}-{version}-urls-{bucket}"'
+        urls_fresh = since is not None and client_etag == f'"grants-{user_id}-{since}-urls-{bucket}"'
+    else:
+        etag = f'"grants-{user_id}-{version}"'
+        urls_fresh = True
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if client_etag == etag or (since == version and urls_fresh):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    response.headers.update(headers)
+    if since is None or since > version or not urls_fresh:
+        rows = await image_service.list_image_rows_for_user(session, user_id)
+        removed: list[int] = []
+        full = True
+    else:
+        added_ids, removed = await image_service.get_grant_changes(session, user_id, since)
+        rows = await image_service.list_image_rows_for_user(session, user_id, added_ids) if added_ids else []
+        full = False
+    if include_urls:
+        rows = _with_download_urls(rows, user_id)
+    return schemas.ImageSyncResponse(version=version, full=full, added=rows, removed=removed)
+
+
+@router.get("/users/{user_id}/images/bundle")
+async def download_bundle(
+    user_id: int,
+    format: str = Query("zip", description="zip or tar"),
+    image_ids: list[int] | None = Query(None, description="Only these images; defaults to every current grant"),
+    credentials: HTTPAuthorizationCredentials | None = Depends(http_bearer),
+    session: AsyncSession = Depends(get_db),
+):
+    """Stream the user's currently granted images as one archive instead of one request each."""
+    media_type = bundle_service.FORMATS.get(format)
+    if media_type is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Unsupported format")
+    target = await _authorize_user_access(credentials, session, user_id)
+    entries = await bundle_service.bundle_entries(session, user_id, image_ids)
+    if not entries:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="No downloadable images")
+    filename = f"{target.username}-images.{format}"
+    return StreamingResponse(
+        bundle_service.stream_bundle(entries, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"', "Cache-Control": "no-store"},
+    )
+
+
+@router.get("/users/{user_id}/images/count", response_model=schemas.AssignmentCount)
+async def count_images_for_user(
+    user_id: int,
+    credentials: HTTPAuthorizationCredentials | None = Depends(http_bearer),
+    session: AsyncSession = Depends(get_db),
+):
+    await _authorize_user_access(credentials, session, user_id)
+    return schemas.AssignmentCount(count=await image_service.count_images_for_user(session, user_id))
+
+
+@router.get("/users/{user_id}/images/{image_id}", status_code=204)
+async def check_image_for_user(
+    user_id: int,
+    image_id: int,
+    credentials: HTTPAuthorizationCredentials | None = Depends(http_bearer),
+    session: AsyncSession = Depends(get_db),
+):
+    """204 when the user currently holds an unexpired grant for the image, 404 otherwise."""
+    await _authorize_user_access(credentials, session, user_id)
+    if not await image_service.user_has_image(session, user_id, image_id):
+        raise HTTPException(status_code=404, detail="Assignment not found")
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
 
 
 @router.get("/images/{image_id}/users", response_model=list[schemas.UserRead])
 async def list_users_for_image(
     image_id: int,
+    limit: int | None = Query(None, ge=1, le=1000, description="Page size; omit for every user"),
+    after: int | None = Query(None, description="Last user id of the previous page"),
     session: AsyncSession = Depends(get_db),
     _admin=Depends(get_current_admin),
 ):
     await _get_image(session, image_id)
-    result = await session.execute(
-        select(UserImage, User)
-        .join(User, User.id == UserImage.user_id)
-        .where(UserImage.image_id == image_id)
-    )
-    users = [row[1] for row in result.fetchall()]
-    return users
+    rows = await image_service.list_user_rows_for_image(session, image_id, limit, after)
+    return json_list_response(schemas.UserRead, rows)
+
+
+@router.get("/images/{image_id}/users/count", response_model=schemas.AssignmentCount)
+async def count_users_for_image(
+    image_id: int,
+    session: AsyncSession = Depends(get_db),
+    _admin=Depends(get_current_admin),
+):
+    await _get_image(session, image_id)
+    return schemas.AssignmentCount(count=await image_service.count_users_for_image(session, image_id))
 
 
 @router.delete("/users/{user_id}/images/{image_id}", status_code=204)
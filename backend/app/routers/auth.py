@@ -1,44 +1,67 @@
 from datetime import datetime, timezone
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from .. import schemas
-from ..config import get_settings
 from ..deps import get_db
 from ..models import Admin, StatusEnum, User
-from ..security import create_access_token, verify_password
+from ..ratelimit import LoginThrottle, get_login_throttle
+from ..security import verify_password
+from ..services import auth as auth_service
 
 router = APIRouter(prefix="/auth", tags=["auth"])
-settings = get_settings()
 
 
 @router.post("/admin/login", response_model=schemas.TokenResponse)
-async def admin_login(payload: schemas.AdminLoginRequest, session: AsyncSession = Depends(get_db)):
+async def admin_login(
+    payload: schemas.AdminLoginRequest,
+    request: Request,
+    session: AsyncSession = Depends(get_db),
+    throttle: LoginThrottle = Depends(get_login_throttle),
+):
+    await throttle.check(request, "admin", payload.username)
     result = await session.execute(select(Admin).where(Admin.username == payload.username))
     admin = result.scalar_one_or_none()
     if not admin or not verify_password(payload.password, admin.password_hash):
+        await throttle.record_failure("admin", payload.username)
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+    await throttle.record_success("admin", payload.username)
     if admin.status != StatusEnum.active:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Account disabled")
 
     admin.last_login_at = datetime.now(timezone.utc)
-    await session.commit()
-    token = create_access_token(subject=admin.username, role="admin")
-    return schemas.TokenResponse(access_token=token, user_id=admin.id)
+    return await auth_service.issue_tokens(session, admin, "admin")
 
 
 @router.post("/user/login", response_model=schemas.TokenResponse)
-async def user_login(payload: schemas.UserLoginRequest, session: AsyncSession = Depends(get_db)):
+async def user_login(
+    payload: schemas.UserLoginRequest,
+    request: Request,
+    session: AsyncSession = Depends(get_db),
+    throttle: LoginThrottle = Depends(get_login_throttle),
+):
+    await throttle.check(request, "user", payload.username)
     result = await session.execute(select(User).where(User.username == payload.username))
     user = result.scalar_one_or_none()
     if not user or not verify_password(payload.password, user.password_hash):
+        await throttle.record_failure("user", payload.username)
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid credentials")
+    await throttle.record_success("user", payload.username)
     if user.status != StatusEnum.active:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="User disabled")
     if user.expires_at and user.expires_at < datetime.now(timezone.utc):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Account expired")
 
-    token = create_access_token(subject=user.username, role="user", expires_minutes=settings.jwt_expires_minutes)
-    return schemas.TokenResponse(access_token=token, user_id=user.id)
+    return await auth_service.issue_tokens(session, user, "user")
+
+
+@router.post("/refresh", response_model=schemas.TokenResponse)
+async def refresh(payload: schemas.RefreshRequest, session: AsyncSession = Depends(get_db)):
+    return await auth_service.rotate_refresh_token(session, payload.refresh_token)
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(payload: schemas.RefreshRequest, session: AsyncSession = Depends(get_db)):
+    await auth_service.revoke_refresh_token(session, payload.refresh_token)
@@ -0,0 +1,29 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+
+from ..deps import get_current_admin
+from ..services import exports as export_service
+from ..utils.time import utc_now
+
+router = APIRouter(prefix="/exports", tags=["exports"])
+
+
+@router.get("/{entity}")
+async def export_entity(
+    entity: str,
+    format: str = Query("ndjson", description="ndjson or csv"),
+    after_id: int | None = Query(None, ge=0, description="Resume after this id (last id already received)"),
+    limit: int | None = Query(None, gt=0),
+    _admin=Depends(get_current_admin),
+):
+    if entity not in export_service.EXPORTS:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Unknown export")
+    media_type = export_service.FORMATS.get(format)
+    if media_type is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Unsupported format")
+    filename = f"{entity}-{utc_now():%Y%m%dT%H%M%SZ}.{format}"
+    return StreamingResponse(
+        export_service.stream_export(entity, format, after_id=after_id, limit=limit),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"', "Cache-Control": "no-store"},
+    )
@@ -1,63 +1,80 @@
 import uuid
-from io import BytesIO
 from pathlib import Path
 
-from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, status
-from fastapi.responses import StreamingResponse
-from PIL import Image as PILImage
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from botocore.exceptions import ClientError
+from PIL import Image as PILImage, UnidentifiedImageError
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from .. import schemas
 from ..config import get_settings
 from ..deps import get_current_admin, get_db
+from ..edge_cache import CachedObject, get_edge_cache
+from ..loaders import RequestLoaders, get_loaders, with_names
 from ..models import Image
+from ..services import downloads as download_service
+from ..services import image_meta
 from ..services import images as image_service
+from ..services import thumbnails as thumbnail_service
+from ..services import uploads as upload_service
+from ..serialization import json_list_response
 from ..storage import get_s3_client
 
 router = APIRouter(prefix="/images", tags=["images"])
 
 
-def _make_thumb(data: bytes, max_size: int = 400) -> tuple[bytes, str]:
-    """Generate a thumbnail and return bytes and mime."""
-    img = PILImage.open(BytesIO(data))
-    img.thumbnail((max_size, max_size))
-    fmt = (img.format or "PNG").upper()
-    mime = f"image/{'jpeg' if fmt == 'JPG' else fmt.lower()}"
-    buf = BytesIO()
-    img.save(buf, format=fmt)
-    return buf.getvalue(), mime
+def _cached_file_response(entry: CachedObject, headers: dict[str, str] | None = None) -> FileResponse:
+    """Serve an edge cache hit straight from local disk."""
+    return FileResponse(
+        entry.path,
+        media_type=entry.content_type,
+        headers={"Cache-Control": "public, max-age=86400", "ETag": entry.etag, **(headers or {})},
+    )
+
+
+def _store_upload(key: str, data: bytes, mime_type: str, thumb: tuple[bytes, str] | None) -> None:
+    settings = get_settings()
+    client = get_s3_client()
+    client.put_object(Bucket=settings.s3_bucket, Key=key, Body=data, ContentType=mime_type)
+    if thumb is not None:
+        client.put_object(Bucket=settings.s3_bucket, Key=f"{key}.thumb", Body=thumb[0], ContentType=thumb[1])
 
 
-@router.post("/upload-file", response_model=schemas.ImageRead, status_code=status.HTTP_201_CREATED)
+@router.post(
+    "/upload-file",
+    response_model=schemas.ImageRead,
+    status_code=status.HTTP_201_CREATED,
+    openapi_extra=upload_service.OPENAPI_BODY,
+)
 async def upload_file(
-    file: UploadFile,
+    request: Request,
     directory: str | None = None,
     session: AsyncSession = Depends(get_db),
     admin=Depends(get_current_admin),
 ):
     settings = get_settings()
-    filename = Path(file.filename or "upload.bin").name
+    # Read here rather than as an UploadFile parameter, so the body is vetted as it streams in
+    # and only after the admin is authenticated.
+    upload = await upload_service.receive_image(request)
+    with upload.file:
+        data = upload.file.read()
+    filename = Path(upload.filename or "upload.bin").name
     key = f"{directory or 'uploads'}/{uuid.uuid4()}/{filename}"
-    data = await file.read()
-    client = get_s3_client()
-    client.put_object(
-        Bucket=settings.s3_bucket,
-        Key=key,
-        Body=data,
-        ContentType=file.content_type or "application/octet-stream",
-    )
-    thumb_key = f"{key}.thumb"
+    metadata = upload.metadata
     try:
-        thumb_bytes, thumb_mime = _make_thumb(data)
-        client.put_object(
-            Bucket=settings.s3_bucket,
-            Key=thumb_key,
-            Body=thumb_bytes,
-            ContentType=thumb_mime,
-        )
-    except Exception:
-        thumb_key = None
+        thumb = await run_in_threadpool(thumbnail_service.make_thumb, data)
+    except PILImage.DecompressionBombError:
+        # Allowed by upload_max_pixels but over thumb_max_pixels: kept without a thumbnail.
+        thumb = None
+    except (UnidentifiedImageError, OSError, SyntaxError, ValueError):
+        upload_service.reject(status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, "decode", "Image could not be decoded")
+    await run_in_threadpool(_store_upload, key, data, upload.mime_type, thumb)
+    if thumb is not None:
+        metadata.dominant_color = image_meta.dominant_color(thumb[0])
+        metadata.dhash = image_meta.dhash(thumb[0])
 
     image = await image_service.create_image_record(
         session,
@@ -65,14 +82,16 @@ async def upload_file(
             bucket=settings.s3_bucket,
             key=key,
             filename=filename,
-            mime_type=file.content_type,
-            size_bytes=len(data),
+            mime_type=upload.mime_type,
+            size_bytes=upload.size,
         ),
         admin,
+        metadata,
     )
+    token = download_service.sign(image, "admin")
     image.presigned_url = None
-    image.download_url = f"/api/images/{image.id}/download"
-    image.thumb_url = f"/api/images/{image.id}/thumb" if thumb_key else None
+    image.download_url = f"/api/images/{image.id}/download?token={token}"
+    image.thumb_url = f"/api/images/{image.id}/thumb?token={token}" if thumb is not None else None
     return image
 
 
@@ -82,22 +101,44 @@ async def save_image_metadata(
     session: AsyncSession = Depends(get_db),
     admin=Depends(get_current_admin),
 ):
-    return await image_service.create_image_record(session, payload, admin)
+    # Presigned uploads never pass through the API; probe the stored object's header instead.
+    metadata = await run_in_threadpool(image_meta.probe_object, payload.bucket, payload.key)
+    return await image_service.create_image_record(session, payload, admin, metadata)
 
 
 @router.get("/", response_model=list[schemas.ImageRead])
 async def list_images(
     include_urls: bool = Query(False, description="Return presigned download URLs"),
+    include_uploader: bool = Query(False, description="Fill uploader_username"),
     session: AsyncSession = Depends(get_db),
+    loaders: RequestLoaders = Depends(get_loaders),
     _admin=Depends(get_current_admin),
 ):
-    images = await image_service.list_images(session)
-    if include_urls:
-        for img in images:
-            img.presigned_url = None
-            img.download_url = f"/api/images/{img.id}/download"
-            img.thumb_url = f"/api/images/{img.id}/thumb"
-    return images
+    rows = await image_service.list_image_rows(session)
+    if include_uploader:
+        rows = await with_names(rows, loaders.admins, "uploader_admin_id", "uploader_username")
+    return json_list_response(schemas.ImageRead, _with_urls(rows) if include_urls else rows)
+
+
+@router.get("/search", response_model=list[schemas.ImageSearchHit])
+async def search_images(
+    q: str = Query(..., min_length=3, max_length=100, description="Matched against filename and key"),
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    include_urls: bool = Query(False, description="Return download and thumbnail URLs"),
+    include_uploader: bool = Query(False, description="Fill uploader_username"),
+    session: AsyncSession = Depends(get_db),
+    loaders: RequestLoaders = Depends(get_loaders),
+    _admin=Depends(get_current_admin),
+):
+    rows = await image_service.search_image_rows(session, q, limit, offset)
+    if include_uploader:
+        rows = await with_names(rows, loaders.admins, "uploader_admin_id", "uploader_username")
+    return json_list_response(schemas.ImageSearchHit, _with_urls(rows) if include_urls else rows)
+
+
+def _with_urls(rows):
+    return download_service.with_signed_urls(rows, "admin")
 
 
 async def _get_image_or_404(session: AsyncSession, image_id: int) -> Image:
@@ -116,43 +157,104 @@ async def delete_image(
 ):
     image = await _get_image_or_404(session, image_id)
     await image_service.delete_image(session, image)
+    download_service.forget(image_id)
     return None
 
 
+@router.get("/{image_id}/similar", response_model=list[schemas.SimilarImage])
+async def similar_images(
+    image_id: int,
+    max_distance: int = Query(6, ge=0, le=7, description="Hamming distance between 64-bit dHashes"),
+    limit: int = Query(20, ge=1, le=100),
+    include_urls: bool = Query(False, description="Return download and thumbnail URLs"),
+    session: AsyncSession = Depends(get_db),
+    _admin=Depends(get_current_admin),
+):
+    image = await _get_image_or_404(session, image_id)
+    if image.dhash is None:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Image has no perceptual hash yet; run python -m app.jobs.backfill_dhash",
+        )
+    rows = await image_service.similar_image_rows(session, image, max_distance, limit)
+    return json_list_response(schemas.SimilarImage, _with_urls(rows) if include_urls else rows)
+
+
+async def _download_target(
+    session: AsyncSession, image_id: int, token: str | None
+) -> download_service.DownloadTarget:
+    """Signed URLs are checked in memory; unsigned ones fall back to the metadata LRU and DB.
+
+    With ``download_check_grants`` a user's link also needs the grant to still exist.
+    """
+    settings = get_settings()
+    if token is not None:
+        target = download_service.verify(token, image_id)
+        if settings.download_check_grants and target.grantee is not None:
+            if not await image_service.user_has_image(session, target.grantee, image_id):
+                raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Download link revoked")
+        return target
+    if settings.download_require_token:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Signed download link required")
+    return await download_service.lookup(session, image_id)
+
+
 @router.get("/{image_id}/download")
 async def download_image(
     image_id: int,
+    token: str | None = Query(None, description="Signature from a listing's download_url"),
     session: AsyncSession = Depends(get_db),
     # 下载不再强制鉴权，依赖后端仅内网访问 MinIO
 ):
-    image = await _get_image_or_404(session, image_id)
+    image = await _download_target(session, image_id, token)
+    disposition = {"Content-Disposition": f'inline; filename="{image.filename}"'}
+    cache = get_edge_cache()
+    if cache is not None and image.size_bytes and image.size_bytes <= cache.max_object_bytes:
+        entry = await cache.get(image.bucket, image.key)
+        if entry is not None:
+            return _cached_file_response(entry, disposition)
+
     client = get_s3_client()
     obj = client.get_object(Bucket=image.bucket, Key=image.key)
     stream = obj["Body"]
     return StreamingResponse(
         stream.iter_chunks(),
         media_type=image.mime_type or "application/octet-stream",
-        headers={"Content-Disposition": f'inline; filename="{image.filename}"', "Cache-Control": "public, max-age=86400"},
+        headers={**disposition, "Cache-Control": "public, max-age=86400"},
     )
 
 
 @router.get("/{image_id}/thumb")
 async def get_thumb(
     image_id: int,
+    token: str | None = Query(None, description="Signature from a listing's thumb_url"),
     session: AsyncSession = Depends(get_db),
 ):
-    image = await _get_image_or_404(session, image_id)
+    image = await _download_target(session, image_id, token)
+    # Hand the pooled connection back before the slow part: building takes a second
+    # connection for the advisory lock, and holding both starves the pool under load.
+    await session.close()
     settings = get_settings()
-    client = get_s3_client()
-    thumb_key = f"{image.key}.thumb"
-    try:
-        client.head_object(Bucket=settings.s3_bucket, Key=thumb_key)
-    except Exception:
-        obj = client.get_object(Bucket=image.bucket, Key=image.key)
-        original = obj["Body"].read()
-        thumb_bytes, thumb_mime = _make_thumb(original)
-        client.put_object(Bucket=settings.s3_bucket, Key=thumb_key, Body=thumb_bytes, ContentType=thumb_mime)
+    cache = get_edge_cache()
+    thumb_key = thumbnail_service.thumb_key_for(image)
+    if cache is not None:
+        try:
+            entry = await cache.get(settings.s3_bucket, thumb_key)
+        except ClientError:
+            # Thumbnail not generated yet; fall through and build it.
+            entry = None
+        if entry is not None:
+            return _cached_file_response(entry)
 
+    built = await thumbnail_service.ensure_thumb(image)
+    if built is not None and cache is not None:
+        entry = await cache.put(settings.s3_bucket, built.key, built.data, built.mime, built.etag)
+        if entry is not None:
+            return _cached_file_response(entry)
+    if built is not None:
+        return Response(built.data, media_type=built.mime, headers={"Cache-Control": "public, max-age=86400"})
+
+    client = get_s3_client()
     obj = client.get_object(Bucket=settings.s3_bucket, Key=thumb_key)
     stream = obj["Body"]
     return StreamingResponse(
@@ -4,15 +4,18 @@ from fastapi import APIRouter, Depends
 from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from .. import schemas
+from .. import cache, schemas
+from ..config import get_settings
 from ..deps import get_current_admin, get_db
 from ..models import Image, StatusEnum, User
 
 router = APIRouter(prefix="/stats", tags=["stats"])
 
 
-@router.get("/summary", response_model=schemas.StatsSummary)
-async def summary(session: AsyncSession = Depends(get_db), _admin=Depends(get_current_admin)):
+SUMMARY_CACHE_KEY = "stats:summary"
+
+
+async def compute_summary(session: AsyncSession) -> schemas.StatsSummary:
     total_users = (await session.execute(select(func.count()).select_from(User))).scalar_one()
     active_users = (
         await session.execute(select(func.count()).select_from(User).where(User.status == StatusEnum.active))
@@ -32,3 +35,14 @@ async def summary(session: AsyncSession = Depends(get_db), _admin=Depends(get_cu
         expiring_users=expiring_users,
         total_images=total_images,
     )
+
+
+@router.get("/summary", response_model=schemas.StatsSummary)
+async def summary(session: AsyncSession = Depends(get_db), _admin=Depends(get_current_admin)):
+    """Dashboard counts, shared by all workers for ``stats_cache_seconds``."""
+    cached = await cache.get_json(SUMMARY_CACHE_KEY, "stats")
+    if cached is not None:
+        return schemas.StatsSummary(**cached)
+    result = await compute_summary(session)
+    await cache.set_json(SUMMARY_CACHE_KEY, result.model_dump(), get_settings().stats_cache_seconds)
+    return result
@@ -1,11 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from datetime import datetime
+
+from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, status
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from .. import schemas
 from ..deps import get_current_admin, get_db
+from ..loaders import RequestLoaders, get_loaders, with_names
 from ..models import StatusEnum, User
 from ..security import get_password_hash
+from ..serialization import json_list_response
+from ..services import extensions as extension_service
+from ..services.auth import forget_token_versions
 from ..services import users as user_service
 
 router = APIRouter(prefix="/users", tags=["users"])
@@ -16,8 +22,53 @@ async def list_users(
     session: AsyncSession = Depends(get_db),
     _admin=Depends(get_current_admin),
 ):
-    result = await session.execute(select(User).order_by(User.created_at.desc()))
-    return list(result.scalars())
+    rows = await user_service.list_user_rows(session)
+    return json_list_response(schemas.UserRead, rows)
+
+
+@router.get("/search", response_model=list[schemas.UserSearchHit])
+async def search_users(
+    q: str = Query(..., min_length=3, max_length=100, description="Matched against username and notes"),
+    limit: int = Query(50, ge=1, le=200),
+    offset: int = Query(0, ge=0),
+    session: AsyncSession = Depends(get_db),
+    _admin=Depends(get_current_admin),
+):
+    rows = await user_service.search_user_rows(session, q, limit, offset)
+    return json_list_response(schemas.UserSearchHit, rows)
+
+
+async def _extension_page(
+    session: AsyncSession,
+    loaders: RequestLoaders,
+    user_id: int | None,
+    admin_id: int | None,
+    since: datetime | None,
+    until: datetime | None,
+    limit: int,
+    cursor: str | None,
+) -> schemas.ExtensionHistoryPage:
+    rows, next_cursor = await extension_service.list_extension_rows(
+        session, user_id=user_id, admin_id=admin_id, since=since, until=until, limit=limit, cursor=cursor
+    )
+    rows = await with_names(rows, loaders.users, "user_id", "username")
+    rows = await with_names(rows, loaders.admins, "operated_by_admin_id", "operator_username")
+    return schemas.ExtensionHistoryPage(items=rows, next_cursor=next_cursor)
+
+
+@router.get("/extensions", response_model=schemas.ExtensionHistoryPage)
+async def list_extensions(
+    user_id: int | None = Query(None, description="Only renewals of this user"),
+    admin_id: int | None = Query(None, description="Only renewals made by this admin"),
+    since: datetime | None = Query(None, description="Created at or after (inclusive)"),
+    until: datetime | None = Query(None, description="Created before (exclusive)"),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: str | None = Query(None, description="next_cursor of the previous page"),
+    session: AsyncSession = Depends(get_db),
+    loaders: RequestLoaders = Depends(get_loaders),
+    _admin=Depends(get_current_admin),
+):
+    return await _extension_page(session, loaders, user_id, admin_id, since, until, limit, cursor)
 
 
 @router.post("/", response_model=schemas.UserRead, status_code=status.HTTP_201_CREATED)
@@ -29,6 +80,38 @@ async def create_user(
     return await user_service.create_user(session, payload)
 
 
+@router.post("/import", response_model=schemas.UserImportResult)
+async def import_users(
+    file: UploadFile,
+    format: str | None = Query(None, description="csv or ndjson; inferred from the file name when omitted"),
+    session: AsyncSession = Depends(get_db),
+    _admin=Depends(get_current_admin),
+):
+    fmt = format or ("csv" if (file.filename or "").lower().endswith(".csv") else "ndjson")
+    if fmt not in ("csv", "ndjson"):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Unsupported format")
+    records = user_service.parse_import_rows(file.file, fmt)
+    return await user_service.import_users(session, records)
+
+
+@router.post("/bulk/extend", response_model=schemas.BulkOperationResult)
+async def bulk_extend_users(
+    payload: schemas.UserBulkExtendRequest,
+    session: AsyncSession = Depends(get_db),
+    admin=Depends(get_current_admin),
+):
+    return await user_service.bulk_extend_users(session, payload, operator_admin_id=admin.id)
+
+
+@router.post("/bulk/status", response_model=schemas.BulkOperationResult)
+async def bulk_update_status(
+    payload: schemas.UserBulkStatusRequest,
+    session: AsyncSession = Depends(get_db),
+    admin=Depends(get_current_admin),
+):
+    return await user_service.bulk_update_status(session, payload, operator_admin_id=admin.id)
+
+
 async def _get_user_or_404(session: AsyncSession, user_id: int) -> User:
     result = await session.execute(select(User).where(User.id == user_id))
     user = result.scalar_one_or_none()
@@ -68,6 +151,21 @@ async def extend_user(
     return await user_service.extend_user(session, user, payload, operator_admin_id=admin.id)
 
 
+@router.get("/{user_id}/extensions", response_model=schemas.ExtensionHistoryPage)
+async def list_user_extensions(
+    user_id: int,
+    since: datetime | None = Query(None, description="Created at or after (inclusive)"),
+    until: datetime | None = Query(None, description="Created before (exclusive)"),
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: str | None = Query(None, description="next_cursor of the previous page"),
+    session: AsyncSession = Depends(get_db),
+    loaders: RequestLoaders = Depends(get_loaders),
+    _admin=Depends(get_current_admin),
+):
+    await _get_user_or_404(session, user_id)
+    return await _extension_page(session, loaders, user_id, None, since, until, limit, cursor)
+
+
 @router.post("/{user_id}/reset_password", response_model=schemas.UserRead)
 async def reset_password(
     user_id: int,
@@ -79,7 +177,9 @@ async def reset_password(
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Password required")
     user = await _get_user_or_404(session, user_id)
     user.password_hash = get_password_hash(payload.password)
+    user.token_version += 1
     await session.commit()
+    await forget_token_versions("user", [user.id])
     await session.refresh(user)
     return user
 
@@ -95,6 +195,8 @@ async def update_user_status(
     if payload.status is None:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Status required")
     user.status = payload.status
+    user.token_version += 1
     await session.commit()
+    await forget_token_versions("user", [user.id])
     await session.refresh(user)
     return user
@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import List, Optional
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field, model_validator
 
 from .models import StatusEnum
 
@@ -10,6 +10,12 @@ class TokenResponse(BaseModel):
     access_token: str
     token_type: str = "bearer"
     user_id: Optional[int] = None
+    expires_in: Optional[int] = None
+    refresh_token: Optional[str] = None
+
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 
 class AdminLoginRequest(BaseModel):
@@ -70,6 +76,65 @@ class UserExtendRequest(BaseModel):
     reason: Optional[str] = None
 
 
+class UserBulkFilter(BaseModel):
+    # A misspelt criterion would otherwise be dropped and widen the match.
+    model_config = ConfigDict(extra="forbid")
+
+    status: Optional[StatusEnum] = None
+    expires_before: Optional[datetime] = None
+    expires_after: Optional[datetime] = None
+
+    @model_validator(mode="after")
+    def _some_criterion(self):
+        if self.status is None and self.expires_before is None and self.expires_after is None:
+            raise ValueError("Provide at least one filter criterion; list user_ids to target users directly")
+        return self
+
+
+class UserBulkTarget(BaseModel):
+    user_ids: Optional[List[int]] = None
+    filter: Optional[UserBulkFilter] = None
+    batch_size: int = Field(default=1000, ge=1, le=10000)
+
+    @model_validator(mode="after")
+    def _one_target(self):
+        if (self.user_ids is None) == (self.filter is None):
+            raise ValueError("Provide exactly one of user_ids or filter")
+        return self
+
+
+class UserBulkExtendRequest(UserBulkTarget):
+    new_expires_at: Optional[datetime] = None
+    extend_by_days: Optional[int] = Field(default=None, gt=0)
+    reason: Optional[str] = None
+
+    @model_validator(mode="after")
+    def _one_expiry(self):
+        if (self.new_expires_at is None) == (self.extend_by_days is None):
+            raise ValueError("Provide exactly one of new_expires_at or extend_by_days")
+        return self
+
+
+class UserBulkStatusRequest(UserBulkTarget):
+    status: StatusEnum
+
+
+class BulkOperationResult(BaseModel):
+    affected: int
+    user_ids: List[int] = []
+
+
+class UserImportError(BaseModel):
+    row: int
+    username: Optional[str] = None
+    error: str
+
+
+class UserImportResult(BaseModel):
+    created: int
+    errors: List[UserImportError] = []
+
+
 class UserRead(UserBase):
     id: int
     created_at: datetime
@@ -79,6 +144,31 @@ class UserRead(UserBase):
         from_attributes = True
 
 
+class UserSearchHit(UserRead):
+    rank: Optional[float] = None
+
+
+class ExtensionRead(BaseModel):
+    id: int
+    user_id: int
+    username: Optional[str] = None
+    old_expires_at: Optional[datetime] = None
+    new_expires_at: Optional[datetime] = None
+    reason: Optional[str] = None
+    operated_by_admin_id: Optional[int] = None
+    operator_username: Optional[str] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class ExtensionHistoryPage(BaseModel):
+    items: List[ExtensionRead]
+    # Pass back as ``cursor`` for the next (older) page; None on the last page.
+    next_cursor: Optional[str] = None
+
+
 class ImageBase(BaseModel):
     bucket: str
     key: str
@@ -94,7 +184,13 @@ class ImageCreate(ImageBase):
 
 class ImageRead(ImageBase):
     id: int
+    width: Optional[int] = None
+    height: Optional[int] = None
+    orientation: Optional[int] = None
+    image_format: Optional[str] = None
+    dominant_color: Optional[str] = None
     uploader_admin_id: Optional[int] = None
+    uploader_username: Optional[str] = None
     created_at: datetime
     deleted_at: Optional[datetime] = None
     assigned_count: Optional[int] = 0
@@ -106,6 +202,14 @@ class ImageRead(ImageBase):
         from_attributes = True
 
 
+class ImageSearchHit(ImageRead):
+    rank: Optional[float] = None
+
+
+class SimilarImage(ImageRead):
+    distance: int
+
+
 class AssignUsersRequest(BaseModel):
     user_ids: List[int]
     expires_at: Optional[datetime] = None
@@ -116,6 +220,17 @@ class AssignImagesRequest(BaseModel):
     expires_at: Optional[datetime] = None
 
 
+class AssignmentCount(BaseModel):
+    count: int
+
+
+class ImageSyncResponse(BaseModel):
+    version: int
+    full: bool = False
+    added: List[ImageRead] = []
+    removed: List[int] = []
+
+
 class AssignmentRead(BaseModel):
     user_id: int
     image_id: int
@@ -1,5 +1,12 @@
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import secrets
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Sequence
 
 import jwt
 from passlib.context import CryptContext
@@ -7,24 +14,99 @@ from passlib.context import CryptContext
 from .config import get_settings
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+_hash_pool: Optional[ProcessPoolExecutor] = None
 
 
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+def _hash_chunk(passwords: Sequence[str]) -> List[str]:
+    return [pwd_context.hash(password) for password in passwords]
+
+
+def get_hash_pool() -> ProcessPoolExecutor:
+    global _hash_pool
+    if _hash_pool is None:
+        workers = get_settings().password_hash_workers or os.cpu_count() or 1
+        # spawn, not fork: the server process already runs event loop, threadpool and boto3 threads.
+        _hash_pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    return _hash_pool
+
+
+def shutdown_hash_pool() -> None:
+    global _hash_pool
+    if _hash_pool is not None:
+        _hash_pool.shutdown(wait=False, cancel_futures=True)
+        _hash_pool = None
+
+
+async def hash_passwords(passwords: Sequence[str], chunk_size: int = 32) -> List[str]:
+    """Hash many passwords in parallel on the process pool, preserving order.
+
+    Passwords are sent in chunks so the IPC overhead is amortised over several bcrypt rounds.
+    """
+    if not passwords:
+        return []
+    loop = asyncio.get_running_loop()
+    pool = get_hash_pool()
+    chunks = [passwords[i : i + chunk_size] for i in range(0, len(passwords), chunk_size)]
+    results = await asyncio.gather(*(loop.run_in_executor(pool, _hash_chunk, chunk) for chunk in chunks))
+    return [hashed for chunk in results for hashed in chunk]
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
-def create_access_token(subject: str, role: str = "admin", expires_minutes: Optional[int] = None) -> str:
+def create_access_token(
+    subject: str,
+    role: str = "admin",
+    expires_minutes: Optional[int] = None,
+    claims: Optional[Dict[str, Any]] = None,
+) -> str:
     settings = get_settings()
     expire_minutes = expires_minutes or settings.jwt_expires_minutes
     expire = datetime.now(timezone.utc) + timedelta(minutes=expire_minutes)
-    to_encode: Dict[str, Any] = {"sub": subject, "role": role, "exp": expire}
+    to_encode: Dict[str, Any] = {"sub": subject, "role": role, "exp": expire, **(claims or {})}
     return jwt.encode(to_encode, settings.jwt_secret, algorithm=settings.jwt_algorithm)
 
 
+@dataclass(frozen=True)
+class Principal:
+    """Caller identity as carried by an access token, so routes can authorize without a DB read."""
+
+    id: int
+    username: str
+    role: str
+    is_superadmin: bool = False
+
+
+def generate_refresh_token() -> str:
+    return secrets.token_urlsafe(32)
+
+
+def hash_refresh_token(token: str) -> str:
+    """Refresh tokens are high-entropy, so a plain SHA-256 is enough to store them safely."""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
 def decode_token(token: str) -> Dict[str, Any]:
     settings = get_settings()
     return jwt.decode(token, settings.jwt_secret, algorithms=[settings.jwt_algorithm])
+
+
+# Download tokens carry this audience; decode_token rejects them, so they never work as access tokens.
+DOWNLOAD_AUDIENCE = "image-download"
+
+
+def create_download_token(claims: Dict[str, Any], expires_at: int) -> str:
+    """Sign ``claims`` for an image URL. No ``iat``: equal inputs give the same, cacheable URL."""
+    settings = get_settings()
+    to_encode = {**claims, "aud": DOWNLOAD_AUDIENCE, "exp": expires_at}
+    return jwt.encode(to_encode, settings.jwt_secret, algorithm=settings.jwt_algorithm)
+
+
+def decode_download_token(token: str) -> Dict[str, Any]:
+    settings = get_settings()
+    return jwt.decode(token, settings.jwt_secret, algorithms=[settings.jwt_algorithm], audience=DOWNLOAD_AUDIENCE)
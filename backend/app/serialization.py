@@ -0,0 +1,34 @@
+from functools import lru_cache
+from typing import Any, Iterable, List, Mapping, Optional, Type
+
+from fastapi import Response
+from pydantic import BaseModel, TypeAdapter
+
+from .config import get_settings
+
+JSON_MEDIA_TYPE = "application/json"
+
+
+@lru_cache(maxsize=None)
+def list_adapter(model: Type[BaseModel]) -> TypeAdapter:
+    """Precompiled validator/serializer for ``list[model]``, built once per model."""
+    return TypeAdapter(List[model])
+
+
+def dump_list(model: Type[BaseModel], rows: Iterable[Any]) -> bytes:
+    """Validate ORM objects or row mappings against ``model`` and encode them to JSON in one pass."""
+    adapter = list_adapter(model)
+    return adapter.dump_json(adapter.validate_python(list(rows), from_attributes=True))
+
+
+def json_list_response(
+    model: Type[BaseModel], rows: Iterable[Any], headers: Optional[Mapping[str, str]] = None
+) -> Response | List[Any]:
+    """Return pre-encoded JSON, bypassing FastAPI's per-item ``response_model`` validation.
+
+    With ``fast_list_serialization`` turned off the rows are handed back unchanged, so the
+    route falls through to FastAPI's regular ``response_model`` handling.
+    """
+    if not get_settings().fast_list_serialization:
+        return list(rows)
+    return Response(content=dump_list(model, rows), media_type=JSON_MEDIA_TYPE, headers=dict(headers or {}))
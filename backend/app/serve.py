@@ -0,0 +1,29 @@
+"""Production entry point: ``python -m app.serve``.
+
+Runs ``web_concurrency`` uvicorn worker processes on ``bind_host:bind_port``. Each worker
+has its own DB pool and S3 client, so state that must agree across workers goes through
+``app.cache`` (set ``cache_url`` to Redis when running more than one).
+
+On SIGTERM the supervisor signals every worker; each stops accepting connections, lets
+in-flight requests and streaming responses (exports, bundles) finish for up to
+``shutdown_grace_seconds``, cancels whatever is left, then runs the lifespan shutdown that
+closes the cache, the S3 client and the DB pool.
+"""
+import uvicorn
+
+from .config import get_settings
+
+
+def main() -> None:
+    settings = get_settings()
+    uvicorn.run(
+        "app.main:app",
+        host=settings.bind_host,
+        port=settings.bind_port,
+        workers=max(1, settings.web_concurrency),
+        timeout_graceful_shutdown=settings.shutdown_grace_seconds,
+    )
+
+
+if __name__ == "__main__":
+    main()
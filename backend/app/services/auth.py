@@ -0,0 +1,136 @@
+import asyncio
+import uuid
+from datetime import timedelta
+from typing import Iterable, Optional, Union
+
+from fastapi import HTTPException, status
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import cache, metrics
+from ..config import get_settings
+from ..models import Admin, RefreshToken, StatusEnum, User
+from ..schemas import TokenResponse
+from ..security import create_access_token, generate_refresh_token, hash_refresh_token
+from ..utils.time import utc_now
+
+refresh_reuse = metrics.counter("refresh_token_reuse_total", "Revoked refresh tokens presented again")
+
+Account = Union[Admin, User]
+
+
+def _token_version_key(role: str, account_id: int) -> str:
+    return f"token_version:{role}:{account_id}"
+
+
+async def current_token_version(session: AsyncSession, role: str, account_id: int) -> Optional[int]:
+    """The account's ``token_version``, from the shared cache when it can; None if it is gone.
+
+    Access tokens carry the version they were minted under (``tv``), and every password,
+    status or privilege change bumps it, so comparing the two revokes stale tokens. Changes
+    evict the cached value (``forget_token_versions``); other workers on a ``memory://``
+    cache see them within ``token_version_cache_seconds``.
+    """
+    key = _token_version_key(role, account_id)
+    version = await cache.get_json(key, "token_version")
+    if version is None:
+        model = Admin if role == "admin" else User
+        version = await session.scalar(select(model.token_version).where(model.id == account_id))
+        if version is not None:
+            await cache.set_json(key, version, get_settings().token_version_cache_seconds)
+    return version
+
+
+async def forget_token_versions(role: str, account_ids: Iterable[int]) -> None:
+    """Evict cached versions after a committed bump, so the old access tokens stop working."""
+    backend = cache.get_cache()
+    await asyncio.gather(*(backend.delete(_token_version_key(role, account_id)) for account_id in account_ids))
+
+
+def _access_token(account: Account, role: str) -> str:
+    claims = {"uid": account.id, "tv": account.token_version}
+    if role == "admin":
+        claims["su"] = account.is_superadmin
+    return create_access_token(subject=account.username, role=role, claims=claims)
+
+
+async def issue_tokens(
+    session: AsyncSession, account: Account, role: str, family_id: Optional[str] = None
+) -> TokenResponse:
+    """Mint an access token and a refresh token; the caller's transaction is committed."""
+    settings = get_settings()
+    raw = generate_refresh_token()
+    session.add(
+        RefreshToken(
+            token_hash=hash_refresh_token(raw),
+            family_id=family_id or str(uuid.uuid4()),
+            role=role,
+            subject_id=account.id,
+            token_version=account.token_version,
+            expires_at=utc_now() + timedelta(days=settings.refresh_token_days),
+        )
+    )
+    await session.commit()
+    return TokenResponse(
+        access_token=_access_token(account, role),
+        user_id=account.id,
+        expires_in=settings.jwt_expires_minutes * 60,
+        refresh_token=raw,
+    )
+
+
+async def _revoke_family(session: AsyncSession, family_id: str) -> None:
+    await session.execute(
+        update(RefreshToken)
+        .where(RefreshToken.family_id == family_id, RefreshToken.revoked_at.is_(None))
+        .values(revoked_at=utc_now())
+    )
+
+
+async def rotate_refresh_token(session: AsyncSession, raw: str) -> TokenResponse:
+    """Exchange a refresh token for a new pair, revoking the presented one.
+
+    Presenting a token that was already rotated means it leaked (or a client raced itself),
+    so the whole family is revoked and the account has to log in again.
+    """
+    unauthorized = HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token")
+    now = utc_now()
+    result = await session.execute(
+        select(RefreshToken)
+        .where(RefreshToken.token_hash == hash_refresh_token(raw), RefreshToken.expires_at > now)
+        .with_for_update()
+    )
+    token = result.scalar_one_or_none()
+    if not token:
+        raise unauthorized
+    if token.revoked_at is not None:
+        refresh_reuse.inc()
+        await _revoke_family(session, token.family_id)
+        await session.commit()
+        raise unauthorized
+
+    model = Admin if token.role == "admin" else User
+    account = await session.get(model, token.subject_id)
+    if (
+        not account
+        or account.status != StatusEnum.active
+        or account.token_version != token.token_version
+        or (token.role == "user" and account.expires_at and account.expires_at < now)
+    ):
+        await _revoke_family(session, token.family_id)
+        await session.commit()
+        raise unauthorized
+
+    token.revoked_at = now
+    return await issue_tokens(session, account, token.role, family_id=token.family_id)
+
+
+async def revoke_refresh_token(session: AsyncSession, raw: str) -> None:
+    """Log out: revoke the family of the presented token. Unknown tokens are ignored."""
+    result = await session.execute(
+        select(RefreshToken.family_id).where(RefreshToken.token_hash == hash_refresh_token(raw))
+    )
+    family_id = result.scalar_one_or_none()
+    if family_id:
+        await _revoke_family(session, family_id)
+        await session.commit()
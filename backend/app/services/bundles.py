@@ -0,0 +1,186 @@
+import asyncio
+import io
+import logging
+import tarfile
+import zipfile
+from dataclasses import dataclass
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Set
+
+from botocore.exceptions import ClientError
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import get_settings
+from ..models import Image, UserImage
+from ..storage import get_s3_client
+from ..utils.time import utc_now
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {"zip": "application/zip", "tar": "application/x-tar"}
+
+
+@dataclass
+class BundleEntry:
+    image_id: int
+    bucket: str
+    key: str
+    name: str
+    modified: datetime
+
+
+def _member_name(filename: str, image_id: int) -> str:
+    """A flat archive member name that cannot escape the extraction directory.
+
+    Filenames registered through presigned uploads are whatever the client sent, so only the
+    last path component is kept (either separator), control characters are dropped and
+    leading dots stripped; ``..``, ``/etc/passwd`` or ``C:\\x`` cannot survive. An empty
+    result falls back to ``image-<id>``.
+    """
+    name = filename.replace("\\", "/").rsplit("/", 1)[-1]
+    if name[1:2] == ":":
+        name = name[2:]  # Windows drive-relative, e.g. C:evil.exe
+    name = "".join(char for char in name if char.isprintable()).strip().lstrip(".").strip()
+    return name or f"image-{image_id}"
+
+
+def _unique_name(filename: str, taken: Set[str]) -> str:
+    name = filename
+    stem, dot, ext = filename.rpartition(".")
+    if not dot:
+        stem, ext = filename, ""
+    counter = 1
+    while name in taken:
+        counter += 1
+        name = f"{stem} ({counter}){dot}{ext}"
+    taken.add(name)
+    return name
+
+
+async def bundle_entries(
+    session: AsyncSession, user_id: int, image_ids: Optional[Sequence[int]] = None
+) -> List[BundleEntry]:
+    """Images ``user_id`` may download right now: live, and granted without an expired ``expires_at``.
+
+    ``image_ids`` narrows the bundle to a selection; ids outside the grant are ignored.
+    Archive names are the original filenames made safe by ``_member_name``, suffixed
+    `` (2)``, `` (3)``... on collisions.
+    """
+    query = (
+        select(Image.id, Image.bucket, Image.key, Image.filename, Image.created_at)
+        .join(UserImage, UserImage.image_id == Image.id)
+        .where(
+            UserImage.user_id == user_id,
+            Image.deleted_at.is_(None),
+            or_(UserImage.expires_at.is_(None), UserImage.expires_at > utc_now()),
+        )
+        .order_by(Image.id)
+    )
+    if image_ids is not None:
+        query = query.where(Image.id.in_(image_ids))
+    taken: Set[str] = set()
+    return [
+        BundleEntry(
+            image_id=row.id,
+            bucket=row.bucket,
+            key=row.key,
+            name=_unique_name(_member_name(row.filename, row.id), taken),
+            modified=row.created_at or utc_now(),
+        )
+        for row in await session.execute(query)
+    ]
+
+
+class _ChunkSink(io.RawIOBase):
+    """Unseekable write target for the archive writers; whatever they wrote is drained and sent."""
+
+    def __init__(self) -> None:
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+class _ZipWriter:
+    def __init__(self, sink: _ChunkSink) -> None:
+        # Unseekable output makes zipfile emit data descriptors, so nothing is rewritten later.
+        self._zip = zipfile.ZipFile(sink, mode="w", compression=zipfile.ZIP_STORED, allowZip64=True)
+
+    def add(self, entry: BundleEntry, data: bytes) -> None:
+        info = zipfile.ZipInfo(entry.name, date_time=entry.modified.timetuple()[:6])
+        info.compress_type = zipfile.ZIP_STORED
+        self._zip.writestr(info, data)
+
+    def close(self) -> None:
+        self._zip.close()
+
+
+class _TarWriter:
+    def __init__(self, sink: _ChunkSink) -> None:
+        self._tar = tarfile.open(fileobj=sink, mode="w|", format=tarfile.PAX_FORMAT)
+
+    def add(self, entry: BundleEntry, data: bytes) -> None:
+        info = tarfile.TarInfo(entry.name)
+        info.size = len(data)
+        info.mtime = int(entry.modified.timestamp())
+        self._tar.addfile(info, io.BytesIO(data))
+
+    def close(self) -> None:
+        self._tar.close()
+
+
+def _fetch(bucket: str, key: str) -> Optional[bytes]:
+    try:
+        return get_s3_client().get_object(Bucket=bucket, Key=key)["Body"].read()
+    except ClientError as exc:
+        logger.warning("Skipping %s/%s in bundle: %s", bucket, key, exc)
+        return None
+
+
+async def stream_bundle(entries: Sequence[BundleEntry], fmt: str) -> AsyncIterator[bytes]:
+    """Yield a zip or tar of ``entries`` as it is written, without temp files.
+
+    Up to ``bundle_prefetch`` objects are downloaded concurrently and each is written as soon
+    as it arrives, so memory holds at most that many images whatever the bundle size.
+    Entries are stored uncompressed; photos do not shrink further. Objects missing from
+    storage are skipped.
+    """
+    sink = _ChunkSink()
+    writer = _ZipWriter(sink) if fmt == "zip" else _TarWriter(sink)
+    prefetch = max(1, get_settings().bundle_prefetch)
+    pending: Dict[asyncio.Task, BundleEntry] = {}
+    queue = iter(entries)
+    try:
+        while True:
+            for entry in queue:
+                pending[asyncio.ensure_future(run_in_threadpool(_fetch, entry.bucket, entry.key))] = entry
+                if len(pending) >= prefetch:
+                    break
+            if not pending:
+                break
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                entry = pending.pop(task)
+                data = task.result()
+                if data is None:
+                    continue
+                writer.add(entry, data)
+                del data
+                yield sink.drain()
+        writer.close()
+        yield sink.drain()
+    finally:
+        # Client went away mid-stream: stop fetching what nobody will read.
+        for task in pending:
+            task.cancel()
@@ -0,0 +1,180 @@
+"""Signed image URLs, so the download and thumbnail routes can serve hot hits without the DB.
+
+Listings sign each image's storage location into its URLs
+(``/api/images/{id}/download?token=...``). The routes verify the HMAC and expiry in memory
+and go straight to storage. URLs without a token still work through a small in-process
+LRU of image metadata, unless ``download_require_token`` is set.
+"""
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+import jwt
+from fastapi import HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import metrics
+from ..config import get_settings
+from ..models import Image
+from ..security import create_download_token, decode_download_token
+
+meta_cache_hits = metrics.counter("image_meta_cache_hits_total", "Unsigned image URLs served from the metadata LRU")
+meta_cache_misses = metrics.counter("image_meta_cache_misses_total", "Unsigned image URLs that had to query the DB")
+
+
+@dataclass(frozen=True)
+class DownloadTarget:
+    """What the download and thumbnail routes need to know about an image."""
+
+    id: int
+    bucket: str
+    key: str
+    filename: str
+    mime_type: Optional[str] = None
+    size_bytes: Optional[int] = None
+    # Who a signed URL was issued to (``admin`` or ``user:<id>``); None for unsigned lookups.
+    scope: Optional[str] = None
+
+    @property
+    def grantee(self) -> Optional[int]:
+        """User id of a user-scoped signed URL."""
+        if self.scope and self.scope.startswith("user:"):
+            return int(self.scope[len("user:") :])
+        return None
+
+
+# Short claim names keep the URLs compact.
+_CLAIMS = {"id": "i", "bucket": "b", "key": "k", "filename": "f", "mime_type": "m", "size_bytes": "z"}
+
+
+def _expires_at(not_after: Optional[datetime]) -> int:
+    """Expiry rounded up to a quarter of the TTL, so repeated listings reuse the same URL."""
+    ttl = get_settings().download_url_ttl_seconds
+    step = max(ttl // 4, 1)
+    expires = (int(time.time()) + ttl) // step * step + step
+    if not_after is not None:
+        if not_after.tzinfo is None:
+            not_after = not_after.replace(tzinfo=timezone.utc)
+        expires = min(expires, int(not_after.timestamp()))
+    return expires
+
+
+def url_expiry_bucket() -> int:
+    """Expiry a URL signed now gets (before any grant cap); it moves once per quarter TTL."""
+    return _expires_at(None)
+
+
+def sign(row: Any, scope: str, not_after: Optional[datetime] = None) -> str:
+    """Token for ``row`` (an image row mapping or entity), valid until the TTL or ``not_after``.
+
+    ``scope`` records who it was issued to: ``admin`` or ``user:<id>``. For user-scoped
+    URLs pass the grant's ``expires_at`` as ``not_after`` so no link outlives its grant.
+    """
+    get = row.get if isinstance(row, Mapping) else lambda name: getattr(row, name)
+    claims = {short: get(name) for name, short in _CLAIMS.items() if get(name) is not None}
+    claims["s"] = scope
+    return create_download_token(claims, _expires_at(not_after))
+
+
+def with_signed_urls(
+    rows: Iterable[Mapping[str, Any]], scope: str, thumbs: bool = True, grant_expiry: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """Copy ``rows`` with signed ``download_url`` (and ``thumb_url``) filled in.
+
+    ``grant_expiry`` names a column of each row that caps its URL's lifetime.
+    """
+    out = []
+    for row in rows:
+        token = sign(row, scope, row[grant_expiry] if grant_expiry else None)
+        out.append(
+            {
+                **row,
+                "presigned_url": None,
+                "download_url": f"/api/images/{row['id']}/download?token={token}",
+                "thumb_url": f"/api/images/{row['id']}/thumb?token={token}" if thumbs else None,
+            }
+        )
+    return out
+
+
+def verify(token: str, image_id: int) -> DownloadTarget:
+    """Check a signed URL entirely in memory; 403 unless it is intact, unexpired and for ``image_id``."""
+    try:
+        claims = decode_download_token(token)
+    except jwt.ExpiredSignatureError:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Download link expired")
+    except jwt.InvalidTokenError:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid download link")
+    if claims.get("i") != image_id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid download link")
+    return DownloadTarget(**{name: claims.get(short) for name, short in _CLAIMS.items()}, scope=claims.get("s"))
+
+
+class MetadataCache:
+    """Bounded LRU of ``DownloadTarget`` by image id, with a TTL so other workers' deletes age out."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[int, Tuple[float, DownloadTarget]]" = OrderedDict()
+
+    def get(self, image_id: int) -> Optional[DownloadTarget]:
+        entry = self._entries.get(image_id)
+        if entry is None:
+            return None
+        stored_at, target = entry
+        if time.monotonic() - stored_at > self.ttl_seconds:
+            del self._entries[image_id]
+            return None
+        self._entries.move_to_end(image_id)
+        return target
+
+    def put(self, target: DownloadTarget) -> None:
+        self._entries[target.id] = (time.monotonic(), target)
+        self._entries.move_to_end(target.id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def discard(self, image_id: int) -> None:
+        self._entries.pop(image_id, None)
+
+
+_meta_cache: Optional[MetadataCache] = None
+
+
+def get_metadata_cache() -> Optional[MetadataCache]:
+    global _meta_cache
+    settings = get_settings()
+    if settings.image_meta_cache_size <= 0:
+        return None
+    if _meta_cache is None:
+        _meta_cache = MetadataCache(settings.image_meta_cache_size, settings.image_meta_cache_ttl_seconds)
+    return _meta_cache
+
+
+async def lookup(session: AsyncSession, image_id: int) -> DownloadTarget:
+    """Resolve an unsigned URL: metadata LRU first, then the DB; 404 for unknown images."""
+    cache = get_metadata_cache()
+    target = cache.get(image_id) if cache is not None else None
+    if target is not None:
+        meta_cache_hits.inc()
+        return target
+    meta_cache_misses.inc()
+    result = await session.execute(select(*(getattr(Image, name) for name in _CLAIMS)).where(Image.id == image_id))
+    row = result.mappings().one_or_none()
+    if row is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Image not found")
+    target = DownloadTarget(**row)
+    if cache is not None:
+        cache.put(target)
+    return target
+
+
+def forget(image_id: int) -> None:
+    cache = get_metadata_cache()
+    if cache is not None:
+        cache.discard(image_id)
+
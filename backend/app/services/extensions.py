@@ -0,0 +1,66 @@
+"""Read side of the ``user_extensions`` audit trail: every renewal, newest first.
+
+Pages are keyset reads ordered by ``(created_at, id)``, which the migration 0006 indexes
+serve whichever filter is applied, so page 1,000 of a multi-year history costs the same
+as page 1. On a monthly-partitioned table (``python -m app.jobs.extension_history
+partition``) a date range also prunes to the partitions it covers.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import RowMapping, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models import UserExtension
+
+HISTORY_COLUMNS = tuple(UserExtension.__table__.c)
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def encode_cursor(created_at: datetime, extension_id: int) -> str:
+    """Opaque, URL-safe position after a row: ``<created_at in epoch microseconds>.<id>``."""
+    if created_at.tzinfo is None:
+        created_at = created_at.replace(tzinfo=timezone.utc)
+    return f"{(created_at - _EPOCH) // timedelta(microseconds=1)}.{extension_id}"
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        micros, _, extension_id = cursor.partition(".")
+        return _EPOCH + timedelta(microseconds=int(micros)), int(extension_id)
+    except (ValueError, OverflowError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+
+async def list_extension_rows(
+    session: AsyncSession,
+    user_id: Optional[int] = None,
+    admin_id: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+) -> Tuple[List[RowMapping], Optional[str]]:
+    """One page of renewals, newest first, and the cursor of the next page (None on the last).
+
+    ``since`` is inclusive and ``until`` exclusive, both on ``created_at``.
+    """
+    query = select(*HISTORY_COLUMNS)
+    if user_id is not None:
+        query = query.where(UserExtension.user_id == user_id)
+    if admin_id is not None:
+        query = query.where(UserExtension.operated_by_admin_id == admin_id)
+    if since is not None:
+        query = query.where(UserExtension.created_at >= since)
+    if until is not None:
+        query = query.where(UserExtension.created_at < until)
+    if cursor is not None:
+        query = query.where(tuple_(UserExtension.created_at, UserExtension.id) < decode_cursor(cursor))
+    query = query.order_by(UserExtension.created_at.desc(), UserExtension.id.desc()).limit(limit + 1)
+    rows = list((await session.execute(query)).mappings())
+    if len(rows) <= limit:
+        return rows, None
+    last = rows[limit - 1]
+    return rows[:limit], encode_cursor(last["created_at"], last["id"])
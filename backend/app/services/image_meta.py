@@ -0,0 +1,133 @@
+import logging
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Optional
+
+from botocore.exceptions import ClientError
+from PIL import ExifTags, Image as PILImage, ImageOps, UnidentifiedImageError
+
+from ..config import get_settings
+from ..storage import get_s3_client
+
+logger = logging.getLogger(__name__)
+
+# EXIF orientations that rotate by 90° and therefore swap the displayed width and height.
+_TRANSPOSED_ORIENTATIONS = {5, 6, 7, 8}
+
+
+# Leading bytes of each format uploads may be; WebP ("RIFF....WEBP") is checked separately.
+_SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"BM", "image/bmp"),
+    (b"II*\x00", "image/tiff"),
+    (b"MM\x00*", "image/tiff"),
+)
+# Bytes ``sniff_mime`` needs to tell every format apart.
+SNIFF_BYTES = 12
+
+
+@dataclass
+class ImageMetadata:
+    width: Optional[int] = None
+    height: Optional[int] = None
+    orientation: Optional[int] = None
+    image_format: Optional[str] = None
+    dominant_color: Optional[str] = None
+    dhash: Optional[int] = None
+
+
+def probe_header(data: bytes) -> ImageMetadata:
+    """Read dimensions, format and EXIF orientation without decoding pixel data.
+
+    ``data`` only needs to cover the file header, so a ranged read of the object is enough.
+    Width and height are reported as displayed, i.e. after applying the orientation.
+    """
+    try:
+        with PILImage.open(BytesIO(data)) as img:
+            width, height = img.size
+            orientation = int(img.getexif().get(ExifTags.Base.Orientation, 1) or 1)
+            image_format = img.format
+    except (UnidentifiedImageError, OSError, SyntaxError, ValueError):
+        return ImageMetadata()
+    if orientation in _TRANSPOSED_ORIENTATIONS:
+        width, height = height, width
+    return ImageMetadata(width=width, height=height, orientation=orientation, image_format=image_format)
+
+
+def sniff_mime(head: bytes) -> Optional[str]:
+    """MIME type from the file's magic bytes, or None for anything that is not a known image.
+
+    Trusts only the content: a client-declared Content-Type or file extension plays no part.
+    """
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    for signature, mime in _SIGNATURES:
+        if head.startswith(signature):
+            return mime
+    return None
+
+
+def dominant_color(data: bytes, sample_size: int = 32) -> Optional[str]:
+    """Return the most common colour of a small rendition as ``#rrggbb``.
+
+    Intended to run on the thumbnail rather than the original; JPEG input is still drafted
+    down before decoding.
+    """
+    try:
+        with PILImage.open(BytesIO(data)) as img:
+            img.draft("RGB", (sample_size, sample_size))
+            img = img.convert("RGB")
+            img.thumbnail((sample_size, sample_size))
+    except (UnidentifiedImageError, OSError, SyntaxError, ValueError):
+        return None
+    quantized = img.quantize(colors=4)
+    palette = quantized.getpalette() or []
+    colors = quantized.getcolors() or []
+    if not colors:
+        return None
+    _, index = max(colors)
+    r, g, b = palette[index * 3 : index * 3 + 3]
+    return f"#{r:02x}{g:02x}{b:02x}"
+
+
+def dhash(data: bytes, hash_size: int = 8) -> Optional[int]:
+    """Difference hash: one bit per horizontally adjacent pair of a tiny grayscale rendition.
+
+    Survives resizing and recompression, so re-uploads of the same source land within a few
+    bits of each other. Like ``dominant_color`` it is meant for the thumbnail; originals are
+    drafted down and EXIF-rotated to match. Returned as a signed 64-bit int for BIGINT.
+    """
+    try:
+        with PILImage.open(BytesIO(data)) as img:
+            img.draft("L", (hash_size * 4, hash_size * 4))
+            img = ImageOps.exif_transpose(img).convert("L")
+            small = img.resize((hash_size + 1, hash_size), PILImage.Resampling.LANCZOS)
+    except (UnidentifiedImageError, OSError, SyntaxError, ValueError):
+        return None
+    pixels = small.tobytes()
+    bits = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            bits = (bits << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    size = hash_size * hash_size
+    return bits - (1 << size) if bits >> (size - 1) else bits
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return ((a ^ b) & 0xFFFF_FFFF_FFFF_FFFF).bit_count()
+
+
+def probe_object(bucket: str, key: str) -> ImageMetadata:
+    """Probe an object already in storage by fetching only its leading bytes."""
+    settings = get_settings()
+    try:
+        obj = get_s3_client().get_object(Bucket=bucket, Key=key, Range=f"bytes=0-{settings.image_probe_bytes - 1}")
+        head = obj["Body"].read()
+    except ClientError as e:
+        logger.warning("Could not probe %s/%s: %s", bucket, key, e)
+        return ImageMetadata()
+    return probe_header(head)
@@ -1,14 +1,42 @@
-from typing import Iterable, List, Optional, Sequence
+from collections import defaultdict
+from dataclasses import asdict
+from datetime import datetime
+from itertools import combinations
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
 
 from fastapi import HTTPException, status
-from sqlalchemy import Select, delete, func, select
+from sqlalchemy import RowMapping, Select, delete, exists, func, insert, or_, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..models import Admin, Image, User, UserImage
-from ..schemas import AssignImagesRequest, AssignUsersRequest, ImageCreate
+from ..config import get_settings
+from ..models import (
+    DHASH_BAND_BITS,
+    DHASH_BANDS,
+    GrantChangeEnum,
+    Image,
+    User,
+    UserImage,
+    UserImageChange,
+    dhash_band,
+)
+from ..schemas import AssignImagesRequest, AssignUsersRequest, ImageCreate, ImageRead
+from ..security import Principal
+from ..utils.db import dialect_insert
+from ..utils.search import check_offset, text_search
+from ..utils.time import utc_now
+from .image_meta import ImageMetadata, hamming_distance
+from .users import USER_READ_COLUMNS
 
+# Stored columns that ImageRead exposes; URL fields are filled in per request.
+IMAGE_READ_COLUMNS = tuple(column for name, column in Image.__table__.c.items() if name in ImageRead.model_fields)
 
-async def create_image_record(session: AsyncSession, payload: ImageCreate, admin: Optional[Admin]) -> Image:
+
+async def create_image_record(
+    session: AsyncSession,
+    payload: ImageCreate,
+    admin: Optional[Principal],
+    metadata: Optional[ImageMetadata] = None,
+) -> Image:
     image = Image(
         bucket=payload.bucket,
         key=payload.key,
@@ -17,6 +45,7 @@ async def create_image_record(session: AsyncSession, payload: ImageCreate, admin
         size_bytes=payload.size_bytes,
         checksum_sha256=payload.checksum_sha256,
         uploader_admin_id=admin.id if admin else None,
+        **asdict(metadata or ImageMetadata()),
     )
     session.add(image)
     await session.commit()
@@ -24,12 +53,196 @@ async def create_image_record(session: AsyncSession, payload: ImageCreate, admin
     return image
 
 
-async def list_images(session: AsyncSession) -> List[Image]:
-    result = await session.execute(select(Image).order_by(Image.created_at.desc()))
-    return list(result.scalars())
+async def list_image_rows(session: AsyncSession) -> List[RowMapping]:
+    result = await session.execute(
+        select(*IMAGE_READ_COLUMNS).where(Image.deleted_at.is_(None)).order_by(Image.created_at.desc())
+    )
+    return list(result.mappings())
+
+
+async def search_image_rows(session: AsyncSession, query: str, limit: int, offset: int = 0) -> List[RowMapping]:
+    """Live images whose filename or key matches ``query``, best match first."""
+    live = Image.deleted_at.is_(None)
+    check_offset(offset)
+    match, rank = text_search(session, query, Image.id, Image.filename, Image.key, where=(live,))
+    result = await session.execute(
+        select(*IMAGE_READ_COLUMNS, rank.label("rank"))
+        .where(live, match)
+        .order_by(rank.desc(), Image.id.desc())
+        .limit(limit)
+        .offset(offset)
+    )
+    return list(result.mappings())
+
+
+def _band_probes(value: int, radius: int) -> List[int]:
+    """Every band value within ``radius`` flipped bits of ``value``."""
+    probes = [value]
+    for flips in range(1, radius + 1):
+        for bits in combinations(range(DHASH_BAND_BITS), flips):
+            probes.append(value ^ sum(1 << bit for bit in bits))
+    return probes
+
+
+async def similar_image_rows(session: AsyncSession, image: Image, max_distance: int, limit: int) -> List[Dict]:
+    """Live images whose dhash is within ``max_distance`` bits of ``image``'s, closest first.
+
+    Candidates come from the band indexes only: if two hashes differ in at most
+    ``max_distance`` bits, some band differs in at most ``max_distance // DHASH_BANDS``, so
+    probing each band's neighbourhood finds every match without a pairwise scan. The exact
+    distance is then checked on the candidates.
+    """
+    radius = max_distance // DHASH_BANDS
+    mask = (1 << DHASH_BAND_BITS) - 1
+    probes = [
+        dhash_band(Image.dhash, band).in_(_band_probes((image.dhash >> (band * DHASH_BAND_BITS)) & mask, radius))
+        for band in range(DHASH_BANDS)
+    ]
+    candidates = await session.execute(
+        select(Image.id, Image.dhash).where(
+            Image.dhash.is_not(None), Image.deleted_at.is_(None), Image.id != image.id, or_(*probes)
+        )
+    )
+    distances = {
+        row.id: distance
+        for row in candidates
+        if (distance := hamming_distance(image.dhash, row.dhash)) <= max_distance
+    }
+    nearest = sorted(distances, key=lambda image_id: (distances[image_id], image_id))[:limit]
+    if not nearest:
+        return []
+    result = await session.execute(select(*IMAGE_READ_COLUMNS).where(Image.id.in_(nearest)))
+    rows = [{**row, "distance": distances[row["id"]]} for row in result.mappings()]
+    rows.sort(key=lambda row: (row["distance"], row["id"]))
+    return rows
+
+
+async def list_user_rows_for_image(
+    session: AsyncSession, image_id: int, limit: Optional[int] = None, after: Optional[int] = None
+) -> List[RowMapping]:
+    """Users granted ``image_id``. With ``limit``, one page in user id order after ``after``.
+
+    Pages are keyset reads of the ``(image_id, user_id)`` index, so the thousandth page of an
+    image shared with 100k users costs the same as the first.
+    """
+    query = (
+        select(*USER_READ_COLUMNS)
+        .join(UserImage, UserImage.user_id == User.id)
+        .where(UserImage.image_id == image_id)
+    )
+    if limit is not None:
+        if after is not None:
+            query = query.where(UserImage.user_id > after)
+        query = query.order_by(UserImage.user_id).limit(limit)
+    result = await session.execute(query)
+    return list(result.mappings())
+
+
+async def count_users_for_image(session: AsyncSession, image_id: int) -> int:
+    result = await session.execute(select(func.count()).select_from(UserImage).where(UserImage.image_id == image_id))
+    return result.scalar_one()
+
+
+async def count_images_for_user(session: AsyncSession, user_id: int) -> int:
+    result = await session.execute(select(func.count()).select_from(UserImage).where(UserImage.user_id == user_id))
+    return result.scalar_one()
+
+
+async def user_has_image(session: AsyncSession, user_id: int, image_id: int) -> bool:
+    """Whether ``user_id`` holds an unexpired grant for ``image_id``.
+
+    A single probe of the unique ``(user_id, image_id)`` index, which carries ``expires_at``,
+    so the cost does not grow with either side's fan-out.
+    """
+    result = await session.execute(
+        select(
+            exists().where(
+                UserImage.user_id == user_id,
+                UserImage.image_id == image_id,
+                or_(UserImage.expires_at.is_(None), UserImage.expires_at > utc_now()),
+            )
+        )
+    )
+    return bool(result.scalar_one())
+
+
+async def record_grant_changes(
+    session: AsyncSession, changes: Iterable[Tuple[int, int, GrantChangeEnum]]
+) -> None:
+    """Bump ``grants_version`` once per affected user and log each ``(user_id, image_id, op)``.
+
+    Runs inside the caller's transaction; the caller commits.
+    """
+    by_user: Dict[int, List[Tuple[int, GrantChangeEnum]]] = defaultdict(list)
+    for user_id, image_id, op in changes:
+        by_user[user_id].append((image_id, op))
+    user_ids = sorted(by_user)
+    batch_size = get_settings().assignment_batch_size
+    for start in range(0, len(user_ids), batch_size):
+        # Lock user rows in id order so concurrent grants touching overlapping users cannot deadlock.
+        locked = (
+            select(User.id)
+            .where(User.id.in_(user_ids[start : start + batch_size]))
+            .order_by(User.id)
+            .with_for_update()
+            .subquery()
+        )
+        result = await session.execute(
+            update(User)
+            .where(User.id == locked.c.id)
+            .values(grants_version=User.grants_version + 1)
+            .returning(User.id, User.grants_version)
+            .execution_options(synchronize_session=False)
+        )
+        rows = [
+            {"user_id": user_id, "image_id": image_id, "version": version, "op": op}
+            for user_id, version in result
+            for image_id, op in by_user[user_id]
+        ]
+        if rows:
+            await session.execute(insert(UserImageChange), rows)
+
+
+async def get_grant_changes(session: AsyncSession, user_id: int, since: int) -> Tuple[List[int], List[int]]:
+    """Return ``(added_image_ids, removed_image_ids)`` for changes after version ``since``.
+
+    Several changes to the same image collapse into the most recent one.
+    """
+    result = await session.execute(
+        select(UserImageChange.image_id, UserImageChange.op)
+        .where(UserImageChange.user_id == user_id, UserImageChange.version > since)
+        .order_by(UserImageChange.version, UserImageChange.id)
+    )
+    latest: Dict[int, GrantChangeEnum] = {}
+    for image_id, op in result:
+        latest[image_id] = op
+    added = [image_id for image_id, op in latest.items() if op == GrantChangeEnum.added]
+    removed = [image_id for image_id, op in latest.items() if op == GrantChangeEnum.removed]
+    return added, removed
+
+
+async def list_image_rows_for_user(
+    session: AsyncSession, user_id: int, image_ids: Optional[Sequence[int]] = None
+) -> List[RowMapping]:
+    """Images granted to ``user_id`` as plain row mappings holding ``ImageRead`` columns.
+
+    Skips ORM entity construction entirely; the rows feed straight into the serializer.
+    ``grant_expires_at`` rides along so signed download URLs can stop at the grant's end.
+    """
+    query = (
+        select(*IMAGE_READ_COLUMNS, UserImage.expires_at.label("grant_expires_at"))
+        .join(UserImage, UserImage.image_id == Image.id)
+        .where(UserImage.user_id == user_id)
+    )
+    if image_ids is not None:
+        query = query.where(Image.id.in_(image_ids))
+    result = await session.execute(query)
+    return list(result.mappings())
 
 
 async def delete_image(session: AsyncSession, image: Image) -> None:
+    result = await session.execute(select(UserImage.user_id).where(UserImage.image_id == image.id))
+    await record_grant_changes(session, ((user_id, image.id, GrantChangeEnum.removed) for user_id in result.scalars()))
     await session.delete(image)
     await session.commit()
 
@@ -42,42 +255,54 @@ async def remove_image_from_user(session: AsyncSession, user_id: int, image_id:
     if not link:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Assignment not found")
     await session.delete(link)
+    await record_grant_changes(session, [(user_id, image_id, GrantChangeEnum.removed)])
     await session.commit()
 
 
+async def _insert_grants(
+    session: AsyncSession,
+    pairs: Sequence[Tuple[int, int]],
+    expires_at: Optional[datetime],
+    admin: Optional[Principal],
+) -> List[Tuple[int, int]]:
+    """Insert the ``(user_id, image_id)`` grants that do not exist yet; return those inserted.
+
+    One multi-row ``INSERT ... ON CONFLICT DO NOTHING RETURNING`` per batch instead of a
+    lookup per pair; a pair granted concurrently by someone else is skipped, not an error.
+    """
+    granted_by = admin.id if admin else None
+    stmt = (
+        dialect_insert(session, UserImage)
+        .on_conflict_do_nothing(index_elements=[UserImage.user_id, UserImage.image_id])
+        .returning(UserImage.user_id, UserImage.image_id)
+    )
+    batch_size = get_settings().assignment_batch_size
+    inserted: List[Tuple[int, int]] = []
+    for start in range(0, len(pairs), batch_size):
+        result = await session.execute(
+            stmt,
+            [
+                {"user_id": user_id, "image_id": image_id, "expires_at": expires_at, "granted_by_admin_id": granted_by}
+                for user_id, image_id in pairs[start : start + batch_size]
+            ],
+        )
+        inserted.extend((user_id, image_id) for user_id, image_id in result)
+    return inserted
+
+
 async def assign_image_to_users(
-    session: AsyncSession, image: Image, payload: AssignUsersRequest, admin: Optional[Admin]
+    session: AsyncSession, image: Image, payload: AssignUsersRequest, admin: Optional[Principal]
 ) -> None:
-    for user_id in payload.user_ids:
-        exists = await session.execute(select(UserImage).where(UserImage.user_id == user_id, UserImage.image_id == image.id))
-        if exists.scalar_one_or_none():
-            continue
-        session.add(
-            UserImage(
-                user_id=user_id,
-                image_id=image.id,
-                expires_at=payload.expires_at,
-                granted_by_admin_id=admin.id if admin else None,
-            )
-        )
+    pairs = [(user_id, image.id) for user_id in dict.fromkeys(payload.user_ids)]
+    added = await _insert_grants(session, pairs, payload.expires_at, admin)
+    await record_grant_changes(session, ((user_id, image_id, GrantChangeEnum.added) for user_id, image_id in added))
     await session.commit()
 
 
 async def assign_images_to_user(
-    session: AsyncSession, user: User, payload: AssignImagesRequest, admin: Optional[Admin]
+    session: AsyncSession, user: User, payload: AssignImagesRequest, admin: Optional[Principal]
 ) -> None:
-    for image_id in payload.image_ids:
-        exists = await session.execute(
-            select(UserImage).where(UserImage.user_id == user.id, UserImage.image_id == image_id)
-        )
-        if exists.scalar_one_or_none():
-            continue
-        session.add(
-            UserImage(
-                user_id=user.id,
-                image_id=image_id,
-                expires_at=payload.expires_at,
-                granted_by_admin_id=admin.id if admin else None,
-            )
-        )
+    pairs = [(user.id, image_id) for image_id in dict.fromkeys(payload.image_ids)]
+    added = await _insert_grants(session, pairs, payload.expires_at, admin)
+    await record_grant_changes(session, ((user_id, image_id, GrantChangeEnum.added) for user_id, image_id in added))
     await session.commit()
@@ -0,0 +1,159 @@
+import asyncio
+import hashlib
+import logging
+import time
+from dataclasses import dataclass
+from io import BytesIO
+from typing import Optional
+
+from botocore.exceptions import ClientError
+from fastapi.concurrency import run_in_threadpool
+from PIL import Image as PILImage, ImageOps
+from sqlalchemy import text
+
+from .. import metrics
+from ..config import get_settings
+from ..deps import lock_engine
+from ..models import Image
+from ..storage import get_s3_client
+from ..utils.singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+thumb_builds = metrics.counter("thumb_builds_total", "Thumbnails rendered and uploaded by this worker")
+thumb_coalesced = metrics.counter(
+    "thumb_build_coalesced_total", "Thumbnail requests that reused a build already in flight"
+)
+
+# How often a worker that lost the lock race checks whether the winner has finished.
+LOCK_POLL_SECONDS = 0.1
+
+_inflight: SingleFlight[Optional["BuiltThumb"]] = SingleFlight()
+
+
+@dataclass
+class BuiltThumb:
+    key: str
+    data: bytes
+    mime: str
+    etag: str
+
+
+def thumb_key_for(image: Image) -> str:
+    return f"{image.key}.thumb"
+
+
+def make_thumb(data: bytes, max_size: Optional[int] = None, quality: Optional[int] = None) -> tuple[bytes, str]:
+    """Generate a thumbnail and return bytes and mime.
+
+    JPEG sources are decoded at a reduced DCT scale via ``draft()`` so a 48 MP photo never
+    gets fully decoded. EXIF orientation is applied, metadata other than the ICC profile is
+    dropped, and the output is JPEG (or WebP when the source has transparency).
+    """
+    settings = get_settings()
+    max_size = max_size or settings.thumb_max_size
+    quality = quality or settings.thumb_quality
+    with PILImage.open(BytesIO(data)) as src:
+        if src.width * src.height > settings.thumb_max_pixels:
+            raise PILImage.DecompressionBombError(
+                f"Image has {src.width * src.height} pixels, limit is {settings.thumb_max_pixels}"
+            )
+        icc_profile = src.info.get("icc_profile")
+        if src.format == "JPEG":
+            src.draft(src.mode, (max_size, max_size))
+        src.thumbnail((max_size, max_size), PILImage.Resampling.LANCZOS)
+        # Rotate after downscaling: the bounding box is square, and turning 400px is cheap.
+        ImageOps.exif_transpose(src, in_place=True)
+        img = src
+
+    has_alpha = img.mode in ("RGBA", "LA", "PA") or (img.mode == "P" and "transparency" in img.info)
+    buf = BytesIO()
+    extra = {"icc_profile": icc_profile} if icc_profile else {}
+    if has_alpha:
+        img.convert("RGBA").save(buf, format="WEBP", quality=quality, method=4, **extra)
+        return buf.getvalue(), "image/webp"
+    if img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+    img.save(buf, format="JPEG", quality=quality, optimize=True, progressive=True, **extra)
+    return buf.getvalue(), "image/jpeg"
+
+
+def _advisory_lock_id(key: str) -> int:
+    """Map an object key onto the signed 64-bit keyspace of PostgreSQL advisory locks."""
+    return int.from_bytes(hashlib.sha256(key.encode()).digest()[:8], "big", signed=True)
+
+
+def _thumb_exists(bucket: str, key: str) -> bool:
+    try:
+        get_s3_client().head_object(Bucket=bucket, Key=key)
+    except ClientError:
+        return False
+    return True
+
+
+def _render_and_upload(image: Image, bucket: str, key: str) -> BuiltThumb:
+    client = get_s3_client()
+    original = client.get_object(Bucket=image.bucket, Key=image.key)["Body"].read()
+    data, mime = make_thumb(original)
+    put = client.put_object(Bucket=bucket, Key=key, Body=data, ContentType=mime)
+    thumb_builds.inc()
+    return BuiltThumb(key=key, data=data, mime=mime, etag=put.get("ETag", ""))
+
+
+async def _try_lock(lock_id: int) -> bool:
+    async with lock_engine.connect() as conn:
+        return bool(await conn.scalar(text("SELECT pg_try_advisory_lock(:id)"), {"id": lock_id}))
+
+
+async def _unlock(lock_id: int) -> None:
+    try:
+        async with lock_engine.connect() as conn:
+            await conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": lock_id})
+    except Exception:
+        # A lost connection has released the lock with it.
+        logger.warning("Could not release thumbnail lock %s", lock_id, exc_info=True)
+
+
+async def _build_locked(image: Image, bucket: str, key: str) -> Optional[BuiltThumb]:
+    """Build the thumbnail while holding a cluster-wide advisory lock on its key.
+
+    The lock is a session-level one on ``lock_engine``'s single connection, which is only
+    checked out for the lock and unlock statements; the download, render and upload in
+    between hold no pool connection. Workers on other replicas that lose the race poll until
+    the object appears and return ``None`` instead of rendering it again.
+    """
+    settings = get_settings()
+    if lock_engine.dialect.name != "postgresql":
+        if await run_in_threadpool(_thumb_exists, bucket, key):
+            return None
+        return await run_in_threadpool(_render_and_upload, image, bucket, key)
+
+    lock_id = _advisory_lock_id(key)
+    deadline = time.monotonic() + settings.thumb_lock_timeout_seconds
+    while not await _try_lock(lock_id):
+        if await run_in_threadpool(_thumb_exists, bucket, key):
+            return None
+        if time.monotonic() >= deadline:
+            # The lock holder is taking too long; render locally rather than failing the request.
+            logger.warning("Timed out waiting for thumbnail lock on %s", key)
+            return await run_in_threadpool(_render_and_upload, image, bucket, key)
+        await asyncio.sleep(LOCK_POLL_SECONDS)
+    try:
+        if await run_in_threadpool(_thumb_exists, bucket, key):
+            return None
+        return await run_in_threadpool(_render_and_upload, image, bucket, key)
+    finally:
+        await _unlock(lock_id)
+
+
+async def ensure_thumb(image: Image) -> Optional[BuiltThumb]:
+    """Make sure the thumbnail for ``image`` exists in storage.
+
+    Concurrent callers in this process share one build. Returns the rendered thumbnail when
+    this process produced it, or ``None`` when it already existed.
+    """
+    settings = get_settings()
+    key = thumb_key_for(image)
+    if key in _inflight:
+        thumb_coalesced.inc()
+    return await _inflight.do(key, lambda: _build_locked(image, settings.s3_bucket, key))
@@ -0,0 +1,216 @@
+"""Streaming intake for ``/images/upload-file`` that turns bad uploads away from their first bytes.
+
+FastAPI's ``UploadFile`` spools the whole multipart body before the route runs, so a
+multi-gigabyte video would be read to disk before anything looked at it. ``receive_image``
+parses the body as it arrives instead, and stops reading as soon as the upload is known to
+be unwanted:
+
+* a declared ``Content-Length`` over ``upload_max_bytes`` is refused before any body is read (413);
+* the file's magic bytes must name one of ``upload_allowed_types``, whatever the client
+  declared (415);
+* once the image header is in, width x height must be within ``upload_max_pixels`` (413);
+* the running byte count must stay within ``upload_max_bytes`` (413).
+
+Accepted files are spooled, in memory up to ``SPOOL_MEMORY_BYTES`` and on disk past that.
+"""
+from dataclasses import dataclass
+from tempfile import SpooledTemporaryFile
+from typing import List, NoReturn, Optional, Tuple
+
+from fastapi import HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
+from multipart.multipart import MultipartParser, parse_options_header
+from PIL import Image as PILImage
+
+from .. import metrics
+from ..config import get_settings
+from . import image_meta
+
+upload_rejections = metrics.counter("upload_rejections_total", "Uploads refused before storage, by reason")
+
+SPOOL_MEMORY_BYTES = 1024 * 1024
+# Allowance for boundaries, part headers and small form fields on top of the file itself.
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+# OpenAPI description of the body, which FastAPI cannot infer once the route reads it itself.
+OPENAPI_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["file"],
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                }
+            }
+        },
+    }
+}
+
+
+@dataclass
+class ReceivedImage:
+    filename: str
+    mime_type: str
+    size: int
+    metadata: image_meta.ImageMetadata
+    file: SpooledTemporaryFile
+
+
+def allowed_types() -> List[str]:
+    return [mime.strip() for mime in get_settings().upload_allowed_types.split(",") if mime.strip()]
+
+
+def reject(status_code: int, reason: str, detail: str) -> NoReturn:
+    upload_rejections.inc(reason=reason)
+    raise HTTPException(status_code=status_code, detail=detail)
+
+
+class _ImageIntake:
+    """Callbacks for ``MultipartParser`` that keep the ``file`` part and vet it as it grows."""
+
+    def __init__(self) -> None:
+        settings = get_settings()
+        self.max_bytes = settings.upload_max_bytes
+        self.max_pixels = settings.upload_max_pixels
+        self.probe_bytes = settings.image_probe_bytes
+        self.allowed = allowed_types()
+        self.file = SpooledTemporaryFile(max_size=SPOOL_MEMORY_BYTES)
+        self.head = bytearray()
+        self.size = 0
+        self.filename: Optional[str] = None
+        self.mime_type: Optional[str] = None
+        self.metadata: Optional[image_meta.ImageMetadata] = None
+        self._headers: List[Tuple[bytes, bytes]] = []
+        self._field = b""
+        self._value = b""
+        self._in_file = False
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+        }
+
+    def on_part_begin(self) -> None:
+        self._headers = []
+
+    def on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._field += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._value += data[start:end]
+
+    def on_header_end(self) -> None:
+        self._headers.append((self._field.lower(), self._value))
+        self._field = self._value = b""
+
+    def on_headers_finished(self) -> None:
+        disposition = dict(self._headers).get(b"content-disposition", b"")
+        _, options = parse_options_header(disposition)
+        if options.get(b"name") != b"file" or b"filename" not in options:
+            return
+        if self.filename is not None:
+            reject(status.HTTP_400_BAD_REQUEST, "multiple", "Upload one file per request")
+        self.filename = options[b"filename"].decode("utf-8", "replace")
+        self._in_file = True
+
+    def on_part_data(self, data: bytes, start: int, end: int) -> None:
+        if not self._in_file:
+            return
+        chunk = data[start:end]
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            reject(status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, "size", f"File is larger than {self.max_bytes} bytes")
+        if len(self.head) < self.probe_bytes:
+            self.head += chunk[: self.probe_bytes - len(self.head)]
+            self.check_head()
+        self.file.write(chunk)
+
+    def on_part_end(self) -> None:
+        self._in_file = False
+
+    def check_head(self, complete: bool = False) -> None:
+        """Vet the leading bytes: type once they can be sniffed, pixels once the header parses."""
+        if self.mime_type is None:
+            if len(self.head) < image_meta.SNIFF_BYTES and not complete:
+                return
+            mime_type = image_meta.sniff_mime(bytes(self.head))
+            if mime_type is None or mime_type not in self.allowed:
+                reject(status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, "type", "Unsupported image type")
+            self.mime_type = mime_type
+        if self.metadata is None:
+            self.check_pixels(bytes(self.head))
+
+    def check_pixels(self, data: bytes) -> None:
+        try:
+            metadata = image_meta.probe_header(data)
+        except PILImage.DecompressionBombError:
+            metadata = None
+        if metadata is not None and metadata.width is None:
+            return  # header not complete yet
+        if metadata is None or metadata.width * metadata.height > self.max_pixels:
+            reject(
+                status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, "pixels", f"Image is larger than {self.max_pixels} pixels"
+            )
+        self.metadata = metadata
+
+
+async def receive_image(request: Request) -> ReceivedImage:
+    """Read the ``file`` part of a multipart upload, rejecting it as early as the limits allow.
+
+    Other form fields are read past and ignored. The caller owns (and must close) the
+    returned ``file``, positioned at its start.
+    """
+    settings = get_settings()
+    _, params = parse_options_header(request.headers.get("content-type", ""))
+    boundary = params.get(b"boundary")
+    if boundary is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Expected a multipart/form-data upload")
+    body_limit = settings.upload_max_bytes + MULTIPART_OVERHEAD_BYTES
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > body_limit:
+        reject(
+            status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, "size", f"File is larger than {settings.upload_max_bytes} bytes"
+        )
+
+    intake = _ImageIntake()
+    parser = MultipartParser(boundary, intake.callbacks())
+    received = 0
+    try:
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > body_limit:
+                reject(
+                    status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                    "size",
+                    f"File is larger than {settings.upload_max_bytes} bytes",
+                )
+            parser.write(chunk)
+        parser.finalize()
+        if intake.filename is None:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No file in upload")
+        intake.check_head(complete=True)
+        if intake.metadata is None:
+            # The header ran past the probe window; it is all on hand now.
+            intake.file.seek(0)
+            await run_in_threadpool(intake.check_pixels, intake.file.read())
+        if intake.metadata is None:
+            reject(status.HTTP_415_UNSUPPORTED_MEDIA_TYPE, "decode", "Image could not be decoded")
+    except BaseException:
+        intake.file.close()
+        raise
+    intake.file.seek(0)
+    return ReceivedImage(
+        filename=intake.filename,
+        mime_type=intake.mime_type,
+        size=intake.size,
+        metadata=intake.metadata,
+        file=intake.file,
+    )
@@ -1,15 +1,57 @@
-from datetime import datetime
-from typing import Optional
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
 
 from fastapi import HTTPException, status
-from sqlalchemy import select
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+from sqlalchemy import RowMapping, and_, func, insert, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from ..models import StatusEnum, User, UserExtension
-from ..schemas import UserCreate, UserExtendRequest, UserUpdate
-from ..security import get_password_hash
+from ..models import StatusEnum, UsageLog, User, UserExtension
+from ..config import get_settings
+from ..schemas import (
+    BulkOperationResult,
+    UserBulkExtendRequest,
+    UserBulkStatusRequest,
+    UserBulkTarget,
+    UserCreate,
+    UserExtendRequest,
+    UserImportError,
+    UserImportResult,
+    UserRead,
+    UserUpdate,
+)
+from ..security import get_password_hash, hash_passwords
+from .auth import forget_token_versions
+from ..utils.db import dialect_insert
+from ..utils.search import check_offset, text_search
 from ..utils.time import utc_now
 
+# Stored columns that UserRead exposes.
+USER_READ_COLUMNS = tuple(column for name, column in User.__table__.c.items() if name in UserRead.model_fields)
+
+
+async def list_user_rows(session: AsyncSession) -> List[RowMapping]:
+    result = await session.execute(select(*USER_READ_COLUMNS).order_by(User.created_at.desc()))
+    return list(result.mappings())
+
+
+async def search_user_rows(session: AsyncSession, query: str, limit: int, offset: int = 0) -> List[RowMapping]:
+    """Users whose username or notes match ``query``, best match first."""
+    check_offset(offset)
+    match, rank = text_search(session, query, User.id, User.username, User.notes)
+    result = await session.execute(
+        select(*USER_READ_COLUMNS, rank.label("rank"))
+        .where(match)
+        .order_by(rank.desc(), User.id.desc())
+        .limit(limit)
+        .offset(offset)
+    )
+    return list(result.mappings())
+
 
 async def create_user(session: AsyncSession, payload: UserCreate) -> User:
     exists = await session.execute(select(User).where(User.username == payload.username))
@@ -33,11 +75,15 @@ async def update_user(session: AsyncSession, user: User, payload: UserUpdate) ->
         user.password_hash = get_password_hash(payload.password)
     if payload.status:
         user.status = payload.status
+    if payload.password or payload.status:
+        user.token_version += 1
     if payload.expires_at is not None:
         user.expires_at = payload.expires_at
     if payload.notes is not None:
         user.notes = payload.notes
     await session.commit()
+    if payload.password or payload.status:
+        await forget_token_versions("user", [user.id])
     await session.refresh(user)
     return user
 
@@ -63,6 +109,220 @@ async def extend_user(
 
 async def disable_user(session: AsyncSession, user: User) -> User:
     user.status = StatusEnum.disabled
+    user.token_version += 1
     await session.commit()
+    await forget_token_versions("user", [user.id])
     await session.refresh(user)
     return user
+
+
+def parse_import_rows(stream: BinaryIO, fmt: str) -> Iterator[Dict[str, Any]]:
+    """Yield one dict per record of a CSV (with header) or NDJSON upload.
+
+    Empty CSV cells become ``None`` so optional fields fall back to their defaults.
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        for record in csv.DictReader(text):
+            yield {k: v for k, v in record.items() if k and v not in ("", None)}
+        return
+    for line in text:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            yield {"__error__": f"Invalid JSON: {e.msg}"}
+            continue
+        yield record if isinstance(record, dict) else {"__error__": "Expected a JSON object"}
+
+
+def _validation_message(exc: ValidationError) -> str:
+    first = exc.errors()[0]
+    location = ".".join(str(part) for part in first["loc"])
+    return f"{location}: {first['msg']}" if location else first["msg"]
+
+
+def _validate_import_rows(
+    records: Iterator[Dict[str, Any]],
+) -> Tuple[List[UserImportError], List[Tuple[int, UserCreate]]]:
+    """Validate parsed rows; runs in the threadpool, since iterating them reads the upload."""
+    errors: List[UserImportError] = []
+    pending: List[Tuple[int, UserCreate]] = []
+    seen: set[str] = set()
+    for row_no, record in enumerate(records, start=1):
+        if "__error__" in record:
+            errors.append(UserImportError(row=row_no, error=record["__error__"]))
+            continue
+        try:
+            payload = UserCreate.model_validate(record)
+        except ValidationError as e:
+            errors.append(UserImportError(row=row_no, username=record.get("username"), error=_validation_message(e)))
+            continue
+        if payload.username in seen:
+            errors.append(UserImportError(row=row_no, username=payload.username, error="Duplicate username in file"))
+            continue
+        seen.add(payload.username)
+        pending.append((row_no, payload))
+    return errors, pending
+
+
+async def import_users(session: AsyncSession, records: Iterator[Dict[str, Any]]) -> UserImportResult:
+    """Create many users at once, reporting failures per input row instead of aborting.
+
+    Usernames that already exist are filtered out before hashing so no bcrypt work is spent
+    on rows that cannot be inserted; the survivors are hashed in parallel on the process pool
+    and written with multi-row ``INSERT ... ON CONFLICT DO NOTHING`` in one transaction.
+    """
+    settings = get_settings()
+    errors, pending = await run_in_threadpool(_validate_import_rows, records)
+
+    batch_size = settings.bulk_import_batch_size
+    existing: set[str] = set()
+    usernames = [payload.username for _, payload in pending]
+    for start in range(0, len(usernames), batch_size):
+        result = await session.execute(
+            select(User.username).where(User.username.in_(usernames[start : start + batch_size]))
+        )
+        existing.update(result.scalars())
+    for row_no, payload in pending:
+        if payload.username in existing:
+            errors.append(UserImportError(row=row_no, username=payload.username, error="Username already exists"))
+    pending = [(row_no, payload) for row_no, payload in pending if payload.username not in existing]
+
+    hashes = await hash_passwords([payload.password for _, payload in pending])
+
+    created = 0
+    for start in range(0, len(pending), batch_size):
+        batch = pending[start : start + batch_size]
+        values = [
+            {
+                "username": payload.username,
+                "password_hash": password_hash,
+                "status": payload.status,
+                "expires_at": payload.expires_at,
+                "notes": payload.notes,
+            }
+            for (_, payload), password_hash in zip(batch, hashes[start : start + batch_size])
+        ]
+        stmt = (
+            dialect_insert(session, User)
+            .values(values)
+            .on_conflict_do_nothing(index_elements=[User.username])
+            .returning(User.username)
+        )
+        inserted = set((await session.execute(stmt)).scalars())
+        created += len(inserted)
+        # Lost a race with a concurrent insert of the same username.
+        for row_no, payload in batch:
+            if payload.username not in inserted:
+                errors.append(UserImportError(row=row_no, username=payload.username, error="Username already exists"))
+    await session.commit()
+    errors.sort(key=lambda e: e.row)
+    return UserImportResult(created=created, errors=errors)
+
+
+async def _resolve_bulk_targets(session: AsyncSession, target: UserBulkTarget) -> List[int]:
+    if target.user_ids is not None:
+        return sorted(set(target.user_ids))
+    conditions = []
+    if target.filter.status is not None:
+        conditions.append(User.status == target.filter.status)
+    if target.filter.expires_before is not None:
+        conditions.append(User.expires_at < target.filter.expires_before)
+    if target.filter.expires_after is not None:
+        conditions.append(User.expires_at >= target.filter.expires_after)
+    result = await session.execute(select(User.id).where(and_(True, *conditions)).order_by(User.id))
+    return list(result.scalars())
+
+
+async def bulk_extend_users(
+    session: AsyncSession, payload: UserBulkExtendRequest, operator_admin_id: Optional[int]
+) -> BulkOperationResult:
+    """Extend expiry for many users in one transaction.
+
+    Each batch is a single ``UPDATE ... FROM (SELECT ... FOR UPDATE) RETURNING`` that hands
+    back old and new expiry together, followed by one multi-row insert of the matching
+    ``UserExtension`` audit rows. ``extend_by_days`` counts from the later of now and the
+    user's current expiry, so lapsed accounts are renewed from today.
+    """
+    now = utc_now()
+    user_ids = await _resolve_bulk_targets(session, payload)
+    updated: List[int] = []
+    for start in range(0, len(user_ids), payload.batch_size):
+        batch = user_ids[start : start + payload.batch_size]
+        old = (
+            select(User.id, User.expires_at.label("old_expires_at"))
+            .where(User.id.in_(batch))
+            .with_for_update()
+            .subquery()
+        )
+        if payload.new_expires_at is not None:
+            new_expires_at = payload.new_expires_at
+        else:
+            base = func.greatest(func.coalesce(User.expires_at, now), now)
+            new_expires_at = base + timedelta(days=payload.extend_by_days)
+        result = await session.execute(
+            update(User)
+            .where(User.id == old.c.id)
+            .values(expires_at=new_expires_at, extended_until=new_expires_at)
+            .returning(User.id, old.c.old_expires_at, User.expires_at)
+            .execution_options(synchronize_session=False)
+        )
+        rows = result.all()
+        if not rows:
+            continue
+        await session.execute(
+            insert(UserExtension),
+            [
+                {
+                    "user_id": user_id,
+                    "old_expires_at": old_expires_at,
+                    "new_expires_at": new_value,
+                    "reason": payload.reason,
+                    "operated_by_admin_id": operator_admin_id,
+                    "created_at": now,
+                }
+                for user_id, old_expires_at, new_value in rows
+            ],
+        )
+        updated.extend(row[0] for row in rows)
+    await session.commit()
+    return BulkOperationResult(affected=len(updated), user_ids=updated)
+
+
+async def bulk_update_status(
+    session: AsyncSession, payload: UserBulkStatusRequest, operator_admin_id: Optional[int]
+) -> BulkOperationResult:
+    """Set status for many users in one transaction, auditing each change in ``usage_logs``."""
+    user_ids = await _resolve_bulk_targets(session, payload)
+    updated: List[int] = []
+    for start in range(0, len(user_ids), payload.batch_size):
+        batch = user_ids[start : start + payload.batch_size]
+        result = await session.execute(
+            update(User)
+            .where(User.id.in_(batch), User.status != payload.status)
+            .values(status=payload.status, token_version=User.token_version + 1)
+            .returning(User.id)
+            .execution_options(synchronize_session=False)
+        )
+        changed = list(result.scalars())
+        if not changed:
+            continue
+        await session.execute(
+            insert(UsageLog),
+            [
+                {
+                    "user_id": user_id,
+                    "admin_id": operator_admin_id,
+                    "action": f"user.status.{payload.status.value}",
+                    "success": True,
+                }
+                for user_id in changed
+            ],
+        )
+        updated.extend(changed)
+    await session.commit()
+    await forget_token_versions("user", updated)
+    return BulkOperationResult(affected=len(updated), user_ids=updated)
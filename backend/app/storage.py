@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import hashlib
+import threading
 from typing import Any, Dict, Optional
 
 import boto3
@@ -9,18 +10,43 @@ from botocore.client import Config
 from .config import get_settings
 
 
+_client = None
+_client_lock = threading.Lock()
+
+
 def get_s3_client():
-    settings = get_settings()
-    session = boto3.session.Session()
-    return session.client(
-        "s3",
-        endpoint_url=settings.s3_endpoint_url,
-        region_name=settings.s3_region,
-        aws_access_key_id=settings.s3_access_key,
-        aws_secret_access_key=settings.s3_secret_key,
-        use_ssl=settings.s3_use_ssl,
-        config=Config(s3={"addressing_style": "path"}),
-    )
+    """This worker's S3 client, built on first use.
+
+    boto3 clients are thread-safe but slow to create, so one is shared by every request
+    and threadpool job in the process and closed at shutdown by ``close_s3_client``.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                settings = get_settings()
+                session = boto3.session.Session()
+                _client = session.client(
+                    "s3",
+                    endpoint_url=settings.s3_endpoint_url,
+                    region_name=settings.s3_region,
+                    aws_access_key_id=settings.s3_access_key,
+                    aws_secret_access_key=settings.s3_secret_key,
+                    use_ssl=settings.s3_use_ssl,
+                    config=Config(
+                        s3={"addressing_style": "path"},
+                        max_pool_connections=settings.s3_max_pool_connections,
+                    ),
+                )
+    return _client
+
+
+def close_s3_client() -> None:
+    global _client
+    with _client_lock:
+        client, _client = _client, None
+    if client is not None:
+        client.close()
 
 
 def generate_presigned_put_url(key: str, content_type: Optional[str]) -> Dict[str, Any]:
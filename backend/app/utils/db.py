@@ -0,0 +1,26 @@
+from typing import Any, Sequence
+
+from sqlalchemy import ColumnElement, any_, bindparam
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def dialect_insert(session: AsyncSession, model: Any):
+    """Dialect-specific ``insert()`` so callers can use ``on_conflict_do_nothing`` / ``do_update``.
+
+    PostgreSQL is the deployment target; SQLite is accepted for local tooling.
+    """
+    if session.bind.dialect.name == "sqlite":
+        return sqlite.insert(model)
+    return postgresql.insert(model)
+
+
+def any_of(session: AsyncSession, column: Any, values: Sequence[Any]) -> ColumnElement:
+    """``column = ANY(:values)`` on PostgreSQL, ``column IN (...)`` elsewhere.
+
+    The array is a single bound parameter, so batches of any size share one statement in
+    SQLAlchemy's compiled cache and asyncpg's prepared statement cache.
+    """
+    if session.bind.dialect.name == "postgresql":
+        return column == any_(bindparam(None, list(values), type_=postgresql.ARRAY(column.type)))
+    return column.in_(values)
@@ -0,0 +1,48 @@
+from contextlib import contextmanager
+from typing import Any, Iterator, List
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+class QueryCounter:
+    """Statements sent through an engine while the counter is attached."""
+
+    def __init__(self) -> None:
+        self.statements: List[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        self.statements.append(statement)
+
+
+@contextmanager
+def count_queries(engine: AsyncEngine) -> Iterator[QueryCounter]:
+    """Count the statements ``engine`` executes inside the block::
+
+        with count_queries(engine) as queries:
+            await client.get("/images/?include_uploader=true")
+        print(queries.count)
+    """
+    counter = QueryCounter()
+    event.listen(engine.sync_engine, "before_cursor_execute", counter._on_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", counter._on_execute)
+
+
+@contextmanager
+def assert_max_queries(engine: AsyncEngine, limit: int, label: Any = "block") -> Iterator[QueryCounter]:
+    """Fail with the offending SQL when the block runs more than ``limit`` statements.
+
+    Guards list endpoints against N+1 regressions: the count must not grow with the rows.
+    """
+    with count_queries(engine) as counter:
+        yield counter
+    if counter.count > limit:
+        listing = "\n".join(f"  {i}. {' '.join(sql.split())[:200]}" for i, sql in enumerate(counter.statements, 1))
+        raise AssertionError(f"{label} ran {counter.count} queries, expected at most {limit}:\n{listing}")
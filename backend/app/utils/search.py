@@ -0,0 +1,71 @@
+import re
+from typing import Sequence, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import ColumnElement, func, null, or_, select, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..config import get_settings
+
+
+def like_pattern(query: str) -> str:
+    """``%query%`` with LIKE wildcards in ``query`` escaped (escape character ``\\``)."""
+    escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def word_pattern(query: str) -> str:
+    """Regular expression for ``query`` standing as whole words: no letter or digit either side."""
+    escaped = re.sub(r"([\\^$.|?*+()\[\]{}])", r"\\\1", query)
+    return f"(^|[^[:alnum:]]){escaped}([^[:alnum:]]|$)"
+
+
+def check_offset(offset: int) -> None:
+    """Refuse a page past the ranked candidates, which would always come back empty."""
+    cap = get_settings().search_max_candidates
+    if offset >= cap:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Search results stop at {cap} matches; refine the query to see others",
+        )
+
+
+def text_search(
+    session: AsyncSession, query: str, id_column, *columns, where: Sequence[ColumnElement] = ()
+) -> Tuple[ColumnElement, ColumnElement]:
+    """Return ``(match, rank)`` expressions searching ``query`` across ``columns``.
+
+    On PostgreSQL a row matches on a case-insensitive substring or a close word match
+    (``%>``, pg_trgm's word-similarity operator), both served by the trigram GIN indexes,
+    and ``rank`` is the best ``word_similarity`` over the columns. A GIN index finds matches
+    but cannot order them, and ranking every match of a broad term means tens of thousands
+    of rows, so ``match`` admits only ``search_max_candidates`` of the best: a row where
+    ``query`` stands as whole words has the top rank, 1.0, so when there are at least that
+    many such rows (the GIN indexes serve that regular expression too) they are the
+    candidates, tied, in storage order; otherwise every match is ranked. No match left out
+    ranks above a candidate, and the set does not depend on the page requested. ``where``
+    narrows the candidates; pass the predicate of a partial index. Elsewhere matching is a
+    plain substring test and ``rank`` is NULL.
+    """
+    pattern = like_pattern(query)
+    substring = or_(*(column.ilike(pattern, escape="\\") for column in columns))
+    if session.bind.dialect.name != "postgresql":
+        return substring, null()
+    cap = get_settings().search_max_candidates
+    words = word_pattern(query)
+    fuzzy = or_(*(column.op("%>")(query) for column in columns))
+    # MATERIALIZED plans the scan without the LIMIT, which would otherwise tempt the planner
+    # into a sequential scan that hopes to meet ``cap`` rows early; rows are still read only
+    # until the LIMIT is met.
+    whole = (
+        select(id_column)
+        .where(*where, or_(*(column.regexp_match(words, flags="i") for column in columns)))
+        .cte("whole_word_hits")
+        .prefix_with("MATERIALIZED")
+    )
+    top = select(whole).limit(cap).cte("top_hits")
+    # One-time filters: PostgreSQL runs only the branch that applies.
+    filled = select(func.count()).select_from(top).scalar_subquery() >= cap
+    every = select(id_column).where(*where, or_(substring, fuzzy), ~filled)
+    rank = func.greatest(*(func.word_similarity(query, column) for column in columns))
+    return id_column.in_(union_all(select(top).where(filled), every)), rank
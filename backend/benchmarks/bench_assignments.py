@@ -0,0 +1,188 @@
+"""Assignment read model under heavy fan-out: one image granted to 100k users.
+
+    python -m benchmarks.bench_assignments [--seed-data --users 100000 --images 5000] [--fanout 100000]
+
+Against ``DATABASE_URL`` (PostgreSQL), grants one dedicated image to the first ``--fanout``
+users of the dataset through ``assign_image_to_users`` (timed, and timed again as a no-op
+re-grant), then times the read side with that image in play: membership checks that hit and
+miss, counts in both directions, first and deep keyset pages of the image's users, and the
+full listings. Every statement of the membership, count and page cases is EXPLAINed and its
+scan nodes printed, so a plan that stops being index-only shows up next to its timing.
+Exits non-zero when the membership check misses ``--budget-ms`` at p95.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.deps import SessionLocal, engine
+from app.models import Image, User
+from app.schemas import AssignUsersRequest
+from app.services import images as image_service
+
+from .datagen import DatasetSpec, add_spec_arguments, prepare, spec_from_args
+from .explain_queries import StatementRecorder, _walk
+
+Case = Callable[[AsyncSession, int], Awaitable[Any]]
+
+
+async def _fanout_image(session: AsyncSession, spec: DatasetSpec) -> Image:
+    key = f"{spec.prefix}fanout.jpg"
+    image = (await session.execute(select(Image).where(Image.key == key))).scalar_one_or_none()
+    if image is None:
+        image = Image(bucket="visomaster", key=key, filename="fanout.jpg", mime_type="image/jpeg", size_bytes=1)
+        session.add(image)
+        await session.commit()
+    return image
+
+
+async def _timed(awaitable: Awaitable[Any]) -> Tuple[float, Any]:
+    started = time.perf_counter()
+    result = await awaitable
+    return (time.perf_counter() - started) * 1000, result
+
+
+def _percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+async def _scan_nodes(session: AsyncSession, recorder: StatementRecorder, case: Case, arg: int) -> List[str]:
+    with recorder.capture() as statements:
+        await case(session, arg)
+    await session.rollback()
+    nodes = []
+    conn = await session.connection()
+    for statement, parameters in statements:
+        doc = (await conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters)).scalar_one()
+        plan = (json.loads(doc) if isinstance(doc, str) else doc)[0]["Plan"]
+        nodes.extend(
+            f"{node['Node Type']} on {node.get('Index Name') or node['Relation Name']}"
+            for node in _walk(plan)
+            if "Relation Name" in node
+        )
+    await session.rollback()
+    return nodes
+
+
+async def run(args: argparse.Namespace) -> int:
+    spec = spec_from_args(args)
+    rng = random.Random(args.seed)
+    async with SessionLocal() as session:
+        if session.bind.dialect.name != "postgresql":
+            sys.exit("covering indexes are a PostgreSQL feature; point DATABASE_URL at one")
+        user_ids = list(
+            (
+                await session.execute(
+                    select(User.id).where(User.username.startswith(spec.prefix)).order_by(User.id).limit(args.fanout)
+                )
+            ).scalars()
+        )
+        if len(user_ids) < args.fanout:
+            sys.exit(f"only {len(user_ids)} users in dataset {spec.prefix!r}; seed at least --fanout of them")
+        image = await _fanout_image(session, spec)
+        image_id = image.id
+        others = list((await session.execute(select(Image.id).where(Image.id != image_id).limit(1000))).scalars())
+
+        payload = AssignUsersRequest(user_ids=user_ids)
+        for label in ("grant", "re-grant (no-op)"):
+            elapsed, _ = await _timed(image_service.assign_image_to_users(session, image, payload, None))
+            print(f"{label:<24} {len(user_ids):>7} users {elapsed:>10.1f} ms")
+        async with engine.connect() as conn:
+            await conn.exec_driver_sql("ANALYZE user_images")
+            await conn.commit()
+
+        deep_after = user_ids[len(user_ids) // 2]
+        cases: Dict[str, Tuple[Case, Callable[[], int], int]] = {
+            "has_image hit": (
+                lambda s, u: image_service.user_has_image(s, u, image_id),
+                lambda: rng.choice(user_ids),
+                args.samples,
+            ),
+            "has_image miss": (
+                lambda s, u: image_service.user_has_image(s, u, rng.choice(others)),
+                lambda: rng.choice(user_ids),
+                args.samples,
+            ),
+            "count users of image": (lambda s, i: image_service.count_users_for_image(s, i), lambda: image_id, 20),
+            "count images of user": (
+                lambda s, u: image_service.count_images_for_user(s, u),
+                lambda: rng.choice(user_ids),
+                args.samples,
+            ),
+            "users page 1": (
+                lambda s, i: image_service.list_user_rows_for_image(s, i, args.page_size),
+                lambda: image_id,
+                args.samples,
+            ),
+            "users deep page": (
+                lambda s, i: image_service.list_user_rows_for_image(s, i, args.page_size, deep_after),
+                lambda: image_id,
+                args.samples,
+            ),
+            "images of user": (
+                lambda s, u: image_service.list_image_rows_for_user(s, u),
+                lambda: rng.choice(user_ids),
+                args.samples,
+            ),
+            "all users of image": (lambda s, i: image_service.list_user_rows_for_image(s, i), lambda: image_id, 3),
+        }
+
+        recorder = StatementRecorder()
+        print(f"\n{'case':<22} {'runs':>5} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9} {'rows':>8}")
+        membership_p95 = 0.0
+        for name, (case, pick, runs) in cases.items():
+            timings, sizes = [], []
+            for _ in range(runs):
+                elapsed, result = await _timed(case(session, pick()))
+                timings.append(elapsed)
+                sizes.append(len(result) if isinstance(result, list) else int(result))
+                await session.rollback()
+            p95 = _percentile(timings, 0.95)
+            if name.startswith("has_image"):
+                membership_p95 = max(membership_p95, p95)
+            print(
+                f"{name:<22} {runs:>5} {statistics.median(timings):>9.2f} {p95:>9.2f}"
+                f" {max(timings):>9.2f} {statistics.mean(sizes):>8.0f}"
+            )
+            if runs == args.samples or name.startswith("count"):
+                for node in await _scan_nodes(session, recorder, case, pick()):
+                    print(f"{'':<24}-> {node}")
+
+    if membership_p95 > args.budget_ms:
+        print(f"membership check p95 {membership_p95:.2f} ms is over {args.budget_ms:.1f} ms")
+        return 1
+    return 0
+
+
+async def _main(args: argparse.Namespace) -> int:
+    try:
+        if args.seed_data:
+            await prepare(spec_from_args(args))
+        return await run(args)
+    finally:
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seed-data", action="store_true", help="load a synthetic dataset first")
+    parser.add_argument("--fanout", type=int, default=100_000, help="users the dedicated image is granted to")
+    parser.add_argument("--samples", type=int, default=200, help="timed calls per case")
+    parser.add_argument("--page-size", type=int, default=100)
+    parser.add_argument("--budget-ms", type=float, default=5.0, help="p95 the membership check must stay under")
+    add_spec_arguments(parser)
+    sys.exit(asyncio.run(_main(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Time-to-ready of a multi-worker uvicorn deployment.
+
+    python -m benchmarks.bench_boot [--workers 4] [--port 8765] [--init-on-startup]
+
+Starts ``uvicorn app.main:app`` against the configured database and S3, polls ``/readyz``
+until every worker has answered ready, then reads each worker's own
+``worker_time_to_ready_seconds`` from ``/metrics``. Without ``--init-on-startup`` the schema
+must already be migrated (``python -m app.bootstrap``), which is the intended deployment.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from typing import Dict, Optional
+
+
+def _get(url: str) -> Optional[str]:
+    try:
+        with urllib.request.urlopen(url, timeout=2) as resp:
+            return resp.read().decode()
+    except (urllib.error.URLError, ConnectionError, TimeoutError):
+        return None
+
+
+def _worker_ready_time(metrics_text: str) -> Optional[float]:
+    for line in metrics_text.splitlines():
+        if line.startswith("worker_time_to_ready_seconds "):
+            return float(line.split()[1])
+    return None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--init-on-startup", action="store_true")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    args = parser.parse_args()
+
+    env = dict(os.environ, RUN_INIT_ON_STARTUP=str(args.init_on_startup).lower(), DEBUG="false")
+    cmd = [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(args.port), "--workers", str(args.workers)]
+    base = f"http://127.0.0.1:{args.port}"
+    started = time.perf_counter()
+    proc = subprocess.Popen(cmd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        first_ready: Optional[float] = None
+        # Connections land on arbitrary workers; keep sampling until each has reported in.
+        per_worker: Dict[str, float] = {}
+        while time.perf_counter() - started < args.timeout:
+            if _get(f"{base}/readyz") is not None and first_ready is None:
+                first_ready = time.perf_counter() - started
+            text = _get(f"{base}/metrics") if first_ready is not None else None
+            value = _worker_ready_time(text) if text else None
+            if value:
+                per_worker[f"{value:.6f}"] = value
+            if len(per_worker) >= args.workers:
+                break
+            time.sleep(0.05)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+    if first_ready is None:
+        sys.exit(f"not ready within {args.timeout:.0f}s")
+    print(f"workers={args.workers} init_on_startup={args.init_on_startup}")
+    print(f"first /readyz 200 after {first_ready:.2f}s (wall clock, includes interpreter start)")
+    for i, value in enumerate(sorted(per_worker.values())):
+        print(f"worker {i}: ready {value:.2f}s after import")
+    if len(per_worker) < args.workers:
+        print(f"only {len(per_worker)} of {args.workers} workers sampled before timeout")
+
+
+if __name__ == "__main__":
+    main()
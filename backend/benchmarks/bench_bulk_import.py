@@ -0,0 +1,79 @@
+"""Bulk user import throughput: per-user ``create_user`` vs ``import_users``.
+
+    DATABASE_URL=postgresql+asyncpg://... python -m benchmarks.bench_bulk_import [--users 100000]
+
+Without ``DATABASE_URL`` a throwaway SQLite file is used (requires ``aiosqlite``). bcrypt
+cost is lowered with ``--rounds`` (default 4) so 100k users finish in minutes; the
+relative speedup is what matters, and at production cost it only grows since hashing is
+the part spread over the process pool.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import io
+import os
+import tempfile
+import time
+
+if "DATABASE_URL" not in os.environ:
+    os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{tempfile.mktemp(suffix='.db')}"
+os.environ.setdefault("DEBUG", "false")
+
+from app.deps import SessionLocal, engine  # noqa: E402
+from app.models import Base  # noqa: E402
+from app.schemas import UserCreate  # noqa: E402
+from app.security import pwd_context, shutdown_hash_pool  # noqa: E402
+from app.services import users as user_service  # noqa: E402
+
+
+def make_csv(n: int, prefix: str) -> bytes:
+    lines = ["username,password,notes"]
+    lines.extend(f"{prefix}{i:07d},pw-{i:07d}-secret,bench" for i in range(n))
+    return ("\n".join(lines) + "\n").encode()
+
+
+async def run(users: int, baseline_sample: int) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    run_id = str(int(time.time()))
+
+    async with SessionLocal() as session:
+        start = time.perf_counter()
+        for i in range(baseline_sample):
+            await user_service.create_user(
+                session, UserCreate(username=f"seq{run_id}-{i:07d}", password=f"pw-{i:07d}-secret")
+            )
+        per_user = (time.perf_counter() - start) / baseline_sample
+
+    data = make_csv(users, f"bulk{run_id}-")
+    async with SessionLocal() as session:
+        start = time.perf_counter()
+        result = await user_service.import_users(session, user_service.parse_import_rows(io.BytesIO(data), "csv"))
+        elapsed = time.perf_counter() - start
+
+    assert result.created == users and not result.errors, result.errors[:5]
+    print(f"bcrypt rounds            : {pwd_context.to_dict()['bcrypt__rounds']}")
+    print(f"per-user create_user     : {1 / per_user:10.1f} users/s  (sampled over {baseline_sample})")
+    print(f"bulk import_users        : {users / elapsed:10.1f} users/s  ({users} users in {elapsed:.1f}s)")
+    print(f"speedup                  : {per_user * users / elapsed:10.1f}x")
+    print(f"projected per-user time  : {per_user * users / 60:10.1f} min for {users} users")
+    await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--baseline-sample", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=4, help="bcrypt cost used for both paths")
+    args = parser.parse_args()
+    # Must happen before the hashing pool forks so workers inherit it.
+    pwd_context.update(bcrypt__rounds=args.rounds)
+    try:
+        asyncio.run(run(args.users, args.baseline_sample))
+    finally:
+        shutdown_hash_pool()
+
+
+if __name__ == "__main__":
+    main()
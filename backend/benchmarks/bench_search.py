@@ -0,0 +1,153 @@
+"""Server-side search latency vs transferring the full list.
+
+    python -m benchmarks.bench_search [--seed-data --images 1000000 --users 100000] [--queries 50]
+
+Against ``DATABASE_URL`` (PostgreSQL with pg_trgm), times ``search_image_rows`` and
+``search_user_rows`` for terms cut from real rows: an exact filename, a filename with one
+character dropped (fuzzy match), a two-word prefix shared by a few hundred rows and a single
+common word. The baseline is what the admin UI did before: ``list_image_rows`` plus JSON
+encoding of every live image. Exits non-zero when any search class misses ``--budget-ms``
+at p95. Seeding ends with ``VACUUM ANALYZE``, so the GIN pending lists are merged first.
+
+On PostgreSQL 18 (pg_trgm 1.6) with 1M images and 100k users, four runs of 50 terms:
+
+    case               p95 ms
+    image exact        68-101   ranks every %> word match: 2-5k rows for digit-heavy names
+    image typo          67-97
+    image two words     34-80   mostly ~35
+    image one word      19-31   whole-word hits fill the cap, nothing else is ranked
+    user name         3.5-6.5
+    full image list    ~30 s    490 MB of JSON
+
+Exact and typo terms miss a 50 ms budget on this synthetic set: its filenames come from a
+47-word vocabulary plus numbers, so a long term word-matches thousands of rows and each
+one is rechecked and scored. The GIN scan alone is ~25 ms. A GiST ``<->`` ordered scan was
+slower still (170-340 ms; the signatures saturate). Raising
+``pg_trgm.word_similarity_threshold`` (default 0.6; 0.8 halves the word-match scan) buys
+speed on long terms with typo tolerance.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+from typing import Any, Awaitable, Dict, List, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import schemas
+from app.deps import SessionLocal, engine
+from app.models import Image, User
+from app.serialization import dump_list
+from app.services import images as image_service
+from app.services import users as user_service
+
+from .datagen import add_spec_arguments, prepare, spec_from_args
+
+
+async def _sample_terms(session: AsyncSession, rng: random.Random, count: int) -> Dict[str, List[str]]:
+    filenames = list(
+        (
+            await session.execute(
+                select(Image.filename).where(Image.deleted_at.is_(None)).order_by(func.random()).limit(count)
+            )
+        ).scalars()
+    )
+    users = list((await session.execute(select(User.username).order_by(func.random()).limit(count))).scalars())
+    if not filenames or not users:
+        sys.exit("no data found; seed a dataset first (--seed-data)")
+    stems = [name.rsplit(".", 1)[0] for name in filenames]
+    typos = []
+    for stem in stems:
+        cut = rng.randrange(len(stem))
+        typos.append(stem[:cut] + stem[cut + 1 :])
+    return {
+        "image exact": stems,
+        "image typo": typos,
+        "image two words": ["_".join(stem.split("_")[:2]) for stem in stems],
+        "image one word": [stem.split("_")[0] for stem in stems],
+        "user name": [name[-7:] for name in users],
+    }
+
+
+async def _timed(awaitable: Awaitable[Any]) -> Tuple[float, Any]:
+    started = time.perf_counter()
+    result = await awaitable
+    return (time.perf_counter() - started) * 1000, result
+
+
+def _percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+async def run(args: argparse.Namespace) -> int:
+    rng = random.Random(args.seed)
+    async with SessionLocal() as session:
+        if session.bind.dialect.name != "postgresql":
+            sys.exit("the trigram indexes are PostgreSQL-only; point DATABASE_URL at one")
+        terms = await _sample_terms(session, rng, args.queries)
+        await session.rollback()
+
+        print(f"{'case':<18} {'queries':>7} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9} {'avg hits':>9}")
+        missed = []
+        for case, queries in terms.items():
+            search = user_service.search_user_rows if case.startswith("user") else image_service.search_image_rows
+            timings, hits = [], []
+            for query in queries:
+                elapsed, rows = await _timed(search(session, query, args.limit))
+                timings.append(elapsed)
+                hits.append(len(rows))
+                await session.rollback()
+            p95 = _percentile(timings, 0.95)
+            print(
+                f"{case:<18} {len(queries):>7} {statistics.median(timings):>9.2f} {p95:>9.2f}"
+                f" {max(timings):>9.2f} {statistics.mean(hits):>9.1f}"
+            )
+            if p95 > args.budget_ms:
+                missed.append(case)
+
+        timings, size = [], 0
+        for _ in range(args.repeats):
+            started = time.perf_counter()
+            rows = await image_service.list_image_rows(session)
+            size = len(dump_list(schemas.ImageRead, rows))
+            timings.append((time.perf_counter() - started) * 1000)
+            await session.rollback()
+        print(
+            f"{'full image list':<18} {args.repeats:>7} {statistics.median(timings):>9.2f} {'':>9}"
+            f" {max(timings):>9.2f} {len(rows):>9}  ({size / 1e6:.1f} MB of JSON)"
+        )
+
+    if missed:
+        print(f"p95 over {args.budget_ms:.0f} ms: {', '.join(missed)}")
+        return 1
+    return 0
+
+
+async def _main(args: argparse.Namespace) -> int:
+    try:
+        if args.seed_data:
+            await prepare(spec_from_args(args))
+        return await run(args)
+    finally:
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seed-data", action="store_true", help="load a synthetic dataset first")
+    parser.add_argument("--queries", type=int, default=50, help="search terms per case")
+    parser.add_argument("--limit", type=int, default=50, help="page size, as the API default")
+    parser.add_argument("--repeats", type=int, default=3, help="full-list transfers to time")
+    parser.add_argument("--budget-ms", type=float, default=50.0, help="p95 each search case must stay under")
+    add_spec_arguments(parser)
+    sys.exit(asyncio.run(_main(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Serialization cost of list responses: FastAPI ``response_model`` vs the fast path.
+
+    python -m benchmarks.bench_serialization [--sizes 1000,10000,100000] [--repeats 5]
+
+The baseline is what a ``response_model=list[...]`` route does with ORM entities; the fast
+path is projected rows through the precompiled ``TypeAdapter`` in ``app.serialization``.
+Entities and rows are built before timing, so only serialization is measured. Rows come
+from ``tests/serialization_cases.py``, and its golden check (byte-identical JSON for every
+list endpoint shape) runs first.
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from typing import Callable
+
+from app.serialization import dump_list
+from tests.serialization_cases import (
+    CASES,
+    assert_fast_path_matches,
+    assert_fixtures_cover_columns,
+    entities,
+    response_model_json,
+)
+
+
+def golden_check() -> None:
+    assert_fixtures_cover_columns()
+    for name in CASES:
+        assert_fast_path_matches(name)
+    print("golden check: fast path output is byte-identical for", ", ".join(CASES))
+
+
+def _time(fn: Callable[[], bytes], repeats: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    golden_check()
+    print(f"{'case':<12} {'rows':>7} {'response_model ms':>18} {'fast path ms':>13} {'speedup':>8}")
+    for name, (model, entity, factory) in CASES.items():
+        for n in (int(s) for s in args.sizes.split(",")):
+            rows = factory(n)
+            objects = entities(entity, rows)
+            baseline = _time(lambda: response_model_json(model, objects), args.repeats)
+            fast = _time(lambda: dump_list(model, rows), args.repeats)
+            print(f"{name:<12} {n:>7} {baseline * 1000:>18.1f} {fast * 1000:>13.1f} {baseline / fast:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Thumbnail engine benchmark: ms per image and peak RSS across a synthetic corpus.
+
+    python -m benchmarks.bench_thumbnails [--sizes 1,12,24,48] [--repeats 3] [--json out.json]
+
+Each case runs in a fresh process; peak memory is its ``ru_maxrss`` minus that of an
+idle process which performed the same imports and file read.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from typing import Dict, List
+
+from PIL import Image as PILImage
+
+FORMATS = ("JPEG", "PNG", "WEBP")
+
+
+def legacy_thumb(data: bytes, max_size: int = 400) -> tuple[bytes, str]:
+    """The original full-decode implementation, kept as the comparison baseline."""
+    img = PILImage.open(BytesIO(data))
+    img.thumbnail((max_size, max_size))
+    fmt = (img.format or "PNG").upper()
+    buf = BytesIO()
+    img.save(buf, format=fmt)
+    return buf.getvalue(), f"image/{fmt.lower()}"
+
+
+def synth_image(megapixels: int, fmt: str) -> bytes:
+    """Build a photo-like test image (gradients plus noise) of roughly ``megapixels`` MP."""
+    width = int(math.sqrt(megapixels * 1_000_000 * 4 / 3))
+    height = int(width * 3 / 4)
+    base = PILImage.merge(
+        "RGB",
+        (
+            PILImage.linear_gradient("L").resize((width, height)),
+            PILImage.radial_gradient("L").resize((width, height)),
+            PILImage.effect_noise((width, height), 48),
+        ),
+    )
+    buf = BytesIO()
+    if fmt == "JPEG":
+        exif = PILImage.Exif()
+        exif[0x0112] = 6  # rotated 90° CW, exercises exif_transpose
+        base.save(buf, format="JPEG", quality=90, exif=exif)
+    else:
+        base.save(buf, format=fmt)
+    return buf.getvalue()
+
+
+def _run_case(engine: str, path: str, repeats: int) -> Dict[str, float]:
+    from app.services.thumbnails import make_thumb
+
+    fn = {"legacy": legacy_thumb, "draft": make_thumb}.get(engine)
+    with open(path, "rb") as fh:
+        data = fh.read()
+    start = time.perf_counter()
+    out = b""
+    if fn is not None:
+        for _ in range(repeats):
+            out, _mime = fn(data)
+    elapsed = time.perf_counter() - start
+    return {
+        "ms_per_image": elapsed / repeats * 1000,
+        "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "out_bytes": len(out),
+    }
+
+
+def _in_fresh_process(engine: str, path: str, repeats: int) -> Dict[str, float]:
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=ctx, max_tasks_per_child=1) as pool:
+        return pool.submit(_run_case, engine, path, repeats).result()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1,12,24", help="Comma-separated megapixel sizes")
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--json", dest="json_path", help="Write results to this file")
+    args = parser.parse_args()
+
+    results: List[Dict[str, object]] = []
+    print(f"{'format':<6} {'MP':>4} {'engine':<7} {'ms/img':>9} {'peak MB':>9} {'out KB':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for fmt in FORMATS:
+            for mp in (int(s) for s in args.sizes.split(",")):
+                path = os.path.join(tmp, f"{mp}mp.{fmt.lower()}")
+                with open(path, "wb") as fh:
+                    fh.write(synth_image(mp, fmt))
+                # Same imports and file read with no decode: subtracted to isolate the engine's peak.
+                idle = _in_fresh_process("idle", path, 1)["max_rss_mb"]
+                for engine in ("legacy", "draft"):
+                    row = _in_fresh_process(engine, path, args.repeats)
+                    row["peak_rss_mb"] = max(row.pop("max_rss_mb") - idle, 0.0)
+                    row.update({"format": fmt, "megapixels": mp, "engine": engine, "in_bytes": os.path.getsize(path)})
+                    results.append(row)
+                    print(
+                        f"{fmt:<6} {mp:>4} {engine:<7} {row['ms_per_image']:>9.1f} "
+                        f"{row['peak_rss_mb']:>9.1f} {row['out_bytes'] / 1024:>8.1f}"
+                    )
+
+    if args.json_path:
+        with open(args.json_path, "w") as fh:
+            json.dump(results, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""Index advisor: EXPLAIN (ANALYZE, BUFFERS) every hot route's queries and flag seq scans.
+
+    python -m benchmarks.explain_queries [--seed-data --users 10000 --images 50000] [--min-rows 1000] [--json]
+
+Runs each route's real service code against ``DATABASE_URL`` (PostgreSQL only), captures the
+SQL it sends, then replays every SELECT under ``EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON)``.
+Every sequential scan of a table with at least ``--min-rows`` rows is reported. Scans whose
+output is under ``--selective-fraction`` of the table are marked selective: an index would
+serve those, and any of them makes the exit status non-zero so the check can gate CI. Scans
+that return most of the table (full listings, counts) are the right plan and only shown.
+``--seed-data`` first loads a synthetic dataset via ``benchmarks.datagen``.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import sys
+from dataclasses import asdict, dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Tuple
+
+from sqlalchemy import event, func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.deps import SessionLocal, engine
+from app.models import UserImage
+from app.routers import stats
+from app.services import images as image_service
+from app.services import users as user_service
+
+from .datagen import add_spec_arguments, prepare, spec_from_args
+
+
+@dataclass
+class Sample:
+    user_id: int
+    image_id: int
+
+
+async def _sample(session: AsyncSession) -> Sample:
+    """A user and an image that both have assignments, chosen near the median id."""
+    count = (await session.execute(select(func.count()).select_from(UserImage))).scalar_one()
+    if not count:
+        sys.exit("no assignments found; seed a dataset first (--seed-data)")
+    row = (
+        await session.execute(
+            select(UserImage.user_id, UserImage.image_id).order_by(UserImage.id).offset(count // 2).limit(1)
+        )
+    ).one()
+    return Sample(user_id=row.user_id, image_id=row.image_id)
+
+
+ROUTES: Dict[str, Callable[[AsyncSession, Sample], Awaitable[Any]]] = {
+    "GET /images/": lambda s, x: image_service.list_image_rows(s),
+    "GET /users/": lambda s, x: user_service.list_user_rows(s),
+    "GET /stats/summary": lambda s, x: stats.compute_summary(s),
+    "GET /assignments/images/{id}/users": lambda s, x: image_service.list_user_rows_for_image(s, x.image_id),
+    "GET /assignments/users/{id}/images": lambda s, x: image_service.list_image_rows_for_user(s, x.user_id),
+    "GET /assignments/users/{id}/images/sync": lambda s, x: image_service.get_grant_changes(s, x.user_id, 0),
+    "GET /assignments/users/{id}/images/{image_id}": lambda s, x: image_service.user_has_image(s, x.user_id, x.image_id),
+    "GET /assignments/images/{id}/users/count": lambda s, x: image_service.count_users_for_image(s, x.image_id),
+}
+
+
+@dataclass
+class QueryReport:
+    route: str
+    sql: str
+    execution_ms: float
+    shared_hit: int
+    shared_read: int
+    seq_scans: List[Dict[str, Any]] = field(default_factory=list)
+
+    @property
+    def selective_scans(self) -> List[Dict[str, Any]]:
+        return [scan for scan in self.seq_scans if scan["selective"]]
+
+
+class StatementRecorder:
+    """Collect SELECTs sent on ``engine`` while active."""
+
+    def __init__(self) -> None:
+        self.active = False
+        self.statements: List[Tuple[str, Any]] = []
+        event.listen(engine.sync_engine, "before_cursor_execute", self._record)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        if self.active and statement.lstrip().upper().startswith("SELECT"):
+            self.statements.append((statement, parameters))
+
+    def capture(self) -> "StatementRecorder":
+        self.statements = []
+        self.active = True
+        return self
+
+    def __enter__(self) -> List[Tuple[str, Any]]:
+        return self.statements
+
+    def __exit__(self, *exc) -> None:
+        self.active = False
+
+
+def _walk(plan: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _walk(child)
+
+
+async def _table_rows(session: AsyncSession) -> Dict[str, float]:
+    result = await session.execute(
+        text("SELECT relname, reltuples FROM pg_class WHERE relkind = 'r' AND relnamespace = 'public'::regnamespace")
+    )
+    return {name: rows for name, rows in result}
+
+
+async def explain_route(
+    session: AsyncSession,
+    recorder: StatementRecorder,
+    route: str,
+    sample: Sample,
+    table_rows: Dict[str, float],
+    min_rows: int,
+    selective_fraction: float,
+) -> List[QueryReport]:
+    with recorder.capture() as statements:
+        await ROUTES[route](session, sample)
+    await session.rollback()
+
+    reports = []
+    conn = await session.connection()
+    for statement, parameters in statements:
+        result = await conn.exec_driver_sql(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {statement}", parameters)
+        doc = result.scalar_one()
+        doc = (json.loads(doc) if isinstance(doc, str) else doc)[0]
+        top = doc["Plan"]
+        report = QueryReport(
+            route=route,
+            sql=" ".join(statement.split()),
+            execution_ms=doc.get("Execution Time", 0.0),
+            shared_hit=top.get("Shared Hit Blocks", 0),
+            shared_read=top.get("Shared Read Blocks", 0),
+        )
+        for node in _walk(top):
+            relation = node.get("Relation Name")
+            if node["Node Type"] == "Seq Scan" and table_rows.get(relation, 0) >= min_rows:
+                returned = node.get("Actual Rows", 0)
+                report.seq_scans.append(
+                    {
+                        "table": relation,
+                        "table_rows": int(table_rows[relation]),
+                        "rows_returned": returned,
+                        "rows_removed_by_filter": node.get("Rows Removed by Filter", 0),
+                        "filter": node.get("Filter"),
+                        "selective": returned < table_rows[relation] * selective_fraction,
+                    }
+                )
+        reports.append(report)
+    await session.rollback()
+    return reports
+
+
+async def run(min_rows: int, selective_fraction: float) -> List[QueryReport]:
+    async with SessionLocal() as session:
+        if session.bind.dialect.name != "postgresql":
+            sys.exit("EXPLAIN (ANALYZE, BUFFERS) needs PostgreSQL; point DATABASE_URL at one")
+        sample = await _sample(session)
+        table_rows = await _table_rows(session)
+        recorder = StatementRecorder()
+        reports: List[QueryReport] = []
+        for route in ROUTES:
+            reports.extend(
+                await explain_route(session, recorder, route, sample, table_rows, min_rows, selective_fraction)
+            )
+        return reports
+
+
+def print_reports(reports: List[QueryReport]) -> None:
+    for report in reports:
+        mark = "INDEX?" if report.selective_scans else "seq scan" if report.seq_scans else "ok"
+        print(
+            f"[{mark:>8}] {report.route:<40} {report.execution_ms:>9.2f} ms"
+            f"  buffers hit={report.shared_hit} read={report.shared_read}"
+        )
+        print(f"           {report.sql[:160]}")
+        for scan in report.seq_scans:
+            print(
+                f"           -> {scan['table']} ({scan['table_rows']} rows): returned {scan['rows_returned']},"
+                f" removed by filter {scan['rows_removed_by_filter']}, filter {scan['filter']}"
+            )
+
+
+async def _main(args: argparse.Namespace) -> int:
+    try:
+        if args.seed_data:
+            await prepare(spec_from_args(args))
+        reports = await run(args.min_rows, args.selective_fraction)
+    finally:
+        await engine.dispose()
+    if args.json:
+        print(json.dumps([asdict(r) for r in reports], indent=2, default=str))
+    else:
+        print_reports(reports)
+    return 1 if any(r.selective_scans for r in reports) else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seed-data", action="store_true", help="load a synthetic dataset first")
+    parser.add_argument("--min-rows", type=int, default=1000, help="ignore seq scans of smaller tables")
+    parser.add_argument("--selective-fraction", type=float, default=0.1, help="scan output below this share of the table needs an index")
+    parser.add_argument("--json", action="store_true")
+    add_spec_arguments(parser)
+    sys.exit(asyncio.run(_main(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""In-memory stand-in for the boto3 S3 client, covering the calls the app makes.
+
+``install()`` swaps it in for ``get_s3_client`` everywhere in ``app`` so benchmarks measure
+the service, not MinIO. Objects live in a dict; storing the same bytes under many keys is
+cheap, since only references are kept.
+"""
+from __future__ import annotations
+
+import hashlib
+import io
+import sys
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from botocore.exceptions import ClientError
+
+
+class _Body(io.BytesIO):
+    def iter_chunks(self, chunk_size: int = 64 * 1024):
+        while chunk := self.read(chunk_size):
+            yield chunk
+
+
+class InMemoryS3:
+    def __init__(self) -> None:
+        self.objects: Dict[Tuple[str, str], Tuple[bytes, Optional[str], str]] = {}
+        self.buckets = set()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _missing(operation: str, code: str = "NoSuchKey") -> ClientError:
+        return ClientError({"Error": {"Code": code}, "ResponseMetadata": {"HTTPStatusCode": 404}}, operation)
+
+    def put(self, bucket: str, key: str, data: bytes, content_type: Optional[str] = None) -> str:
+        etag = f'"{hashlib.md5(data).hexdigest()}"'
+        with self._lock:
+            self.buckets.add(bucket)
+            self.objects[(bucket, key)] = (data, content_type, etag)
+        return etag
+
+    def _get(self, bucket: str, key: str, operation: str) -> Tuple[bytes, Optional[str], str]:
+        try:
+            return self.objects[(bucket, key)]
+        except KeyError:
+            raise self._missing(operation) from None
+
+    # boto3 client surface -------------------------------------------------------------
+
+    def head_bucket(self, Bucket: str) -> Dict[str, Any]:
+        if Bucket not in self.buckets:
+            raise self._missing("HeadBucket", "404")
+        return {}
+
+    def create_bucket(self, Bucket: str, **kwargs: Any) -> Dict[str, Any]:
+        self.buckets.add(Bucket)
+        return {}
+
+    def put_object(self, Bucket: str, Key: str, Body: Any, ContentType: Optional[str] = None, **kwargs: Any):
+        data = Body if isinstance(Body, (bytes, bytearray)) else Body.read()
+        return {"ETag": self.put(Bucket, Key, bytes(data), ContentType)}
+
+    def head_object(self, Bucket: str, Key: str, **kwargs: Any) -> Dict[str, Any]:
+        data, content_type, etag = self._get(Bucket, Key, "HeadObject")
+        return {"ContentLength": len(data), "ContentType": content_type, "ETag": etag}
+
+    def get_object(self, Bucket: str, Key: str, Range: Optional[str] = None, **kwargs: Any) -> Dict[str, Any]:
+        data, content_type, etag = self._get(Bucket, Key, "GetObject")
+        if Range:
+            start, _, end = Range.removeprefix("bytes=").partition("-")
+            data = data[int(start) : int(end) + 1 if end else None]
+        return {"Body": _Body(data), "ContentLength": len(data), "ContentType": content_type, "ETag": etag}
+
+    def delete_object(self, Bucket: str, Key: str, **kwargs: Any) -> Dict[str, Any]:
+        with self._lock:
+            self.objects.pop((Bucket, Key), None)
+        return {}
+
+    def generate_presigned_url(self, ClientMethod: str, Params: Dict[str, Any], ExpiresIn: int = 3600, **kwargs):
+        return f"http://s3.invalid/{Params['Bucket']}/{Params['Key']}?op={ClientMethod}&expires={ExpiresIn}"
+
+
+def install(client: Optional[InMemoryS3] = None) -> InMemoryS3:
+    """Point every already-imported ``app`` module's ``get_s3_client`` at ``client``."""
+    client = client or InMemoryS3()
+    factory = lambda: client  # noqa: E731
+    for name, module in list(sys.modules.items()):
+        if (name == "app" or name.startswith("app.")) and hasattr(module, "get_s3_client"):
+            module.get_s3_client = factory
+    return client
@@ -0,0 +1,360 @@
+"""Scripted load scenarios against the app, in-process, with JSON results and baseline diffs.
+
+    python -m benchmarks.loadtest [--users 2000 --images 5000] [--scenarios grid_browse,stats]
+                                  [--scale 1.0] [--out results.json] [--baseline base.json]
+
+Seeds a synthetic dataset (``benchmarks.datagen``) into ``DATABASE_URL``, which should be a
+scratch PostgreSQL database, and serves S3 from memory (``benchmarks.fake_s3``). Requests go
+straight to the ASGI app, so numbers exclude network and HTTP parsing but include
+routing, auth, validation, serialization and every DB round trip.
+
+Each scenario reports throughput, p50/p95/p99 latency per operation and DB queries per
+operation. With ``--baseline``, p95 and throughput are compared to a previous ``--out``
+file and the exit status is non-zero when either regresses by more than ``--tolerance``.
+Login rate limiting is disabled so the login burst measures auth cost, not the limiter.
+"""
+from __future__ import annotations
+
+import os
+import tempfile
+
+os.environ.setdefault("DEBUG", "false")
+os.environ.setdefault("EDGE_CACHE_DIR", tempfile.mkdtemp(prefix="bench-edge-"))
+os.environ["LOGIN_RATE_LIMIT_ENABLED"] = "false"
+
+import argparse  # noqa: E402
+import asyncio  # noqa: E402
+import io  # noqa: E402
+import json  # noqa: E402
+import platform  # noqa: E402
+import random  # noqa: E402
+import statistics  # noqa: E402
+import sys  # noqa: E402
+import time  # noqa: E402
+from dataclasses import asdict, dataclass  # noqa: E402
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple  # noqa: E402
+from urllib.parse import parse_qsl, urlencode, urlsplit  # noqa: E402
+
+from PIL import Image as PILImage  # noqa: E402
+from sqlalchemy import select  # noqa: E402
+
+from app.deps import SessionLocal, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import Image, StatusEnum, User  # noqa: E402
+from app.security import shutdown_hash_pool  # noqa: E402
+from app.utils.querycount import QueryCounter, count_queries  # noqa: E402
+from app.utils.time import utc_now  # noqa: E402
+
+from . import fake_s3  # noqa: E402
+from .datagen import BENCH_PASSWORD, DatasetSpec, add_spec_arguments, prepare, spec_from_args  # noqa: E402
+
+
+class ASGIClient:
+    """Minimal HTTP/1.1-over-ASGI client: enough for JSON APIs and streamed bodies."""
+
+    def __init__(self, asgi_app: Any) -> None:
+        self.app = asgi_app
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        json_body: Any = None,
+        headers: Optional[Dict[str, str]] = None,
+        params: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[int, bytes]:
+        body = json.dumps(json_body).encode() if json_body is not None else b""
+        raw_headers = [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()]
+        if json_body is not None:
+            raw_headers.append((b"content-type", b"application/json"))
+        raw_headers.append((b"content-length", str(len(body)).encode()))
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": method,
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": urlencode(params or {}).encode(),
+            "headers": raw_headers,
+            "client": ("127.0.0.1", 50000),
+            "server": ("bench", 80),
+        }
+        sent = False
+        done = asyncio.Event()
+        status = 500
+        chunks: List[bytes] = []
+
+        async def receive() -> Dict[str, Any]:
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            # Streaming responses listen for disconnect; only report it once we are done.
+            await done.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message: Dict[str, Any]) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+                if not message.get("more_body", False):
+                    done.set()
+
+        await self.app(scope, receive, send)
+        done.set()
+        return status, b"".join(chunks)
+
+
+@dataclass
+class ScenarioResult:
+    ops: int
+    errors: int
+    concurrency: int
+    seconds: float
+    throughput: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    queries_per_op: float
+
+
+@dataclass
+class Context:
+    client: ASGIClient
+    admin_headers: Dict[str, str]
+    user_ids: List[int]
+    usernames: List[str]
+    image_ids: List[int]
+    rng: random.Random
+
+
+Operation = Callable[[Context, int], Awaitable[bool]]
+
+
+def _ok(status: int) -> bool:
+    return 200 <= status < 300
+
+
+async def login_burst(ctx: Context, i: int) -> bool:
+    status, _ = await ctx.client.request(
+        "POST", "/auth/user/login", {"username": ctx.rng.choice(ctx.usernames), "password": BENCH_PASSWORD}
+    )
+    return _ok(status)
+
+
+async def grid_browse(ctx: Context, i: int, page_size: int = 24) -> bool:
+    status, body = await ctx.client.request(
+        "GET", "/images/", headers=ctx.admin_headers, params={"include_urls": "true"}
+    )
+    if not _ok(status):
+        return False
+    page = json.loads(body)[:page_size]
+    # Follow the signed thumb_url as the browser would; "/api" is the frontend proxy prefix.
+    urls = [urlsplit(item["thumb_url"].removeprefix("/api")) for item in page]
+    results = await asyncio.gather(
+        *(ctx.client.request("GET", url.path, params=dict(parse_qsl(url.query))) for url in urls)
+    )
+    return all(_ok(status) for status, _ in results)
+
+
+async def bulk_assign(ctx: Context, i: int, batch: int = 100) -> bool:
+    image_id = ctx.rng.choice(ctx.image_ids)
+    user_ids = ctx.rng.sample(ctx.user_ids, min(batch, len(ctx.user_ids)))
+    status, _ = await ctx.client.request(
+        "POST", f"/assignments/images/{image_id}/assign-users", {"user_ids": user_ids}, headers=ctx.admin_headers
+    )
+    return _ok(status)
+
+
+async def per_user_listing(ctx: Context, i: int) -> bool:
+    status, _ = await ctx.client.request(
+        "GET", f"/assignments/users/{ctx.rng.choice(ctx.user_ids)}/images", headers=ctx.admin_headers
+    )
+    return _ok(status)
+
+
+async def stats_summary(ctx: Context, i: int) -> bool:
+    status, _ = await ctx.client.request("GET", "/stats/summary", headers=ctx.admin_headers)
+    return _ok(status)
+
+
+# name -> (operation, operations at --scale 1, concurrency)
+SCENARIOS: Dict[str, Tuple[Operation, int, int]] = {
+    "login_burst": (login_burst, 40, 10),
+    "grid_browse": (grid_browse, 10, 2),
+    "bulk_assign": (bulk_assign, 20, 4),
+    "per_user_listing": (per_user_listing, 300, 20),
+    "stats": (stats_summary, 200, 20),
+}
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+async def run_scenario(ctx: Context, counter: QueryCounter, op: Operation, ops: int, concurrency: int) -> ScenarioResult:
+    latencies: List[float] = []
+    errors = 0
+    queue: asyncio.Queue[int] = asyncio.Queue()
+    for i in range(ops):
+        queue.put_nowait(i)
+
+    async def worker() -> None:
+        nonlocal errors
+        while not queue.empty():
+            i = queue.get_nowait()
+            started = time.perf_counter()
+            try:
+                ok = await op(ctx, i)
+            except Exception:
+                ok = False
+            latencies.append(time.perf_counter() - started)
+            errors += not ok
+
+    queries_before = counter.count
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return ScenarioResult(
+        ops=ops,
+        errors=errors,
+        concurrency=concurrency,
+        seconds=round(elapsed, 4),
+        throughput=round(ops / elapsed, 2),
+        p50_ms=round(statistics.median(latencies) * 1000, 3),
+        p95_ms=round(_percentile(latencies, 95) * 1000, 3),
+        p99_ms=round(_percentile(latencies, 99) * 1000, 3),
+        queries_per_op=round((counter.count - queries_before) / ops, 2),
+    )
+
+
+def _sample_jpeg() -> bytes:
+    buf = io.BytesIO()
+    PILImage.linear_gradient("L").resize((1600, 1200)).convert("RGB").save(buf, "JPEG", quality=85)
+    return buf.getvalue()
+
+
+async def build_context(spec: DatasetSpec, s3: fake_s3.InMemoryS3) -> Context:
+    client = ASGIClient(app)
+    async with SessionLocal() as session:
+        users = (
+            await session.execute(
+                select(User.id, User.username, User.status, User.expires_at).where(User.username.startswith(spec.prefix))
+            )
+        ).all()
+        images = (await session.execute(select(Image.id, Image.bucket, Image.key).where(Image.key.startswith(spec.prefix)))).all()
+    photo = _sample_jpeg()
+    for image in images:
+        s3.put(image.bucket, image.key, photo, "image/jpeg")
+
+    status, body = await client.request(
+        "POST", "/auth/admin/login", {"username": f"{spec.prefix}admin0", "password": BENCH_PASSWORD}
+    )
+    if not _ok(status):
+        sys.exit(f"admin login failed: {status} {body[:200]!r}")
+    token = json.loads(body)["access_token"]
+    return Context(
+        client=client,
+        admin_headers={"Authorization": f"Bearer {token}"},
+        user_ids=[u.id for u in users],
+        # Only accounts that can actually sign in, so the burst measures successful logins.
+        usernames=[
+            u.username
+            for u in users
+            if u.status == StatusEnum.active and (u.expires_at is None or u.expires_at > utc_now())
+        ],
+        image_ids=[i.id for i in images],
+        rng=random.Random(spec.seed),
+    )
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Describe every scenario whose p95 rose or throughput fell by more than ``tolerance``."""
+    regressions = []
+    for name, current in results["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(name)
+        if not base:
+            continue
+        p95_change = current["p95_ms"] / base["p95_ms"] - 1 if base["p95_ms"] else 0.0
+        tput_change = current["throughput"] / base["throughput"] - 1 if base["throughput"] else 0.0
+        print(f"{name:<18} p95 {p95_change:+7.1%}   throughput {tput_change:+7.1%}")
+        if p95_change > tolerance or tput_change < -tolerance:
+            regressions.append(name)
+    return regressions
+
+
+def print_results(results: Dict[str, Any]) -> None:
+    print(f"{'scenario':<18} {'ops':>5} {'err':>4} {'ops/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'q/op':>7}")
+    for name, r in results["scenarios"].items():
+        print(
+            f"{name:<18} {r['ops']:>5} {r['errors']:>4} {r['throughput']:>9.1f} {r['p50_ms']:>9.2f}"
+            f" {r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f} {r['queries_per_op']:>7.2f}"
+        )
+
+
+async def _main(args: argparse.Namespace) -> int:
+    spec = spec_from_args(args)
+    names = args.scenarios.split(",") if args.scenarios else list(SCENARIOS)
+    unknown = set(names) - set(SCENARIOS)
+    if unknown:
+        sys.exit(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    s3 = fake_s3.install()
+    try:
+        counts = await prepare(spec)
+        ctx = await build_context(spec, s3)
+        scenarios = {}
+        with count_queries(engine) as counter:
+            for name in names:
+                op, ops, concurrency = SCENARIOS[name]
+                result = await run_scenario(ctx, counter, op, max(1, int(ops * args.scale)), concurrency)
+                scenarios[name] = asdict(result)
+    finally:
+        shutdown_hash_pool()
+        await engine.dispose()
+
+    results = {
+        "meta": {
+            "dialect": engine.dialect.name,
+            "dataset": {**asdict(spec), **{f"rows_{k}": v for k, v in counts.items()}},
+            "scale": args.scale,
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        },
+        "scenarios": scenarios,
+    }
+    print_results(results)
+    if args.out:
+        with open(args.out, "w") as fh:
+            json.dump(results, fh, indent=2)
+    if args.baseline:
+        with open(args.baseline) as fh:
+            regressions = compare(results, json.load(fh), args.tolerance)
+        if regressions:
+            print(f"regressed beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", default="", help=f"comma-separated subset of {','.join(SCENARIOS)}")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every scenario's operation count")
+    parser.add_argument("--out", help="write results JSON here")
+    parser.add_argument("--baseline", help="results JSON from an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed p95/throughput regression")
+    add_spec_arguments(parser)
+    sys.exit(asyncio.run(_main(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+import os
+import tempfile
+
+# Settings are read on first import of the app, so point it at a throwaway SQLite file first.
+_DB_DIR = tempfile.mkdtemp(prefix="visomaster-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{_DB_DIR}/test.db")
+os.environ.setdefault("EDGE_CACHE_DIR", os.path.join(_DB_DIR, "edge-cache"))
+os.environ.setdefault("CACHE_URL", "memory://")
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+
+    from app import bootstrap
+    from app.main import app
+
+    with pytest.MonkeyPatch.context() as patch:
+        # Nothing in these tests touches object storage.
+        patch.setattr(bootstrap, "ensure_bucket", lambda: None)
+        with TestClient(app) as test_client:
+            yield test_client
+
+
+@pytest.fixture(scope="session")
+def admin_headers(client):
+    from app.config import get_settings
+
+    settings = get_settings()
+    response = client.post(
+        "/auth/admin/login",
+        json={"username": settings.seed_admin_username, "password": settings.seed_admin_password},
+    )
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
@@ -0,0 +1,106 @@
+"""Row fixtures for every list endpoint shape, and the golden check on the fast serializer.
+
+``tests/test_serialization.py`` runs the checks; ``benchmarks.bench_serialization`` reuses
+the fixtures and runs the same checks before timing.
+"""
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Type
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from pydantic import BaseModel
+
+from app import schemas
+from app.models import Image, StatusEnum, User
+from app.serialization import dump_list
+from app.services.images import IMAGE_READ_COLUMNS
+from app.services.users import USER_READ_COLUMNS
+
+_loop = asyncio.new_event_loop()
+
+
+def image_rows(n: int, with_urls: bool = False) -> List[Dict[str, Any]]:
+    now = datetime.now(timezone.utc)
+    rows = []
+    for i in range(n):
+        row: Dict[str, Any] = {
+            "id": i,
+            "bucket": "visomaster",
+            "key": f"uploads/{i:08d}/photo_{i}.jpg",
+            "filename": f"photo_{i}.jpg",
+            "mime_type": "image/jpeg",
+            "size_bytes": 1_000_000 + i,
+            "checksum_sha256": None,
+            "width": 4000,
+            "height": 3000,
+            "orientation": 1,
+            "image_format": "JPEG",
+            "dominant_color": "#336699",
+            "uploader_admin_id": 1,
+            "created_at": now,
+            "deleted_at": None,
+        }
+        if with_urls:
+            row.update(
+                presigned_url=None, download_url=f"/api/images/{i}/download", thumb_url=f"/api/images/{i}/thumb"
+            )
+        rows.append(row)
+    return rows
+
+
+def user_rows(n: int) -> List[Dict[str, Any]]:
+    now = datetime.now(timezone.utc)
+    return [
+        {
+            "id": i,
+            "username": f"user{i:07d}",
+            "status": StatusEnum.active if i % 7 else StatusEnum.disabled,
+            "created_at": now,
+            "expires_at": now + timedelta(days=i % 365),
+            "extended_until": None,
+            "notes": "VIP" if i % 10 == 0 else None,
+        }
+        for i in range(n)
+    ]
+
+
+def entities(entity: type, rows: List[Dict[str, Any]]) -> List[Any]:
+    """ORM objects carrying ``rows``, with non-column fields (URLs) set as attributes."""
+    columns = set(entity.__table__.c.keys())
+    out = []
+    for row in rows:
+        obj = entity(**{k: v for k, v in row.items() if k in columns})
+        for k, v in row.items():
+            if k not in columns:
+                setattr(obj, k, v)
+        out.append(obj)
+    return out
+
+
+def response_model_json(model: Type[BaseModel], objects: List[Any]) -> bytes:
+    """What a ``response_model=list[model]`` route sends for ``objects``."""
+    field = create_model_field(name="Response", type_=list[model], mode="serialization")
+    content = _loop.run_until_complete(serialize_response(field=field, response_content=objects))
+    return JSONResponse(content).body
+
+
+# name -> (response model, ORM entity, row factory)
+CASES = {
+    "images": (schemas.ImageRead, Image, image_rows),
+    "images+urls": (schemas.ImageRead, Image, lambda n: image_rows(n, with_urls=True)),
+    "users": (schemas.UserRead, User, user_rows),
+}
+
+
+def assert_fixtures_cover_columns() -> None:
+    assert {c.name for c in IMAGE_READ_COLUMNS} == set(image_rows(1)[0]), "image fixture out of sync with ImageRead"
+    assert {c.name for c in USER_READ_COLUMNS} == set(user_rows(1)[0]), "user fixture out of sync with UserRead"
+
+
+def assert_fast_path_matches(name: str, n: int = 50) -> None:
+    model, entity, factory = CASES[name]
+    rows = factory(n)
+    expected = response_model_json(model, entities(entity, rows))
+    assert dump_list(model, rows) == expected, f"{name}: fast path output differs from response_model output"
@@ -0,0 +1,26 @@
+import pytest
+
+from app.services.bundles import _member_name, _unique_name
+
+
+@pytest.mark.parametrize(
+    "filename, expected",
+    [
+        ("photo.jpg", "photo.jpg"),
+        ("../../photo.jpg", "photo.jpg"),
+        ("/etc/passwd", "passwd"),
+        ("C:\\Windows\\evil.exe", "evil.exe"),
+        ("C:evil.exe", "evil.exe"),
+        ("..", "image-7"),
+        ("dir/", "image-7"),
+        ("\x00\x1bred.jpg", "red.jpg"),
+    ],
+)
+def test_member_name_stays_in_the_extraction_directory(filename, expected):
+    assert _member_name(filename, 7) == expected
+
+
+def test_unique_name_suffixes_collisions():
+    taken = set()
+    names = [_unique_name(_member_name(name, 1), taken) for name in ("a.jpg", "x/a.jpg", "../a.jpg")]
+    assert names == ["a.jpg", "a (2).jpg", "a (3).jpg"]
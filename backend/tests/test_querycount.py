@@ -0,0 +1,42 @@
+"""List endpoints resolve related rows in batches: the query count must not grow with the rows."""
+import pytest
+
+from app.deps import SessionLocal, engine
+from app.models import Admin, Image, StatusEnum, User, UserExtension
+from app.utils.querycount import assert_max_queries, count_queries
+
+# The page itself and one batch per kind of name it shows; the token version is cached once warm.
+MAX_LIST_QUERIES = 3
+
+
+async def _seed(rows: int) -> None:
+    """``rows`` more images and renewals, spread over as many fresh admins."""
+    async with SessionLocal() as session:
+        start = len((await session.execute(Admin.__table__.select())).all())
+        admins = [
+            Admin(username=f"uploader-{start + i}", password_hash="-", status=StatusEnum.active) for i in range(rows)
+        ]
+        user = User(username=f"renewed-{start}", password_hash="-", status=StatusEnum.active)
+        session.add_all([*admins, user])
+        await session.flush()
+        for i, admin in enumerate(admins):
+            session.add(
+                Image(bucket="b", key=f"k-{start + i}", filename=f"f-{start + i}.png", uploader_admin_id=admin.id)
+            )
+            session.add(UserExtension(user_id=user.id, reason="test", operated_by_admin_id=admin.id))
+        await session.commit()
+
+
+@pytest.mark.parametrize("path", ["/images/?include_uploader=true", "/users/extensions"])
+def test_list_query_count_is_flat(client, admin_headers, path):
+    client.portal.call(_seed, 2)
+    client.get(path, headers=admin_headers)  # warm the token version cache
+    with count_queries(engine) as few:
+        response = client.get(path, headers=admin_headers)
+    assert response.status_code == 200, response.text
+
+    client.portal.call(_seed, 25)
+    with assert_max_queries(engine, MAX_LIST_QUERIES, path) as many:
+        response = client.get(path, headers=admin_headers)
+    assert response.status_code == 200, response.text
+    assert many.count == few.count
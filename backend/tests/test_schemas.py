@@ -0,0 +1,15 @@
+import pytest
+from pydantic import ValidationError
+
+from app.schemas import UserBulkStatusRequest
+
+
+@pytest.mark.parametrize("bulk_filter", [{}, {"status": None}, {"statuss": "active"}])
+def test_bulk_filter_must_narrow_the_target(bulk_filter):
+    with pytest.raises(ValidationError):
+        UserBulkStatusRequest.model_validate({"filter": bulk_filter, "status": "disabled"})
+
+
+def test_bulk_filter_accepts_a_criterion():
+    request = UserBulkStatusRequest.model_validate({"filter": {"status": "active"}, "status": "disabled"})
+    assert request.filter.status == "active"
@@ -0,0 +1,13 @@
+"""The fast list serializer must stay byte-identical to FastAPI's ``response_model`` output."""
+import pytest
+
+from .serialization_cases import CASES, assert_fast_path_matches, assert_fixtures_cover_columns
+
+
+def test_fixtures_cover_the_projected_columns():
+    assert_fixtures_cover_columns()
+
+
+@pytest.mark.parametrize("case", list(CASES))
+def test_fast_path_matches_response_model(case):
+    assert_fast_path_matches(case)
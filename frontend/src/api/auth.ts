@@ -1,9 +1,18 @@
 import { apiClient } from "./client";
 
 export type LoginPayload = { username: string; password: string };
-export type TokenResponse = { access_token: string; token_type: string };
+export type TokenResponse = {
+  access_token: string;
+  token_type: string;
+  expires_in?: number;
+  refresh_token?: string | null;
+};
 
 export const adminLogin = async (payload: LoginPayload): Promise<TokenResponse> => {
   const { data } = await apiClient.post<TokenResponse>("/auth/admin/login", payload);
   return data;
 };
+
+export const logoutSession = async (refreshToken: string): Promise<void> => {
+  await apiClient.post("/auth/logout", { refresh_token: refreshToken });
+};
@@ -1,4 +1,4 @@
-import axios from "axios";
+import axios, { AxiosError, InternalAxiosRequestConfig } from "axios";
 import { authStore } from "../store/auth";
 
 export const apiClient = axios.create({
@@ -14,9 +14,40 @@ apiClient.interceptors.request.use((config) => {
   return config;
 });
 
+// One refresh at a time: concurrent 401s wait on the same rotation instead of racing it,
+// which the server would treat as refresh token reuse.
+let refreshing: Promise<string | null> | null = null;
+
+const refreshAccessToken = (): Promise<string | null> => {
+  const refreshToken = authStore.getState().refreshToken;
+  if (!refreshToken) return Promise.resolve(null);
+  refreshing ??= axios
+    .post("/api/auth/refresh", { refresh_token: refreshToken })
+    .then(({ data }) => {
+      authStore.getState().setTokens(data.access_token, data.refresh_token ?? null);
+      return data.access_token as string;
+    })
+    .catch(() => null)
+    .finally(() => {
+      refreshing = null;
+    });
+  return refreshing;
+};
+
+type RetriableConfig = InternalAxiosRequestConfig & { _retried?: boolean };
+
 apiClient.interceptors.response.use(
   (response) => response,
-  (error) => {
+  async (error: AxiosError) => {
+    const config = error.config as RetriableConfig | undefined;
+    if (error.response?.status === 401 && config && !config._retried) {
+      config._retried = true;
+      const token = await refreshAccessToken();
+      if (token) {
+        config.headers.Authorization = `Bearer ${token}`;
+        return apiClient(config);
+      }
+    }
     if (error.response?.status === 401) {
       authStore.getState().logout();
     }
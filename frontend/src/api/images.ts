@@ -8,7 +8,13 @@ export interface Image {
   mime_type?: string;
   size_bytes?: number;
   checksum_sha256?: string;
+  width?: number;
+  height?: number;
+  orientation?: number;
+  image_format?: string;
+  dominant_color?: string;
   uploader_admin_id?: number;
+  uploader_username?: string | null;
   created_at: string;
   presigned_url?: string;
   download_url?: string;
@@ -48,7 +54,14 @@ export const saveImageMetadata = async (payload: SaveImageDto): Promise<Image> =
 };
 
 export const fetchImages = async (): Promise<Image[]> => {
-  const { data } = await apiClient.get<Image[]>("/images/", { params: { include_urls: true } });
+  const { data } = await apiClient.get<Image[]>("/images/", { params: { include_urls: true, include_uploader: true } });
+  return data;
+};
+
+export const searchImages = async (q: string, limit = 50, offset = 0): Promise<Image[]> => {
+  const { data } = await apiClient.get<Image[]>("/images/search", {
+    params: { q, limit, offset, include_urls: true, include_uploader: true },
+  });
   return data;
 };
 
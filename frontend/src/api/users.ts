@@ -33,6 +33,11 @@ export const fetchUsers = async (): Promise<User[]> => {
   return data;
 };
 
+export const searchUsers = async (q: string, limit = 50, offset = 0): Promise<User[]> => {
+  const { data } = await apiClient.get<User[]>("/users/search", { params: { q, limit, offset } });
+  return data;
+};
+
 export const createUser = async (payload: CreateUserDto): Promise<User> => {
   const { data } = await apiClient.post<User>("/users/", payload);
   return data;
@@ -23,7 +23,7 @@ const ImageGrid = ({ data, selectedIds, onToggleSelect, onPreview }: Props) => {
               style={selected ? { borderColor: "#1677ff", boxShadow: "0 0 0 2px rgba(22,119,255,0.2)" } : {}}
               onClick={() => onToggleSelect(img)}
               cover={
-                <div style={{ position: "relative" }}>
+                <div style={{ position: "relative", background: img.dominant_color }}>
                   {coverSrc ? (
                     <AntImage
                       src={coverSrc}
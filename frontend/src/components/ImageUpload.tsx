@@ -26,7 +26,7 @@ const ImageUpload = ({ onUploaded }: Props) => {
   };
 
   return (
-    <Upload customRequest={handleUpload} showUploadList={false} accept="image/*" multiple>
+    <Upload customRequest={handleUpload} showUploadList={false} accept="image/jpeg,image/png,image/gif,image/webp,image/bmp,image/tiff" multiple>
       <div
         style={{
           padding: "12px 16px",
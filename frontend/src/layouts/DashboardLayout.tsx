@@ -2,6 +2,7 @@ import { LogoutOutlined } from "@ant-design/icons";
 import { Button, Layout, Menu, Space, Typography } from "antd";
 import { useMemo } from "react";
 import { Link, Outlet, useLocation, useNavigate } from "react-router-dom";
+import { logoutSession } from "../api/auth";
 import { authStore } from "../store/auth";
 
 const { Header, Content, Sider } = Layout;
@@ -10,6 +11,13 @@ const DashboardLayout = () => {
   const location = useLocation();
   const navigate = useNavigate();
   const logout = authStore((s) => s.logout);
+  const refreshToken = authStore((s) => s.refreshToken);
+
+  const handleLogout = () => {
+    if (refreshToken) logoutSession(refreshToken).catch(() => undefined);
+    logout();
+    navigate("/login");
+  };
 
   const selectedKeys = useMemo(() => {
     if (location.pathname.startsWith("/users")) return ["users"];
@@ -35,7 +43,7 @@ const DashboardLayout = () => {
         <Header style={{ background: "#fff", padding: "0 24px", borderBottom: "1px solid #f0f0f0", display: "flex", alignItems: "center", justifyContent: "space-between" }}>
           <Typography.Text style={{ fontSize: 16, fontWeight: 600 }}>后台管理</Typography.Text>
           <Space>
-            <Button icon={<LogoutOutlined />} onClick={() => { logout(); navigate("/login"); }}>
+            <Button icon={<LogoutOutlined />} onClick={handleLogout}>
               退出
             </Button>
           </Space>
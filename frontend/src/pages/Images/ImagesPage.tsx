@@ -1,8 +1,8 @@
 import { useMutation, useQuery, useQueryClient } from "@tanstack/react-query";
-import { Button, Card, Form, Image as AntImage, Modal, Select, Skeleton, Space, message } from "antd";
+import { Button, Card, Form, Image as AntImage, Input, Modal, Select, Skeleton, Space, message } from "antd";
 import { useMemo, useState } from "react";
 import { assignImagesToUser } from "../../api/assignments";
-import { deleteImage, fetchImages, type Image } from "../../api/images";
+import { deleteImage, fetchImages, searchImages, type Image } from "../../api/images";
 import { fetchUsers, type User } from "../../api/users";
 import ImageGrid from "../../components/ImageGrid";
 import ImageUpload from "../../components/ImageUpload";
@@ -14,7 +14,21 @@ const ImagesPage = () => {
   const [previewImg, setPreviewImg] = useState<Image | null>(null);
   const [form] = Form.useForm();
 
-  const { data: images = [], isLoading } = useQuery({ queryKey: ["images"], queryFn: fetchImages });
+  const [search, setSearch] = useState("");
+  // The server needs three characters for a trigram match; shorter input shows the full list.
+  const searching = search.length >= 3;
+  const { data: allImages = [], isLoading: listLoading } = useQuery({
+    queryKey: ["images"],
+    queryFn: fetchImages,
+    enabled: !searching,
+  });
+  const { data: found = [], isLoading: searchLoading } = useQuery({
+    queryKey: ["images", "search", search],
+    queryFn: () => searchImages(search),
+    enabled: searching,
+  });
+  const images = searching ? found : allImages;
+  const isLoading = searching ? searchLoading : listLoading;
   const { data: users = [] } = useQuery({ queryKey: ["users"], queryFn: fetchUsers });
 
   const deleteMutation = useMutation({
@@ -93,6 +107,12 @@ const ImagesPage = () => {
         title="图片库"
         extra={
           <Space>
+            <Input.Search
+              allowClear
+              placeholder="搜索文件名或路径"
+              onSearch={(value) => setSearch(value.trim())}
+              style={{ width: 240 }}
+            />
             <ImageUpload onUploaded={() => queryClient.invalidateQueries({ queryKey: ["images"] })} />
             <Button onClick={handleAssign} disabled={!selectedIds.length}>
               分配
@@ -154,6 +174,9 @@ const ImagesPage = () => {
               style={{ width: "100%" }}
             />
             <div style={{ marginTop: 8, fontWeight: 600 }}>{previewImg.filename}</div>
+            {previewImg.uploader_username && (
+              <div style={{ color: "#888" }}>上传者：{previewImg.uploader_username}</div>
+            )}
           </>
         )}
       </Modal>
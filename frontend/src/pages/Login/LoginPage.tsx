@@ -11,7 +11,7 @@ const LoginPage = () => {
   const onFinish = async (values: { username: string; password: string }) => {
     try {
       const res = await adminLogin(values);
-      setToken(res.access_token, { username: values.username });
+      setToken(res.access_token, { username: values.username }, res.refresh_token);
       navigate("/");
     } catch (error: any) {
       message.error(error.response?.data?.detail || "登录失败");
@@ -10,6 +10,7 @@ import {
   extendUser,
   fetchUsers,
   resetPassword,
+  searchUsers,
   updateUser,
   type User,
   type CreateUserDto,
@@ -18,7 +19,21 @@ import {
 
 const UsersPage = () => {
   const queryClient = useQueryClient();
-  const { data: users = [], isLoading } = useQuery({ queryKey: ["users"], queryFn: fetchUsers });
+  const [search, setSearch] = useState("");
+  // The server needs three characters for a trigram match; shorter input shows the full list.
+  const searching = search.length >= 3;
+  const { data: allUsers = [], isLoading: listLoading } = useQuery({
+    queryKey: ["users"],
+    queryFn: fetchUsers,
+    enabled: !searching,
+  });
+  const { data: found = [], isLoading: searchLoading } = useQuery({
+    queryKey: ["users", "search", search],
+    queryFn: () => searchUsers(search),
+    enabled: searching,
+  });
+  const users = searching ? found : allUsers;
+  const isLoading = searching ? searchLoading : listLoading;
   const [drawerOpen, setDrawerOpen] = useState(false);
   const [editing, setEditing] = useState<User | null>(null);
   const [extendTarget, setExtendTarget] = useState<User | null>(null);
@@ -110,6 +125,12 @@ const UsersPage = () => {
   const header = useMemo(
     () => (
       <Space>
+        <Input.Search
+          allowClear
+          placeholder="搜索用户名或备注"
+          onSearch={(value) => setSearch(value.trim())}
+          style={{ width: 240 }}
+        />
         <Button type="primary" icon={<PlusOutlined />} onClick={() => setDrawerOpen(true)}>
           新建用户
         </Button>
@@ -8,8 +8,10 @@ type AdminInfo = {
 
 type AuthState = {
   token: string | null;
+  refreshToken: string | null;
   admin: AdminInfo | null;
-  setToken: (token: string, admin?: AdminInfo) => void;
+  setToken: (token: string, admin?: AdminInfo, refreshToken?: string | null) => void;
+  setTokens: (token: string, refreshToken: string | null) => void;
   logout: () => void;
 };
 
@@ -17,9 +19,12 @@ export const authStore = create<AuthState>()(
   persist(
     (set) => ({
       token: null,
+      refreshToken: null,
       admin: null,
-      setToken: (token, admin) => set({ token, admin: admin ?? null }),
-      logout: () => set({ token: null, admin: null }),
+      setToken: (token, admin, refreshToken) =>
+        set({ token, admin: admin ?? null, refreshToken: refreshToken ?? null }),
+      setTokens: (token, refreshToken) => set({ token, refreshToken }),
+      logout: () => set({ token: null, refreshToken: null, admin: null }),
     }),
     { name: "vm-admin-auth" },
   ),